@@ -9,7 +9,7 @@
 
 __author__  = "Wojciech Muła <wojciech_mula@poczta.onet.pl>"
 
-__all__ = ["convert", "SVGdocument", "saveall"]
+__all__ = ["convert", "iterconvert", "SVGdocument", "saveall", "writeall"]
 
 try:
 	# python3
@@ -40,6 +40,20 @@ def convert(document, canvas, items=None, tounicode=None):
 
 	Return list of XML elements
 	"""
+	elements = []
+	for converted in iterconvert(document, canvas, items, tounicode):
+		elements.extend(converted)
+
+	return elements
+
+
+def iterconvert(document, canvas, items=None, tounicode=None):
+	"""
+	Convert 'items' stored in 'canvas' to SVG 'document',
+	one item at a time (see convert).
+
+	Yield list of XML elements of each item
+	"""
 	tk = canvas.tk
 
 	if items is None:	# default: all items
@@ -57,7 +71,6 @@ def convert(document, canvas, items=None, tounicode=None):
 			# python2
 			tounicode  = lambda text: str(text).encode("utf-8")
 
-	elements = []
 	for item in items:
 		
 		# skip unsupported items
@@ -66,6 +79,8 @@ def convert(document, canvas, items=None, tounicode=None):
 			warn("Items of type '%s' are not supported." % itemtype)
 			continue
 
+		elements = []
+
 		# get item coords
 		coords = canvas.coords(item)
 
@@ -259,7 +274,7 @@ def convert(document, canvas, items=None, tounicode=None):
 			if value: # create only nonempty attributes
 				element.setAttribute(attr, str(value))
 
-	return elements
+		yield elements
 
 
 def SVGdocument():
@@ -279,10 +294,13 @@ def SVGdocument():
 
 
 def saveall(filename, canvas, items=None, margin=10, tounicode=None):
-	doc = SVGdocument()
+	file = open(filename, 'w')
+	writeall(file, canvas, items, margin, tounicode)
+	file.close()
 
-	for element in convert(doc, canvas, items, tounicode):
-		doc.documentElement.appendChild(element)
+
+def bbox(canvas, items=None):
+	"Bounding box of 'items' stored in 'canvas' (all items if None)"
 
 	if items is None:
 		x1, y1, x2, y2 = canvas.bbox(ALL)
@@ -303,7 +321,24 @@ def saveall(filename, canvas, items=None, margin=10, tounicode=None):
 				x2 = max(x2, X2)
 				y1 = min(y1, Y1)
 				y2 = max(y2, Y2)
-	
+
+	return x1, y1, x2, y2
+
+
+def writeall(file, canvas, items=None, margin=10, tounicode=None,
+	buffersize=65536):
+	"""
+	Write 'items' stored in 'canvas' as SVG document to 'file'
+	(file object), element by element, without building the
+	whole document in memory. The output is the same as saveall.
+
+	Converted elements are written in chunks of about
+	'buffersize' characters.
+	"""
+	doc = SVGdocument()
+
+	x1, y1, x2, y2 = bbox(canvas, items)
+
 	x1 -= margin
 	y1 -= margin
 	x2 += margin
@@ -316,9 +351,35 @@ def saveall(filename, canvas, items=None, margin=10, tounicode=None):
 	doc.documentElement.setAttribute(
 		'viewBox', "%0.3f %0.3f %0.3f %0.3f" % (x1, y1, dx, dy))
 
-	file = open(filename, 'w')
-	file.write(doc.toxml())
-	file.close()
+	# serialize the document around a placeholder to get
+	# the text before and after the elements
+	placeholder = doc.createComment('canvasvg')
+	doc.documentElement.appendChild(placeholder)
+	head, tail = doc.toxml().split(placeholder.toxml(), 1)
+	doc.documentElement.removeChild(placeholder)
+
+	buffer = []
+	length = 0
+	empty  = True
+	for elements in iterconvert(doc, canvas, items, tounicode):
+		for element in elements:
+			if empty:
+				# an empty root is written as '<svg .../>'
+				file.write(head)
+				empty = False
+			text = element.toxml()
+			buffer.append(text)
+			length += len(text)
+			if length >= buffersize:
+				file.write(''.join(buffer))
+				buffer = []
+				length = 0
+
+	if empty:
+		file.write(doc.toxml())
+	else:
+		buffer.append(tail)
+		file.write(''.join(buffer))
 
 
 #========================================================================
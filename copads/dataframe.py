@@ -3,11 +3,414 @@ A generic series and data frame to hold data and analysis
 Date created: 24th September 2012
 Licence: Python Software Foundation License version 2
 '''
+from __future__ import absolute_import
+
+import csv
+import numbers
 import string
 import random
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+# copadsexceptions is imported relative to the package when dataframe is 
+# imported as copads.dataframe, and as a top-level module otherwise.
+try:
+    from .copadsexceptions import FunctionParameterValueError
+except (ImportError, ValueError):
+    from copadsexceptions import FunctionParameterValueError
+
+comparators = {'=': lambda x, y: x == y,
+               '!=': lambda x, y: x != y,
+               '>': lambda x, y: x > y,
+               '<': lambda x, y: x < y,
+               '>=': lambda x, y: x >= y,
+               '<=': lambda x, y: x <= y}
+
+def _column(values):
+    '''
+    Private function to store a list of data values as a column in the 
+    most compact form - array('l') if all values are integers, array('d') 
+    if all values are floats, or a list (object column) otherwise.
+    
+    @param values: data values
+    @return: array or list
+    '''
+    values = list(values)
+    types = set([type(x) for x in values])
+    try:
+        if types == set([int]): return array('l', values)
+        if types == set([float]): return array('d', values)
+    except OverflowError: pass
+    return values
+
+def _fitColumn(column, value):
+    '''
+    Private function to check whether a data value can be stored into a 
+    column without changing its type.
+    '''
+    if type(column) is list: return True
+    if column.typecode == 'd': return type(value) is float
+    if type(value) is not int: return False
+    try: 
+        array('l', [value])
+        return True
+    except OverflowError: return False
+
+def _extendColumn(column, values):
+    '''
+    Private function to append data values into a column. A typed column 
+    will be converted into an object column (list) if the values do not 
+    fit into its type.
+    
+    @return: extended column, which may be a new object
+    '''
+    values = list(values)
+    if len(column) == 0: return _column(values)
+    if type(column) is list:
+        column.extend(values)
+        return column
+    for value in values:
+        if not _fitColumn(column, value):
+            return list(column) + values
+    column.extend(values)
+    return column
+
+def _setColumnValue(column, index, value):
+    '''
+    Private function to set a data value into a column. A typed column 
+    will be converted into an object column (list) if the value does not 
+    fit into its type.
+    
+    @return: column, which may be a new object
+    '''
+    if not _fitColumn(column, value): column = list(column)
+    column[index] = value
+    return column
+
+def _castColumn(column, type, error_replace):
+    '''
+    Private function to cast the data values of a column into a specific 
+    data type. See Series.cast method for allowable data types.
+    
+    @return: casted column
+    '''
+    type = str(type)
+    if type == 'int' or type == 'integer': cast = int
+    elif type == 'real' or type == 'float': cast = float
+    elif type == 'str' or type == 'string': cast = str
+    else: return column
+    data = [0] * len(column)
+    for i in range(len(column)):
+        try: data[i] = cast(column[i])
+        except: data[i] = error_replace
+    return _column(data)
+
+def _inferCasts(rows):
+    '''
+    Private function to infer the type of each column of rows of strings 
+    - integer if all (non-empty) data values of the column are integers, 
+    float if all are numbers, or string otherwise.
+    
+    @param rows: rows of data values (strings)
+    @return: list of cast functions (int or float, or None for strings), 
+    one per column
+    '''
+    width = max([len(row) for row in rows] + [0])
+    casts = []
+    for j in range(width):
+        values = [row[j] for row in rows if j < len(row) and row[j] != '']
+        cast = None
+        for candidate in (int, float):
+            try:
+                for value in values: candidate(value)
+                cast = candidate
+                break
+            except ValueError: pass
+        casts.append(cast)
+    return casts
+
+def _castRow(row, casts):
+    '''
+    Private function to cast the data values of a row by the cast 
+    functions of their columns (see _inferCasts function). Data values 
+    which cannot be cast are kept as strings.
+    
+    @return: list of data values
+    '''
+    values = list(row)
+    for j in range(min(len(values), len(casts))):
+        if casts[j] is None: continue
+        try: values[j] = casts[j](values[j])
+        except ValueError: pass
+    return values
 
-from copadsexceptions import FunctionParameterValueError
+def _selectRows(column, operator, value):
+    '''
+    Private function to find the row indexes in a column where the data 
+    value meets the criterion.
+    
+    @param operator: comparative operator. Allowed values are: '>', '<', 
+    '>=', '<=', '=', '!=', and '*' (all rows).
+    @return: list of row indexes, in ascending order
+    '''
+    if operator == '*': return list(range(len(column)))
+    if operator not in comparators: return []
+    compare = comparators[operator]
+    return [i for i in range(len(column)) if compare(column[i], value)]
 
+class SeriesIndex(object):
+    '''
+    A value index of a data series for fast retrieval of labels by data 
+    values. Labels are hashed by data value for equality searches, and the 
+    distinct data values are sorted (on demand) for range searches using 
+    '>', '<', '>=' and '<='.
+    '''
+    def __init__(self):
+        '''
+        Constructor. Initialize an empty index.
+        '''
+        self.hashed = {}
+        self.keys = None
+        
+    def add(self, value, label):
+        '''
+        Method to add a label with its data value into the index.
+        '''
+        if value not in self.hashed:
+            self.hashed[value] = set()
+            self.keys = None
+        self.hashed[value].add(label)
+        
+    def remove(self, value, label):
+        '''
+        Method to remove a label with its data value from the index.
+        '''
+        labels = self.hashed.get(value)
+        if labels is None: return None
+        labels.discard(label)
+        if len(labels) == 0:
+            del self.hashed[value]
+            self.keys = None
+            
+    def find(self, operator, value):
+        '''
+        Method to find the labels where the data value meets the criterion.
+        
+        @param operator: comparative operator. Allowed values are: '>' (more 
+        than), '<' (less than), '>=' (more than or equals to), '<=' (less 
+        than or equals to), '=' (equals to), '!=' (not equals to), and '*' 
+        (all labels).
+        @param value: value of the data to compare.
+        @return: list of labels
+        '''
+        if operator == '=': return list(self.hashed.get(value, []))
+        if operator == '*' or operator == '!=':
+            return [label for key in self.hashed.keys() 
+                    if operator == '*' or key != value
+                        for label in self.hashed[key]]
+        if operator not in comparators: return []
+        if self.keys is None: self.keys = sorted(self.hashed.keys())
+        if operator == '>': keys = self.keys[bisect_right(self.keys, value):]
+        elif operator == '>=': keys = self.keys[bisect_left(self.keys, value):]
+        elif operator == '<': keys = self.keys[:bisect_left(self.keys, value)]
+        else: keys = self.keys[:bisect_right(self.keys, value)]
+        return [label for key in keys for label in self.hashed[key]]
+        
+        
+class Aggregator(object):
+    '''
+    Single-pass accumulator of the count, sum, minimum, maximum, mean and 
+    variance of data values. Mean and variance are accumulated as 
+    streaming moments (Welford's method), and two accumulators can be 
+    merged (Chan's method) so that partial aggregates can be calculated 
+    separately and combined. Missing values (None) are ignored. Sum, mean 
+    and variance are accumulated from numeric data values only; hence, 
+    count, minimum and maximum can be used on series of strings.
+    '''
+    functions = ('count', 'sum', 'min', 'max', 'mean', 'var')
+    
+    def __init__(self):
+        '''
+        Constructor. Initialize an empty accumulator.
+        '''
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+        self.numeric = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        
+    def add(self, value):
+        '''
+        Method to add a data value into the accumulator.
+        '''
+        if value is None: return None
+        self.count = self.count + 1
+        if self.count == 1:
+            self.min = value
+            self.max = value
+        elif value < self.min: self.min = value
+        elif value > self.max: self.max = value
+        if not isinstance(value, numbers.Number): return None
+        self.numeric = self.numeric + 1
+        self.sum = self.sum + value
+        delta = value - self.mean
+        self.mean = self.mean + delta / float(self.numeric)
+        self.m2 = self.m2 + delta * (value - self.mean)
+        
+    def merge(self, other):
+        '''
+        Method to merge the data values of another accumulator into this 
+        accumulator.
+        
+        @param other: dataframe.Aggregator object
+        '''
+        if other.count == 0: return None
+        if self.count == 0:
+            self.__dict__.update(other.__dict__)
+            return None
+        if other.numeric > 0:
+            numeric = self.numeric + other.numeric
+            delta = other.mean - self.mean
+            self.m2 = self.m2 + other.m2 + \
+                      delta * delta * self.numeric * other.numeric / \
+                      float(numeric)
+            self.mean = self.mean + delta * other.numeric / float(numeric)
+            self.numeric = numeric
+            self.sum = self.sum + other.sum
+        self.count = self.count + other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        
+    def result(self, function):
+        '''
+        Method to get an aggregated value.
+        
+        @param function: aggregate function. Allowed values are 'count', 
+        'sum', 'min', 'max', 'mean', and 'var' (sample variance).
+        @return: aggregated value, or None if there are not enough data 
+        values (no data value for minimum and maximum, no numeric data 
+        value for mean, or less than 2 numeric data values for variance)
+        '''
+        if function not in self.functions:
+            raise FunctionParameterValueError('Unknown aggregate function: \
+                                              %s' % str(function))
+        if function == 'count': return self.count
+        if function == 'sum': return self.sum
+        if function == 'var':
+            if self.numeric < 2: return None
+            return self.m2 / float(self.numeric - 1)
+        if function == 'mean':
+            if self.numeric == 0: return None
+            return self.mean
+        return getattr(self, function)
+        
+        
+def _aggregateFrame(arguments):
+    '''
+    Private function to aggregate the series of a data frame by the data 
+    values of a series, in one pass through the data frame.
+    
+    @param arguments: tuple of (data frame, name of series to group by, 
+    list of names of series to aggregate)
+    @return: dictionary of group value to list of dataframe.Aggregator 
+    objects (one per series to aggregate)
+    '''
+    (df, series_name, aggregate_names) = arguments
+    g = df.series_names.index(series_name)
+    positions = [df.series_names.index(name) for name in aggregate_names]
+    groups = {}
+    for values in df._rowValues():
+        key = values[g]
+        if key not in groups:
+            groups[key] = [Aggregator() for s in positions]
+        accumulators = groups[key]
+        for i in range(len(positions)):
+            accumulators[i].add(values[positions[i]])
+    return groups
+    
+    
+class GroupBy(object):
+    '''
+    Grouping of one or more data frames by the data values of a series, 
+    for aggregation. This is obtained from Dataframe.groupBy or 
+    MultiDataframe.groupBy method.
+    
+    For example, the following is logically identical to SQL 
+    
+    select seriesC, sum(seriesA), mean(seriesA), count(seriesB) 
+    from <current> group by seriesC
+    
+    >>> gdf = <current>.groupBy('seriesC').aggregate(
+    ...         {'seriesA': ['sum', 'mean'], 'seriesB': 'count'})
+    '''
+    def __init__(self, frames, series_name):
+        '''
+        Constructor.
+        
+        @param frames: data frames to group
+        @type frames: list
+        @param series_name: name of series to group by
+        @type series_name: string
+        '''
+        self.frames = frames
+        self.series_name = series_name
+        
+    def aggregate(self, aggregations, new_dataframe_name='', processes=None):
+        '''
+        Method to aggregate the groups into a new data frame where each 
+        label is a data value of the grouping series, and each series is 
+        an aggregate of a series, named as <series name>_<function>. All 
+        aggregates are calculated in one pass through each data frame.
+        
+        @param aggregations: aggregate functions to apply, as a dictionary 
+        of series name to an aggregate function or a list of aggregate 
+        functions. See Aggregator.result method for the allowed functions.
+        @type aggregations: dictionary
+        @param new_dataframe_name: name for new data frame (that is to be 
+        returned)
+        @type new_dataframe_name: string
+        @param processes: number of processes to aggregate data frames in 
+        parallel (one data frame per process). Default = None (aggregate 
+        data frames in turn in the current process)
+        @return: dataframe.Dataframe object
+        '''
+        names = sorted(aggregations.keys())
+        functions = []
+        for name in names:
+            if type(aggregations[name]) in (list, tuple):
+                functions.append(list(aggregations[name]))
+            else: functions.append([aggregations[name]])
+        arguments = [(df, self.series_name, names) for df in self.frames]
+        if processes is None or len(self.frames) < 2:
+            partials = [_aggregateFrame(x) for x in arguments]
+        else:
+            import multiprocessing
+            pool = multiprocessing.Pool(processes)
+            partials = pool.map(_aggregateFrame, arguments)
+            pool.close()
+            pool.join()
+        groups = {}
+        for partial in partials:
+            for key in partial:
+                if key not in groups: groups[key] = partial[key]
+                else:
+                    for i in range(len(names)):
+                        groups[key][i].merge(partial[key][i])
+        df = Dataframe(new_dataframe_name)
+        df.series_names = ['%s_%s' % (names[i], function) 
+                           for i in range(len(names)) 
+                               for function in functions[i]]
+        for key in groups:
+            df.data[key] = [groups[key][i].result(function)
+                            for i in range(len(names)) 
+                                for function in functions[i]]
+        df.label = list(df.data.keys())
+        return df
+        
+        
 class Series(object):
     '''
     A data series is essentially a labeled list or vector. Each item in 
@@ -194,6 +597,7 @@ class Dataframe(object):
         self.data = {}
         self.label = []
         self.analyses = {}
+        self.indexes = {}
         
     def cast(self, type, error_replace, series_name='all'):
         '''
@@ -246,6 +650,24 @@ class Dataframe(object):
                          self.data[k][index] = str(self.data[k][index])
                 except:
                      self.data[k][index] = error_replace
+        self._reindex(series_name)
+        
+    def toColumnar(self, new_dataframe_name=None):
+        '''
+        Method to convert the current data frame into a column-major 
+        data frame (dataframe.ColumnarDataframe object).
+        
+        @param new_dataframe_name: name for new data frame. Default = None 
+        (use the name of the current data frame)
+        @return: dataframe.ColumnarDataframe object
+        '''
+        if new_dataframe_name is None: new_dataframe_name = self.name
+        df = ColumnarDataframe(new_dataframe_name)
+        df.series_names = [x for x in self.series_names]
+        df.label = self.label
+        df.columns = [_column([self.data[label][i] for label in self.label])
+                      for i in range(len(self.series_names))]
+        return df
         
     def toSeries(self, series_name):
         '''
@@ -340,6 +762,10 @@ class Dataframe(object):
         @type new_dataframe_name: string
         @return: dataframe.Dataframe object
         '''
+        if series_name in self.indexes:
+            return self.extractLabels(self.indexes[series_name].find(operator, 
+                                                                     value),
+                                      new_dataframe_name)
         df = Dataframe(new_dataframe_name)
         try:
             data = {}
@@ -406,6 +832,12 @@ class Dataframe(object):
         @type new_dataframe_name: string
         @return: dataframe.Dataframe object
         '''
+        if self._isIndexed():
+            labels = set()
+            for name in self.series_names:
+                labels.update(self.indexes[name].find(operator, value))
+            return self.extractLabels(self._orderLabels(labels), 
+                                      new_dataframe_name)
         df = Dataframe(str(new_dataframe_name))
         data = {}
         for label in self.data.keys():
@@ -446,11 +878,207 @@ class Dataframe(object):
         '''
         name = ''.join([random.choice(string.ascii_uppercase) 
                         for i in range(8)])
-        while name in self.series_name:
+        while name in self.series_names:
             name = ''.join([random.choice(string.ascii_uppercase) 
                             for i in range(8)])
         return name
         
+    def createIndex(self, series_name):
+        '''
+        Method to create a value index (dataframe.SeriesIndex object) for 
+        a series. The index is kept up to date as data is added or changed, 
+        and is used by the extraction and get methods in place of scanning 
+        the data frame.
+        
+        @param series_name: name of series to index
+        @type series_name: string
+        @return: dataframe.SeriesIndex object, or None if the series is not 
+        found
+        '''
+        if series_name not in self.series_names: return None
+        s = self.series_names.index(series_name)
+        index = SeriesIndex()
+        for (label, value) in self._seriesItems(s):
+            index.add(value, label)
+        self.indexes[series_name] = index
+        return index
+        
+    def dropIndex(self, series_name):
+        '''
+        Method to remove the value index of a series, if any.
+        
+        @param series_name: name of series
+        @type series_name: string
+        '''
+        if series_name in self.indexes: del self.indexes[series_name]
+        
+    def _reindex(self, series_name='all'):
+        '''
+        Private method to rebuild the value index of a series (or all 
+        indexed series if series_name is 'all') after bulk changes.
+        '''
+        if series_name == 'all': series_names = list(self.indexes.keys())
+        else: series_names = [series_name]
+        for name in series_names:
+            if name in self.indexes: self.createIndex(name)
+            
+    def _indexRow(self, label, values, add=True):
+        '''
+        Private method to add (or remove) a label with its data values 
+        into (or from) the value indexes.
+        '''
+        if not self.indexes: return None
+        for s in range(len(self.series_names)):
+            index = self.indexes.get(self.series_names[s])
+            if index is None: continue
+            if add: index.add(values[s], label)
+            else: index.remove(values[s], label)
+            
+    def _indexNewLabels(self, labels, fill_in, width):
+        '''
+        Private method to add new labels into the value indexes of the 
+        first width series, where the data values of the new labels are 
+        filled in with fill_in.
+        '''
+        if not self.indexes: return None
+        for name in set(self.series_names[:width]):
+            index = self.indexes.get(name)
+            if index is None: continue
+            for label in labels: index.add(fill_in, label)
+            
+    def _indexDatum(self, series, label, original_value, new_value):
+        '''
+        Private method to update the value index for a changed datum.
+        '''
+        index = self.indexes.get(series)
+        if index is None: return None
+        index.remove(original_value, label)
+        index.add(new_value, label)
+        
+    def _isIndexed(self):
+        '''
+        Private method to check whether all series are indexed.
+        '''
+        if len(self.series_names) == 0: return False
+        for name in self.series_names:
+            if name not in self.indexes: return False
+        return True
+        
+    def _seriesItems(self, s):
+        '''
+        Private method to get the (label, data value) pairs of the series 
+        at position s.
+        '''
+        return [(label, self.data[label][s]) for label in self.data.keys()]
+        
+    def _row(self, label):
+        '''
+        Private method to get the data values (across all series) of a 
+        label.
+        '''
+        return self.data[label]
+        
+    def _rowValues(self):
+        '''
+        Private generator of the data values (across all series) of each 
+        label.
+        '''
+        for label in self.data.keys():
+            yield self.data[label]
+        
+    def _orderLabels(self, labels):
+        '''
+        Private method to arrange a collection of labels in the order of 
+        the data frame.
+        '''
+        return list(labels)
+        
+    def _scanLabels(self, checks, conjunction):
+        '''
+        Private method to find, in one pass through the data frame, the 
+        labels meeting all (conjunction = 'and') or any (conjunction = 
+        'or') of the checks, where each check is a tuple of (series 
+        position, comparison function, value).
+        '''
+        if conjunction == 'and': match = all
+        else: match = any
+        return [label for label in self.data.keys()
+                if match([compare(self.data[label][s], value) 
+                          for (s, compare, value) in checks])]
+        
+    def extractWhere(self, conditions, new_dataframe_name='', 
+                     conjunction='and'):
+        '''
+        Method for extraction of row data meeting several conditions on 
+        one or more series, evaluated together. Conditions on indexed 
+        series are resolved by their value indexes first, and the 
+        remaining conditions are evaluated in a single pass (only on the 
+        labels found by the indexes where possible).
+        
+        This method is logically identical to SQL select.
+        
+        select * from <current> where <current>.seriesA > 30 and 
+        <current>.seriesB = 'X'
+        
+        can be represented as
+        
+        >>> df = <current>.extractWhere([('seriesA', '>', 30), 
+        ...                              ('seriesB', '=', 'X')])
+        
+        @param conditions: list of conditions where each condition is a 
+        tuple of (series name, comparative operator, value). See 
+        extractSeriesValue method for the allowed operators.
+        @type conditions: list
+        @param new_dataframe_name: name for new data frame (that is to be 
+        returned)
+        @type new_dataframe_name: string
+        @param conjunction: 'and' to extract rows meeting all conditions, 
+        or 'or' to extract rows meeting any of the conditions. 
+        Default = 'and'
+        @return: dataframe.Dataframe object
+        '''
+        indexed = []
+        checks = []
+        for (series_name, operator, value) in conditions:
+            s = self.series_names.index(series_name)
+            if operator == '*':
+                if conjunction == 'and': continue
+                return self.extractValue('*', value, new_dataframe_name)
+            elif series_name in self.indexes:
+                indexed.append(self.indexes[series_name].find(operator, 
+                                                              value))
+            elif operator in comparators:
+                checks.append((s, comparators[operator], value))
+            else:
+                checks.append((s, lambda x, y: False, value))
+        if conjunction == 'and':
+            if len(indexed) == 0: 
+                labels = self._scanLabels(checks, 'and')
+            else:
+                indexed.sort(key=len)
+                labels = set(indexed[0])
+                for found in indexed[1:]: labels.intersection_update(found)
+                labels = [label for label in labels
+                          if all([compare(self._row(label)[s], value)
+                                  for (s, compare, value) in checks])]
+        else:
+            labels = set()
+            for found in indexed: labels.update(found)
+            if len(checks) > 0: labels.update(self._scanLabels(checks, 'or'))
+        return self.extractLabels(self._orderLabels(labels), 
+                                  new_dataframe_name)
+        
+    def groupBy(self, series_name):
+        '''
+        Method to group the data frame by the data values of a series, for 
+        aggregation. See GroupBy.aggregate method for details.
+        
+        @param series_name: name of series to group by
+        @type series_name: string
+        @return: dataframe.GroupBy object
+        '''
+        return GroupBy([self], series_name)
+        
     def addSeries(self, series, fill_in=None):
         '''
         Method to add a data series into the data frame.
@@ -469,6 +1097,8 @@ class Dataframe(object):
         if series.name == '':
             series.name = self._generateRandomName()
         df_label = self.data.keys()
+        new_labels = [label for label in set(series.label) 
+                      if label not in self.data]
         for i in range(len(series.data)):
             if series.label[i] not in df_label:
                 temp = [fill_in] * len(self.series_names)
@@ -485,6 +1115,8 @@ class Dataframe(object):
                 temp = self.data[k]
                 temp.append(fill_in)
                 self.data[k] = temp
+        self._indexNewLabels(new_labels, fill_in, 
+                             len(self.series_names) - 1)
                 
     def addData(self, dataset, labels, fill_in=None):
         '''
@@ -532,11 +1164,88 @@ class Dataframe(object):
             s.addData(dataset[series_name], labels)
             self.addSeries(s, fill_in)
             
+    def _readCSV(self, filepath, series_header=True, separator=',', 
+                 chunksize=10000, infer_type=False):
+        '''
+        Private generator to read a comma-delimited file (CSV) in chunks of 
+        rows, using csv module. The first item of each row is the label. 
+        If there is no header row, the series will be named by their 
+        column numbers ('1', '2', ...). If infer_type is True, the type of 
+        each series is inferred from the first chunk of rows (see 
+        _inferCasts function) and the data values of every chunk are cast 
+        into the type of their series; labels are kept as strings.
+        
+        @return: yields (series names, labels, rows of data values) for 
+        each chunk of rows
+        '''
+        if sys.version_info[0] < 3: f = open(filepath, 'rb')
+        else: f = open(filepath, 'r', newline='')
+        reader = csv.reader(f, delimiter=separator)
+        series = None
+        casts = None
+        labels = []
+        rows = []
+        chunks = 0
+        for row in reader:
+            row = [item.strip() for item in row]
+            if len(row) == 0: continue
+            if series is None:
+                if series_header:
+                    series = row[1:]
+                    continue
+                series = [str(i) for i in range(1, len(row))]
+            labels.append(row[0])
+            rows.append(row[1:])
+            if len(rows) == chunksize:
+                if infer_type:
+                    if casts is None: casts = _inferCasts(rows)
+                    rows = [_castRow(values, casts) for values in rows]
+                yield (series, labels, rows)
+                chunks = chunks + 1
+                labels = []
+                rows = []
+        f.close()
+        if infer_type:
+            if casts is None: casts = _inferCasts(rows)
+            rows = [_castRow(values, casts) for values in rows]
+        if len(rows) > 0 or chunks == 0: 
+            yield (series or [], labels, rows)
+    
+    def _addSeriesNames(self, series_names, fill_in):
+        '''
+        Private method to add empty series (filled with fill_in for all 
+        existing labels) into the data frame.
+        '''
+        for label in self.data.keys():
+            self.data[label].extend([fill_in] * len(series_names))
+        self.series_names.extend(series_names)
+        
+    def _setRows(self, start, labels, rows, fill_in):
+        '''
+        Private method to set the data values of series from position 
+        start onwards, for each label. New labels will be added with 
+        fill_in for the preceding series; and missing values of short rows 
+        will be filled with fill_in.
+        '''
+        width = len(self.series_names) - start
+        for i in range(len(labels)):
+            values = list(rows[i][:width])
+            if len(values) < width: 
+                values.extend([fill_in] * (width - len(values)))
+            if labels[i] in self.data:
+                self.data[labels[i]][start:] = values
+            else:
+                self.data[labels[i]] = [fill_in] * start + values
+        self.label = list(self.data.keys())
+    
     def addCSV(self, filepath, series_header=True, separator=',', 
-               fill_in=None, newline='\n'):
+               fill_in=None, newline='\n', chunksize=10000, 
+               infer_type=False):
         '''
         Method to add data from comma-delimited file (CSV) into current 
-        data frame.
+        data frame. The file is parsed by csv module and read in chunks of 
+        rows, which are added directly into the data frame; hence, the 
+        entire file is never held in memory.
         
         @param filepath: path to CSV file.
         @type filepath: string
@@ -554,24 +1263,50 @@ class Dataframe(object):
         data frame consists of labels that are not found in the newly 
         added data series (this will require filling in of missing values 
         to the newly added data series). Default = None.
-        @param newline: character to denote new line or line feed in the 
-        CSV file.
-        '''
-        data = open(filepath, 'r').readlines()
-        data = [x[:(-1)*len(newline)] for x in data]
-        data = [[item.strip() 
-                 for item in x.split(separator)] 
-                for x in data]
-        if series_header:
-            series = data[0][1:]
-            data = data[1:]
-        labels = [x[0] for x in data]
-        data = [x[1:] for x in data]
-        data = zip(*data)
-        for i in range(len(series)):
-            s = Series(series[i])
-            s.addData(data[i], labels)
-            self.addSeries(s, fill_in)
+        @param newline: not used (line endings are handled by csv module) 
+        and retained for compatibility.
+        @param chunksize: number of rows to read at a time. Default = 10000
+        @type chunksize: integer
+        @param infer_type: boolean flag to cast the data values of each 
+        series into integers or floats, where possible. The type of each 
+        series is inferred from the first chunk of rows; labels are not 
+        cast. Default = False (all data values are strings)
+        '''
+        start = len(self.series_names)
+        for (series, labels, rows) in self._readCSV(filepath, series_header, 
+                                                    separator, chunksize, 
+                                                    infer_type):
+            if len(self.series_names) == start:
+                self._addSeriesNames(series, fill_in)
+            self._setRows(start, labels, rows, fill_in)
+        self._reindex()
+            
+    def iterCSV(self, filepath, series_header=True, separator=',', 
+                fill_in=None, chunksize=10000, infer_type=False):
+        '''
+        Generator to read a comma-delimited file (CSV) in chunks of rows 
+        for out-of-core processing, where each chunk is yielded as a new 
+        data frame (of the same class as the current data frame and with 
+        the same name). The current data frame is not changed. See addCSV 
+        method for the parameters.
+        
+        For example, the following will count the labels where seriesA is 
+        more than 30 without loading the entire file.
+        
+        >>> count = 0
+        >>> for chunk in df.iterCSV('data.csv', infer_type=True):
+        ...     chunk = chunk.extractSeriesValue('seriesA', '>', 30)
+        ...     count = count + len(chunk.label)
+        
+        @return: yields dataframe.Dataframe object for each chunk of rows
+        '''
+        for (series, labels, rows) in self._readCSV(filepath, series_header, 
+                                                    separator, chunksize, 
+                                                    infer_type):
+            df = self.__class__(self.name)
+            df._addSeriesNames(series, fill_in)
+            df._setRows(0, labels, rows, fill_in)
+            yield df
     
     def removeSeries(self, series_name):
         '''
@@ -586,6 +1321,7 @@ class Dataframe(object):
             index = self.series_names.index(series_name)
             self.series_names.pop(index)
             for label in self.data.keys(): self.data[label].pop(index)
+            self.dropIndex(series_name)
         except: pass
         
     def popSeries(self, series_names, new_dataframe_name=''):
@@ -617,6 +1353,7 @@ class Dataframe(object):
         try:
             index = self.label.index(label)
             self.label.pop(index)
+            self._indexRow(label, self.data[label], False)
             del self.data[label]
         except: pass
         
@@ -650,6 +1387,7 @@ class Dataframe(object):
         '''
         try: 
             s = self.series_names.index(series)
+            self._indexDatum(series, label, self.data[label][s], new_value)
             self.data[label][s] = new_value
         except ValueError: pass
         except KeyError: pass
@@ -667,6 +1405,8 @@ class Dataframe(object):
         try:
             index = self.series_names.index(original_name)
             self.series_names[index] = new_name
+            if original_name in self.indexes:
+                self.indexes[new_name] = self.indexes.pop(original_name)
         except ValueError: pass
   
     def changeLabel(self, new_label, original_label):
@@ -681,8 +1421,10 @@ class Dataframe(object):
         '''
         try:
             data = [x for x in self.data[original_label]]
+            self._indexRow(original_label, data, False)
             self.data[new_label] = data
             del self.data[original_label]
+            self._indexRow(new_label, data, True)
         except KeyError: pass
         try:
             index = self.label.index(original_label)
@@ -717,10 +1459,14 @@ class Dataframe(object):
         label names if the data value is found.
         @rtype: list
         '''
-        labels = [label
-                  for label in self.data.keys()
-                     for series in range(len(self.data[label]))
-                         if self.data[label][series] == datum]
+        if self._isIndexed():
+            labels = [label for name in self.series_names
+                      for label in self.indexes[name].find('=', datum)]
+        else:
+            labels = [label
+                      for label in self.data.keys()
+                          for series in range(len(self.data[label]))
+                              if self.data[label][series] == datum]
         if len(labels) == 0: return [None]
         if len(labels) > 0: return labels
         
@@ -735,10 +1481,14 @@ class Dataframe(object):
         series names if the data value is found.
         @rtype: list
         '''
-        series = [self.series_names[series]
-                  for label in self.data.keys()
-                     for series in range(len(self.data[label]))
-                         if self.data[label][series] == datum]
+        if self._isIndexed():
+            series = [name for name in self.series_names
+                      for label in self.indexes[name].find('=', datum)]
+        else:
+            series = [self.series_names[series]
+                      for label in self.data.keys()
+                          for series in range(len(self.data[label]))
+                              if self.data[label][series] == datum]
         if len(series) == 0: return [None]
         if len(series) > 0: return series
         
@@ -754,10 +1504,14 @@ class Dataframe(object):
         more coordinates if the data value is found.
         @rtype: list
         '''
-        coordinates = [(self.series_names[series], label)
-                       for label in self.data.keys()
-                           for series in range(len(self.data[label]))
-                               if self.data[label][series] == datum]
+        if self._isIndexed():
+            coordinates = [(name, label) for name in self.series_names
+                           for label in self.indexes[name].find('=', datum)]
+        else:
+            coordinates = [(self.series_names[series], label)
+                           for label in self.data.keys()
+                               for series in range(len(self.data[label]))
+                                   if self.data[label][series] == datum]
         if len(coordinates) == 0:  return [(None, None)]
         else: return list(set(coordinates))
         
@@ -780,6 +1534,7 @@ class Dataframe(object):
         @param new_value: new value to be replaced when the criterion is met.
         '''
         if label_name not in self.data: return None
+        self._indexRow(label_name, self.data[label_name], False)
         for i in range(len(self.data[label_name])):
             if (operator == '=') and \
                 (self.data[label_name][i] == original_value):
@@ -799,6 +1554,7 @@ class Dataframe(object):
             elif (operator == '!=') and \
                 (self.data[label_name][i] != original_value):
                     self.data[label_name][i] = new_value
+        self._indexRow(label_name, self.data[label_name], True)
                     
     def replaceSeries(self, series_name, operator, original_value, new_value):
         '''
@@ -839,6 +1595,483 @@ class Dataframe(object):
             elif (operator == '!=') and \
                 (self.data[label][index] != original_value):
                     self.data[label][index] = new_value
+        self._reindex(series_name)
+        
+        
+class ColumnarDataframe(Dataframe):
+    '''
+    A column-major data frame. This has the same interface as 
+    dataframe.Dataframe but each data series is kept as a column, which is 
+    a typed array (array('l') for integers and array('d') for floats) or 
+    a list for other data values, and labels are mapped to row indexes. 
+    Filters and replacements work one column at a time and numeric series 
+    take a fraction of the memory of row-major data frames.
+    
+    The row-major view (Dataframe.data) is generated from all the columns 
+    on every access, which takes time and memory in proportion to the 
+    size of the data frame, and changes made to it are not kept. Hence, 
+    getDatum, toSeries and the extraction methods should be used instead 
+    of accessing the data values through the row-major view. Data frames 
+    returned by the extraction methods are also ColumnarDataframe 
+    objects.
+    '''
+    def __init__(self, name=''):
+        '''
+        Constructor. Initialize data frame with a name.
+        
+        @param name: Name of this data frame. Default is empty name.
+        @type name: string
+        '''
+        self.name = str(name)
+        self.series_names = []
+        self.columns = []
+        self.label_index = {}
+        self._labels = []
+        self.analyses = {}
+        self.indexes = {}
+        
+    def _getLabel(self):
+        return [x for x in self._labels]
+    
+    def _setLabel(self, labels):
+        self._labels = [x for x in labels]
+        self.label_index = dict([(self._labels[i], i) 
+                                 for i in range(len(self._labels))])
+        
+    label = property(_getLabel, _setLabel, 
+                     doc='List of labels, in row order.')
+    
+    def _getData(self):
+        return dict([(self._labels[i], [column[i] for column in self.columns])
+                     for i in range(len(self._labels))])
+                     
+    def _setData(self, data):
+        self.label = data.keys()
+        width = max([len(data[label]) for label in self._labels] + [0])
+        self.columns = [_column([data[label][i] for label in self._labels])
+                        for i in range(width)]
+        self._reindex()
+        
+    data = property(_getData, _setData, 
+                    doc='''Row-major view of the data frame as a dictionary 
+                    of label to list of data values (one per series), 
+                    which is generated from all the columns on every 
+                    access.''')
+    
+    def _seriesItems(self, s):
+        '''
+        Private method to get the (label, data value) pairs of the series 
+        at position s.
+        '''
+        return zip(self._labels, self.columns[s])
+        
+    def _row(self, label):
+        '''
+        Private method to get the data values (across all series) of a 
+        label.
+        '''
+        row = self.label_index[label]
+        return [column[row] for column in self.columns]
+        
+    def _rowValues(self):
+        '''
+        Private generator of the data values (across all series) of each 
+        row.
+        '''
+        columns = self.columns
+        for row in range(len(self._labels)):
+            yield [column[row] for column in columns]
+        
+    def _orderLabels(self, labels):
+        '''
+        Private method to arrange a collection of labels in row order.
+        '''
+        return sorted(labels, key=self.label_index.get)
+        
+    def _scanLabels(self, checks, conjunction):
+        '''
+        Private method to find, in one pass through the data frame, the 
+        labels meeting all (conjunction = 'and') or any (conjunction = 
+        'or') of the checks, where each check is a tuple of (series 
+        position, comparison function, value).
+        '''
+        if conjunction == 'and': match = all
+        else: match = any
+        columns = self.columns
+        return [self._labels[row] for row in range(len(self._labels))
+                if match([compare(columns[s][row], value) 
+                          for (s, compare, value) in checks])]
+        
+    def _findRows(self, s, operator, value):
+        '''
+        Private method to find the row indexes, in ascending order, where 
+        the data value of the series at position s meets the criterion. 
+        The value index of the series is used, if present.
+        '''
+        index = self.indexes.get(self.series_names[s])
+        if index is None: 
+            return _selectRows(self.columns[s], operator, value)
+        return sorted([self.label_index[label] 
+                       for label in index.find(operator, value)])
+        
+    def _newFrame(self, name, rows, series=None):
+        '''
+        Private method to generate a new data frame from the given row 
+        indexes and series indexes (all series if None).
+        '''
+        if series is None: series = range(len(self.series_names))
+        df = ColumnarDataframe(str(name))
+        df.series_names = [self.series_names[i] for i in series]
+        df.label = [self._labels[row] for row in rows]
+        for i in series:
+            column = self.columns[i]
+            values = [column[row] for row in rows]
+            if type(column) is list: df.columns.append(values)
+            else: df.columns.append(array(column.typecode, values))
+        return df
+        
+    def toDataframe(self, new_dataframe_name=None):
+        '''
+        Method to convert the current data frame into a row-major data 
+        frame (dataframe.Dataframe object).
+        
+        @param new_dataframe_name: name for new data frame. Default = None 
+        (use the name of the current data frame)
+        @return: dataframe.Dataframe object
+        '''
+        if new_dataframe_name is None: new_dataframe_name = self.name
+        df = Dataframe(new_dataframe_name)
+        df.series_names = [x for x in self.series_names]
+        df.data = self.data
+        df.label = self.label
+        return df
+        
+    def cast(self, type, error_replace, series_name='all'):
+        '''
+        Method to cast data in the one or all series into a specific data 
+        type. See Dataframe.cast method for details.
+        '''
+        if series_name == 'all':
+            self.columns = [_castColumn(column, type, error_replace)
+                            for column in self.columns]
+        else:
+            try: index = self.series_names.index(series_name)
+            except ValueError: return 0
+            self.columns[index] = _castColumn(self.columns[index], 
+                                              type, error_replace)
+        self._reindex(series_name)
+    
+    def toSeries(self, series_name):
+        '''
+        Method to extract a series within the current data frame into a 
+        Series object.
+        
+        @param series_name: name of series to extract
+        @type series_name: string
+        @return: dataframe.Series object
+        '''
+        series_name = str(series_name)
+        s = Series(series_name)
+        try:
+            index = self.series_names.index(series_name)
+            s.addData(list(self.columns[index]), self._labels)
+        except ValueError: pass
+        return s
+        
+    def extractSeries(self, series_names, new_dataframe_name=''):
+        '''
+        Method to extract one or more series from the current data frame 
+        into a new data frame.
+        
+        @param series_names: names of series to extract
+        @type series_names: list
+        @param new_dataframe_name: name for new data frame (that is to be 
+        returned)
+        @type new_dataframe_name: string
+        @return: dataframe.ColumnarDataframe object
+        '''
+        series = [self.series_names.index(name) for name in series_names
+                  if name in self.series_names]
+        return self._newFrame(new_dataframe_name, 
+                              range(len(self._labels)), series)
+        
+    def extractSeriesValue(self, series_name, operator, value, 
+                           new_dataframe_name=''):
+        '''
+        Method for extraction of row data where a specified value or range of 
+        value is found in the current data frame. See 
+        Dataframe.extractSeriesValue method for details.
+        
+        @return: dataframe.ColumnarDataframe object
+        '''
+        index = self.series_names.index(series_name)
+        rows = self._findRows(index, operator, value)
+        return self._newFrame(new_dataframe_name, rows)
+        
+    def extractLabels(self, label_names, new_dataframe_name=''):
+        '''
+        Method to extract one or more data labels across all series from 
+        the current data frame into a new data frame.
+        
+        @param label_names: names of labels to extract
+        @type label_names: list
+        @param new_dataframe_name: name for new data frame (that is to be 
+        returned)
+        @type new_dataframe_name: string
+        @return: dataframe.ColumnarDataframe object
+        '''
+        rows = [self.label_index[label] for label in label_names
+                if label in self.label_index]
+        return self._newFrame(new_dataframe_name, rows)
+        
+    def extractValue(self, operator, value, new_dataframe_name=''):
+        '''
+        Method to extract one or more data labels across all series, based on 
+        criterion, from the current data frame into a new data frame. See 
+        Dataframe.extractValue method for details.
+        
+        @return: dataframe.ColumnarDataframe object
+        '''
+        if operator == '*': rows = range(len(self._labels))
+        else:
+            rows = set()
+            for s in range(len(self.columns)):
+                rows.update(self._findRows(s, operator, value))
+            rows = sorted(rows)
+        return self._newFrame(new_dataframe_name, rows)
+        
+    def addSeries(self, series, fill_in=None):
+        '''
+        Method to add a data series into the data frame. See 
+        Dataframe.addSeries method for details.
+        '''
+        if series.name == '':
+            series.name = self._generateRandomName()
+        values = {}
+        new_labels = []
+        for i in range(len(series.data)):
+            label = series.label[i]
+            if label not in self.label_index and label not in values:
+                new_labels.append(label)
+            values[label] = series.data[i]
+        if len(new_labels) > 0:
+            for i in range(len(self.columns)):
+                self.columns[i] = _extendColumn(self.columns[i], 
+                                                [fill_in] * len(new_labels))
+            for label in new_labels:
+                self.label_index[label] = len(self._labels)
+                self._labels.append(label)
+        self.columns.append(_column([values.get(label, fill_in) 
+                                     for label in self._labels]))
+        self.series_names.append(series.name)
+        self._indexNewLabels(new_labels, fill_in, 
+                             len(self.series_names) - 1)
+        
+    def _addSeriesNames(self, series_names, fill_in):
+        '''
+        Private method to add empty series (filled with fill_in for all 
+        existing labels) into the data frame.
+        '''
+        for name in series_names:
+            self.columns.append(_column([fill_in] * len(self._labels)))
+        self.series_names.extend(series_names)
+        
+    def _setRows(self, start, labels, rows, fill_in):
+        '''
+        Private method to set the data values of series from position 
+        start onwards, for each label. Rows of new labels are transposed 
+        and appended to the columns at once. See Dataframe._setRows method.
+        '''
+        width = len(self.series_names) - start
+        new_rows = []
+        new_labels = {}
+        for i in range(len(labels)):
+            values = list(rows[i][:width])
+            if len(values) < width: 
+                values.extend([fill_in] * (width - len(values)))
+            if labels[i] in new_labels:
+                new_rows[new_labels[labels[i]]] = values
+            elif labels[i] in self.label_index:
+                row = self.label_index[labels[i]]
+                for j in range(width):
+                    self.columns[start + j] = \
+                        _setColumnValue(self.columns[start + j], row, 
+                                        values[j])
+            else:
+                new_labels[labels[i]] = len(new_rows)
+                new_rows.append(values)
+        if len(new_rows) == 0: return None
+        for label in sorted(new_labels.keys(), key=new_labels.get):
+            self.label_index[label] = len(self._labels)
+            self._labels.append(label)
+        for j in range(start):
+            self.columns[j] = _extendColumn(self.columns[j], 
+                                            [fill_in] * len(new_rows))
+        for j in range(width):
+            self.columns[start + j] = \
+                _extendColumn(self.columns[start + j], 
+                              [values[j] for values in new_rows])
+        
+    def removeSeries(self, series_name):
+        '''
+        Method to remove / delete a data series from the current data 
+        frame.
+        
+        @param series_name: names of series to remove
+        @type series_name: string
+        '''
+        series_name = str(series_name)
+        try:
+            index = self.series_names.index(series_name)
+            self.series_names.pop(index)
+            self.columns.pop(index)
+            self.dropIndex(series_name)
+        except ValueError: pass
+        
+    def removeLabel(self, label):
+        '''
+        Method to remove / delete a label across all data series from the 
+        current data frame.
+        
+        @param label: names of label to remove
+        @type label: string
+        '''
+        label = str(label)
+        if label not in self.label_index: return None
+        self._indexRow(label, self._row(label), False)
+        row = self.label_index[label]
+        for column in self.columns: del column[row]
+        self._labels.pop(row)
+        del self.label_index[label]
+        for i in range(row, len(self._labels)):
+            self.label_index[self._labels[i]] = i
+            
+    def changeDatum(self, new_value, series, label):
+        '''
+        Method to change the data value of a series and label. If the 
+        series or label is not found within the data series, nothing will 
+        be changed.
+        
+        @param new_value: the new value for the label.
+        @param series: the series name for the data value to be changed.
+        @param label: the label name for the data value to be changed.
+        '''
+        try: 
+            s = self.series_names.index(series)
+            row = self.label_index[label]
+            self._indexDatum(series, label, self.columns[s][row], new_value)
+            self.columns[s] = _setColumnValue(self.columns[s], row, new_value)
+        except ValueError: pass
+        except KeyError: pass
+        
+    def changeLabel(self, new_label, original_label):
+        '''
+        Method to change the name of an existing label. If the existing 
+        (original) label is not found within the data series, nothing will 
+        be changed.
+        
+        @param new_label: the new name for the label.
+        @param original_label: the existing (original) label name to be 
+        changed.
+        '''
+        if original_label not in self.label_index: return None
+        values = self._row(original_label)
+        self._indexRow(original_label, values, False)
+        row = self.label_index.pop(original_label)
+        self._labels[row] = new_label
+        self.label_index[new_label] = row
+        self._indexRow(new_label, values, True)
+        
+    def getDatum(self, series, label):
+        '''
+        Method to get data value for a given series and label names. If the 
+        series name or label name is not found within the data series, None 
+        will be returned.
+        
+        @param series: the series name for the data value to retrieve.
+        @param label: the label name for the data value to retrieve.
+        @return: data value tagged to the series and label (if found), or 
+        None (if the series or label is not found).
+        '''
+        try:
+            s = self.series_names.index(series)
+            return self.columns[s][self.label_index[label]]
+        except ValueError: return None
+        except KeyError: return None
+        
+    def _findDatum(self, datum):
+        '''
+        Private method to find the (row index, series index) coordinates 
+        of a data value, in row order.
+        '''
+        coordinates = []
+        for s in range(len(self.columns)):
+            coordinates.extend([(row, s) for row in 
+                                self._findRows(s, '=', datum)])
+        coordinates.sort()
+        return coordinates
+        
+    def getLabels(self, datum):
+        '''
+        Method to get label name(s) for a given data value. See 
+        Dataframe.getLabels method for details.
+        '''
+        labels = [self._labels[row] for (row, s) in self._findDatum(datum)]
+        if len(labels) == 0: return [None]
+        return labels
+        
+    def getSeries(self, datum):
+        '''
+        Method to get series name(s) for a given data value. See 
+        Dataframe.getSeries method for details.
+        '''
+        series = [self.series_names[s] for (row, s) in self._findDatum(datum)]
+        if len(series) == 0: return [None]
+        return series
+        
+    def getSeriesLabels(self, datum):
+        '''
+        Method to get series name(s) and label name(s) for a given data 
+        value. See Dataframe.getSeriesLabels method for details.
+        '''
+        coordinates = [(self.series_names[s], self._labels[row]) 
+                       for (row, s) in self._findDatum(datum)]
+        if len(coordinates) == 0:  return [(None, None)]
+        else: return list(set(coordinates))
+        
+    def replaceLabel(self, label_name, operator, original_value, new_value):
+        '''
+        Method to replace values, within a label, from its original value 
+        to a new value, if and only if the original value meets a certain 
+        criterion. See Dataframe.replaceLabel method for details.
+        '''
+        if label_name not in self.label_index: return None
+        if operator not in comparators: return None
+        row = self.label_index[label_name]
+        compare = comparators[operator]
+        self._indexRow(label_name, self._row(label_name), False)
+        for s in range(len(self.columns)):
+            if compare(self.columns[s][row], original_value):
+                self.columns[s] = _setColumnValue(self.columns[s], row, 
+                                                  new_value)
+        self._indexRow(label_name, self._row(label_name), True)
+                                                  
+    def replaceSeries(self, series_name, operator, original_value, new_value):
+        '''
+        Method to replace values, within a series, from its original value 
+        to a new value, if and only if the original value meets a certain 
+        criterion. See Dataframe.replaceSeries method for details.
+        '''
+        if series_name not in self.series_names: return None
+        if operator not in comparators: return None
+        index = self.series_names.index(series_name)
+        rows = self._findRows(index, operator, original_value)
+        if len(rows) == 0: return None
+        column = self.columns[index]
+        if not _fitColumn(column, new_value): column = list(column)
+        for row in rows: column[row] = new_value
+        self.columns[index] = column
+        self._reindex(series_name)
         
         
 class MultiDataframe(object):
@@ -890,3 +2123,16 @@ class MultiDataframe(object):
             dataframe.name = name
         self.frames[dataframe.name] = dataframe
         self.frame_names.append(dataframe.name)
+        
+    def groupBy(self, series_name):
+        '''
+        Method to group all data frames by the data values of a series, for 
+        aggregation across data frames. Each data frame is aggregated 
+        separately (in parallel, if processes is given to 
+        GroupBy.aggregate method) and the partial aggregates are merged. 
+        
+        @param series_name: name of series to group by
+        @type series_name: string
+        @return: dataframe.GroupBy object
+        '''
+        return GroupBy(list(self.frames.values()), series_name)
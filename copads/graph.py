@@ -5,17 +5,198 @@ Copyright (c) Maurice H.T. Ling <mauriceling@acm.org>
 
 Date created: 17th August 2005
 """
+from __future__ import absolute_import
 
-from matrix import Matrix
-from prioritydictionary import PriorityDictionary
-from copadsexceptions import VertexNotFoundError, NotAdjacencyGraphMatrixError
-from copadsexceptions import GraphEdgeSizeMismatchError, GraphParameterError
-from copadsexceptions import FunctionParameterTypeError
+import mmap
+import pickle
+import struct
+from array import array
 
+# Sibling modules are imported relative to the package when graph is 
+# imported as copads.graph, and as top-level modules otherwise.
+try:
+    from .matrix import Matrix
+    from .prioritydictionary import PriorityDictionary
+    from .copadsexceptions import VertexNotFoundError
+    from .copadsexceptions import NotAdjacencyGraphMatrixError
+    from .copadsexceptions import GraphEdgeSizeMismatchError
+    from .copadsexceptions import GraphParameterError
+    from .copadsexceptions import FunctionParameterTypeError
+except (ImportError, ValueError):
+    from matrix import Matrix
+    from prioritydictionary import PriorityDictionary
+    from copadsexceptions import VertexNotFoundError
+    from copadsexceptions import NotAdjacencyGraphMatrixError
+    from copadsexceptions import GraphEdgeSizeMismatchError
+    from copadsexceptions import GraphParameterError
+    from copadsexceptions import FunctionParameterTypeError
+
+
+class ShortestPathMatrix:
+    """
+    All-pairs shortest path table of a graph. Vertices are indexed in the 
+    order of self.vertices and the distances and predecessors are kept as 
+    two compact n x n row-major matrices (array of doubles and array of 
+    integers). Unreachable pairs have a distance of infinity and a 
+    predecessor of -1.
+    
+    The table can be saved into a file and re-loaded, either into memory 
+    or memory-mapped, so that a restarted process does not need to 
+    recompute the paths.
+    """
+    magic = 'CPSP'
+    
+    def __init__(self, vertices, distance, predecessor):
+        """
+        Initialization method.
+        
+        @param vertices: list of vertices, in matrix index order
+        @type vertices: list
+        @param distance: n x n row-major matrix of distances
+        @type distance: array('d')
+        @param predecessor: n x n row-major matrix of predecessor indices 
+            where predecessor[i*n + j] is the index of the vertex before j 
+            on the shortest path from i to j
+        @type predecessor: array('i')
+        """
+        self.vertices = list(vertices)
+        self.index = dict([(self.vertices[i], i) 
+                           for i in range(len(self.vertices))])
+        self.size = len(self.vertices)
+        self.distance = distance
+        self.predecessor = predecessor
+        self._mmap = None
+        self._doffset = 0
+        self._poffset = 0
+        
+    def _vertexIndex(self, vertex):
+        try: return self.index[vertex]
+        except KeyError: raise VertexNotFoundError(vertex)
+    
+    def _distanceAt(self, cell):
+        if self._mmap is None: return self.distance[cell]
+        return struct.unpack_from('=d', self._mmap, 
+                                  self._doffset + 8 * cell)[0]
+        
+    def _predecessorAt(self, cell):
+        if self._mmap is None: return self.predecessor[cell]
+        return struct.unpack_from('=i', self._mmap, 
+                                  self._poffset + 4 * cell)[0]
+    
+    def getDistance(self, start, end):
+        """
+        Returns the length of the shortest path from start to end, or 
+        infinity if end is not reachable from start.
+        
+        @param start: vertex of starting point
+        @param end: vertex of ending point
+        """
+        i = self._vertexIndex(start)
+        j = self._vertexIndex(end)
+        return self._distanceAt(i * self.size + j)
+        
+    def isReachable(self, start, end):
+        """
+        Checks whether end can be reached from start.
+        
+        @param start: vertex of starting point
+        @param end: vertex of ending point
+        @return: True if there is a path from start to end
+        """
+        return self.getDistance(start, end) != float('inf')
+    
+    def shortestPath(self, start, end):
+        """
+        Find a single shortest path from the given start vertex to the 
+        given end vertex by walking the predecessor matrix, which takes 
+        time proportional to the length of the path. 
+        
+        @param start: vertex of starting point
+        @param end: vertex of ending point
+        @return: list of vertices along the shortest path, or an empty 
+            list if end is not reachable from start
+        """
+        i = self._vertexIndex(start)
+        j = self._vertexIndex(end)
+        if i == j: return [start]
+        row = i * self.size
+        if self._predecessorAt(row + j) < 0: return []
+        path = [j]
+        while j != i:
+            j = self._predecessorAt(row + j)
+            path.append(j)
+        path.reverse()
+        return [self.vertices[x] for x in path]
+    
+    def save(self, filename):
+        """
+        Writes the shortest path table into a file. The file consists of 
+        a header (magic, size and pickled vertex list), followed by the 
+        distance matrix (native doubles) and the predecessor matrix 
+        (native 32-bit integers), which allows the matrices to be 
+        memory-mapped by load().
+        
+        @param filename: name of file to write to
+        """
+        vertices = pickle.dumps(self.vertices, 2)
+        f = open(filename, 'wb')
+        f.write(self.magic.encode('ascii'))
+        f.write(struct.pack('=ii', self.size, len(vertices)))
+        f.write(vertices)
+        if self._mmap is None:
+            array('d', self.distance).tofile(f)
+            array('i', self.predecessor).tofile(f)
+        else:
+            cells = self.size * self.size
+            f.write(self._mmap[self._doffset:self._doffset + 8 * cells])
+            f.write(self._mmap[self._poffset:self._poffset + 4 * cells])
+        f.close()
+    
+    def load(cls, filename, memmap=True):
+        """
+        Reads a shortest path table written by save().
+        
+        @param filename: name of file to read from
+        @param memmap: if True (default), the matrices are memory-mapped 
+            and read on demand instead of being loaded into memory
+        @type memmap: boolean
+        @return: ShortestPathMatrix object
+        """
+        f = open(filename, 'rb')
+        if f.read(4) != cls.magic.encode('ascii'):
+            f.close()
+            raise GraphParameterError('%s is not a shortest path \
+                                      matrix file' % filename)
+        (size, vlength) = struct.unpack('=ii', f.read(8))
+        vertices = pickle.loads(f.read(vlength))
+        doffset = 12 + vlength
+        cells = size * size
+        if not memmap:
+            distance = array('d')
+            distance.fromfile(f, cells)
+            predecessor = array('i')
+            predecessor.fromfile(f, cells)
+            f.close()
+            return cls(vertices, distance, predecessor)
+        table = cls(vertices, None, None)
+        table._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        table._doffset = doffset
+        table._poffset = doffset + 8 * cells
+        f.close()
+        return table
+    load = classmethod(load)
+    
+    def close(self):
+        """Releases the memory-mapped file, if any."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+    
 
 class Graph:
     """Graph data structure"""
     graph = {}
+    paths = None
     
     def __init__(self, **kwarg):
         """
@@ -203,6 +384,8 @@ class Graph:
         @status: Tested method
         @since: version 0.1
         """
+        if self.paths is not None: 
+            return self.paths.shortestPath(start, end)
         D, P = self.Dijkstra(start, end)
         Path = []
         while 1:
@@ -212,6 +395,106 @@ class Graph:
         Path.reverse()
         return Path
        
+    def FloydWarshall(self, vertices):
+        """
+        Computes the all-pairs shortest path matrices using Floyd-Warshall 
+        algorithm, which takes O(n^3) time regardless of the number of 
+        edges and is suitable for small, dense graphs. As in Dijkstra 
+        method, only edges with positive length are used.
+        
+        @param vertices: list of vertices, in matrix index order
+        @return: (distance, predecessor) as list of rows
+        """
+        n = len(vertices)
+        index = dict([(vertices[i], i) for i in range(n)])
+        inf = float('inf')
+        D = [[inf] * n for i in range(n)]
+        P = [[-1] * n for i in range(n)]
+        for i in range(n):
+            D[i][i] = 0
+            for w, length in self.graph.get(vertices[i], {}).items():
+                j = index[w]
+                if length > 0 and i != j and length < D[i][j]:
+                    D[i][j] = length
+                    P[i][j] = i
+        for k in range(n):
+            Dk = D[k]
+            Pk = P[k]
+            for i in range(n):
+                Di = D[i]
+                dik = Di[k]
+                if dik == inf: continue
+                Pi = P[i]
+                for j in range(n):
+                    length = dik + Dk[j]
+                    if length < Di[j]:
+                        Di[j] = length
+                        Pi[j] = Pk[j]
+        return (D, P)
+    
+    def allPairsShortestPath(self, method='auto'):
+        """
+        Pre-computes the shortest paths between all pairs of vertices. 
+        After this, shortestPath method looks up the pre-computed paths 
+        instead of running Dijkstra's algorithm for every query, until 
+        self.paths is set to None. The pre-computed table can be saved 
+        using self.paths.save() and re-used by loadShortestPaths method.
+        
+        @param method: algorithm to use. Allowable methods are 
+            'FloydWarshall' (suitable for small, dense graphs), 'Dijkstra' 
+            (repeated Dijkstra's algorithm from every vertex, suitable for 
+            sparse graphs) and 'auto' (default, uses Floyd-Warshall if 
+            there are at least n^2/4 edges for n vertices).
+        @type method: string
+        @return: ShortestPathMatrix object
+        """
+        vertices = list(self.graph.keys())
+        for v in list(vertices):
+            for w in self.graph[v]:
+                if w not in self.graph: 
+                    self.graph[w] = {}
+                    vertices.append(w)
+        n = len(vertices)
+        if method == 'auto':
+            edges = sum([len(self.graph[v]) for v in vertices])
+            if 4 * edges >= n * n: method = 'FloydWarshall'
+            else: method = 'Dijkstra'
+        distance = array('d')
+        predecessor = array('i')
+        if method == 'FloydWarshall':
+            (D, P) = self.FloydWarshall(vertices)
+            for i in range(n):
+                distance.extend(D[i])
+                predecessor.extend(P[i])
+        elif method == 'Dijkstra':
+            index = dict([(vertices[i], i) for i in range(n)])
+            inf = float('inf')
+            for v in vertices:
+                (D, P) = self.Dijkstra(v)
+                row = [inf] * n
+                for w in D: row[index[w]] = D[w]
+                distance.extend(row)
+                row = [-1] * n
+                for w in P: row[index[w]] = index[P[w]]
+                predecessor.extend(row)
+        else: raise GraphParameterError('Unknown all-pairs shortest path \
+                                        method: %s' % str(method))
+        self.paths = ShortestPathMatrix(vertices, distance, predecessor)
+        return self.paths
+    
+    def loadShortestPaths(self, filename, memmap=True):
+        """
+        Loads a pre-computed all-pairs shortest path table (written by 
+        ShortestPathMatrix.save method) to be used by shortestPath method.
+        
+        @param filename: name of file to read from
+        @param memmap: if True (default), memory-maps the table
+        @type memmap: boolean
+        @return: ShortestPathMatrix object
+        """
+        self.paths = ShortestPathMatrix.load(filename, memmap)
+        return self.paths
+    
     def RandomGraph(self, nodes, edges, maxweight = 100.0):
         """
         Generates a graph of random edges.
@@ -4,7 +4,18 @@ Date created: 16th April 2013
 Licence: Python Software Foundation License version 2
 '''
 
+import csv
 import hashlib as h
+import mmap
+import os
+
+algorithms = {'md5': h.md5,
+              'sha1': h.sha1,
+              'sha224': h.sha224,
+              'sha244': h.sha224,
+              'sha256': h.sha256,
+              'sha384': h.sha384,
+              'sha512': h.sha512}
 
 def forward_file_hash(f, fsize, start, blocksize, algorithm):
     '''
@@ -148,3 +159,286 @@ def cfh(filename,
     bhash = bhash + [backward_file_hash(f, start, blocksize, algorithm)
                      for start in startpoints[1:]]
     return ''.join(fhash + bhash)
+
+def chain_hash(data, start, end, blocksize, constructor, checkpoints=[]):
+    '''
+    Chained block hashing on a file mapped into memory. This is the 
+    same as forward_file_hash (from start to end) and, for each 
+    checkpoint, backward_file_hash (from start to checkpoint); but 
+    the hash of each block is generated by updating a hash object 
+    with the block and the previous hash, instead of concatenating 
+    them.
+    
+    @param data: memory-mapped file (or string) to hash
+    @param start: file location to start hashing
+    @type start: integer
+    @param end: file location to end hashing
+    @type end: integer
+    @param blocksize: block size for hash generation
+    @type blocksize: integer
+    @param constructor: hash constructor from hashlib, such as 
+    hashlib.md5
+    @param checkpoints: list of file locations, in ascending order, to 
+    record the hash of the blocks before each location. Default = []
+    @type checkpoints: list
+    @return: (generated hash in string, list of hashes at checkpoints)
+    '''
+    hash_result = b''
+    marks = []
+    checkpoints = list(checkpoints)
+    while start < end:
+        while len(checkpoints) > 0 and checkpoints[0] <= start:
+            marks.append(hash_result.decode('ascii'))
+            checkpoints.pop(0)
+        hasher = constructor(data[start:start+blocksize])
+        hasher.update(hash_result)
+        hash_result = hasher.hexdigest().encode('ascii')
+        start = start + blocksize
+    marks = marks + [hash_result.decode('ascii')] * len(checkpoints)
+    return (hash_result.decode('ascii'), marks)
+
+def fast_cfh(filename,
+             blocksize=1024,
+             startpoints=10,
+             algorithm='md5',
+             threads=None):
+    '''
+    Circular file hasher, which generates the same hash as cfh 
+    function. The file is mapped into memory once and the hash 
+    constructor is resolved once. As all backward hashes are 
+    hashes of the blocks from the start of the file, which are 
+    part of the first forward hash, they are taken from the 
+    first forward hash instead of hashing again. Hence, only 
+    the forward hashes are generated and they may be generated 
+    on a pool of threads.
+    
+    Threads only hash in parallel when hashlib releases the 
+    global interpreter lock, which it does for updates of 
+    2048 bytes or more. As each block is chained to the hash 
+    of the previous block, blocks cannot be combined into 
+    larger updates; hence, threads are only useful with a 
+    block size of at least 2048 bytes. With smaller blocks, 
+    threads only add overheads.
+    
+    @param filename: name of file to hash
+    @type filename: string
+    @param blocksize: block size for hash generation. 
+    Default = 1024
+    @type blocksize: integer
+    @param startpoints: defines the number of start point on
+    the file for hash generation. Default = 10.
+    @type startpoints: integer
+    @param algorithm: algorithm to generate hash. Allowable
+    options are {md5|sha1|sha224|sha256|sha384|sha512}
+    @type algorithm: string
+    @param threads: number of threads to generate forward 
+    hashes (only useful for block size of at least 2048). 
+    Default = None, forward hashes are generated in the 
+    calling thread
+    @type threads: integer
+    @return: generated hash in string
+    '''
+    constructor = algorithms[algorithm]
+    blocksize = int(blocksize)
+    f = open(filename, 'rb')
+    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    fsize = len(data) - 1
+    file_block_size = int(fsize/int(startpoints))
+    startpoints = [x*file_block_size
+                   for x in range(int(startpoints))]
+    checkpoints = sorted(set([startpoints[-1]] + startpoints[1:]))
+    def forward(start):
+        if start == 0:
+            return chain_hash(data, start, fsize, blocksize, 
+                              constructor, checkpoints)
+        return chain_hash(data, start, fsize, blocksize, constructor)
+    try:
+        if threads == None:
+            results = [forward(start) for start in startpoints]
+        else:
+            from multiprocessing.pool import ThreadPool
+            pool = ThreadPool(threads)
+            results = pool.map(forward, startpoints)
+            pool.close()
+            pool.join()
+    finally:
+        data.close()
+        f.close()
+    fhash = [result[0] for result in results]
+    marks = dict(zip(checkpoints, results[0][1]))
+    bhash = [marks[startpoints[-1]]] + \
+            [marks[start] for start in startpoints[1:]]
+    return ''.join(fhash + bhash)
+
+def _tree_hash(parameters):
+    '''
+    Private function to be used by hash_tree function to generate 
+    circular file hash (using fast_cfh function) of a file.
+    
+    @param parameters: tuple of (file name, block size, number of start 
+    points, algorithm)
+    @type parameters: tuple
+    @return: (file name, generated hash or None if the file cannot be 
+    hashed)
+    '''
+    (filename, blocksize, startpoints, algorithm) = parameters
+    try:
+        return (filename, fast_cfh(filename, blocksize, startpoints, 
+                                   algorithm))
+    except (IOError, OSError, ValueError):
+        return (filename, None)
+
+def read_hash_cache(cachefile):
+    '''
+    Function to read a digest cache file written by hash_tree function. 
+    The cache file is a tab-delimited file where each line consists of 
+    file name, file size, modification time, inode, algorithm, block 
+    size, number of start points, and generated hash.
+    
+    @param cachefile: name of cache file
+    @type cachefile: string
+    @return: dictionary of {<file name>: (<file size>, <modification 
+    time>, <inode>, <algorithm>, <block size>, <number of start points>, 
+    <generated hash>)}
+    '''
+    cache = {}
+    if cachefile == None or not os.path.exists(cachefile):
+        return cache
+    f = open(cachefile, 'r')
+    for row in csv.reader(f, delimiter='\t'):
+        if len(row) != 8: continue
+        cache[row[0]] = (int(row[1]), float(row[2]), int(row[3]), row[4], 
+                         int(row[5]), int(row[6]), row[7])
+    f.close()
+    return cache
+
+def write_hash_cache(cachefile, cache):
+    '''
+    Function to write a digest cache (see read_hash_cache function) into 
+    a cache file. The cache is written into a temporary file, which then 
+    replaces the cache file.
+    
+    @param cachefile: name of cache file
+    @type cachefile: string
+    @param cache: dictionary of {<file name>: (<file size>, <modification 
+    time>, <inode>, <algorithm>, <block size>, <number of start points>, 
+    <generated hash>)}
+    @type cache: dictionary
+    '''
+    f = open(cachefile + '.tmp', 'w')
+    writer = csv.writer(f, delimiter='\t', lineterminator='\n')
+    for filename in sorted(cache.keys()):
+        (size, mtime, inode, algorithm, blocksize, startpoints, 
+         digest) = cache[filename]
+        writer.writerow([filename, str(size), repr(mtime), str(inode), 
+                         algorithm, str(blocksize), str(startpoints), 
+                         digest])
+    f.close()
+    if os.path.exists(cachefile):
+        os.remove(cachefile)
+    os.rename(cachefile + '.tmp', cachefile)
+
+def hash_tree(paths,
+              blocksize=1024,
+              startpoints=10,
+              algorithm='md5',
+              cachefile=None,
+              processes=None):
+    '''
+    Circular file hasher for directories. This function walks 
+    through the given directories (and files) and generates the 
+    circular file hash (using fast_cfh function) of each file. 
+    This function is implemented as a generator, which yields 
+    the result of each file as it is completed.
+    
+    If a cache file is given, generated hashes are kept in the 
+    cache file by file name, together with the file size, 
+    modification time, inode, algorithm, block size and number 
+    of start points. Files which are not changed (having the 
+    same file size, modification time and inode) and hashed 
+    using the same algorithm, block size and number of start 
+    points will not be hashed again. Cached files which are no 
+    longer found under the given directories (and files) are 
+    removed from the cache. The cache file is written when the 
+    generator is completed or closed.
+    
+    >>> for (filename, digest, cached) in hash_tree(['/home/data'], 
+    ...                                             cachefile='data.cfh'):
+    ...     print(filename, digest)
+    
+    @param paths: list of directories or files to hash
+    @type paths: list
+    @param blocksize: block size for hash generation. 
+    Default = 1024
+    @type blocksize: integer
+    @param startpoints: defines the number of start point on
+    the file for hash generation. Default = 10.
+    @type startpoints: integer
+    @param algorithm: algorithm to generate hash. Allowable
+    options are {md5|sha1|sha224|sha256|sha384|sha512}
+    @type algorithm: string
+    @param cachefile: name of cache file. Default = None, no 
+    cache file is used
+    @type cachefile: string
+    @param processes: number of worker processes to generate 
+    hashes. Default = None, hashes are generated in the current 
+    process
+    @type processes: integer
+    @return: generator of (file name, generated hash or None if 
+    the file cannot be hashed, True if the hash is from cache)
+    '''
+    if isinstance(paths, str): paths = [paths]
+    blocksize = int(blocksize)
+    startpoints = int(startpoints)
+    cache = read_hash_cache(cachefile)
+    tasks = []
+    status = {}
+    roots = []
+    for path in paths:
+        roots.append(os.path.abspath(path))
+        if os.path.isfile(path):
+            filenames = [os.path.abspath(path)]
+        else:
+            filenames = [os.path.abspath(os.path.join(root, name))
+                         for (root, dirs, files) in os.walk(path)
+                             for name in files]
+        for filename in filenames:
+            try: stat = os.stat(filename)
+            except OSError: continue
+            status[filename] = (stat.st_size, stat.st_mtime, stat.st_ino, 
+                                algorithm, blocksize, startpoints)
+            if filename in cache and \
+                cache[filename][:6] == status[filename]:
+                continue
+            tasks.append((filename, blocksize, startpoints, algorithm))
+    for filename in list(cache.keys()):
+        if filename in status: continue
+        for root in roots:
+            if filename == root or \
+                filename.startswith(os.path.join(root, '')):
+                del cache[filename]
+                break
+    pool = None
+    try:
+        for filename in status:
+            if filename in cache and \
+                cache[filename][:6] == status[filename]:
+                yield (filename, cache[filename][6], True)
+        if processes == None:
+            results = (_tree_hash(task) for task in tasks)
+        else:
+            import multiprocessing
+            pool = multiprocessing.Pool(processes)
+            results = pool.imap_unordered(_tree_hash, tasks)
+        for (filename, digest) in results:
+            if digest != None:
+                cache[filename] = status[filename] + (digest,)
+            elif filename in cache:
+                del cache[filename]
+            yield (filename, digest, False)
+    finally:
+        if pool != None:
+            pool.terminate()
+            pool.join()
+        if cachefile != None:
+            write_hash_cache(cachefile, cache)
@@ -58,6 +58,11 @@ possible for 16 64-KB files is (9 x 10**837)**1350 or 1 x 10**1131238.
 import os
 import random
 import hashlib
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 
 class JigsawCore(object):
     '''
@@ -316,28 +321,102 @@ class JigsawCore(object):
         @return: a list of hashes - [md5, sha1, sha224, sha256, sha384, 
         sha512].
         '''
-        md5 = hashlib.md5()
-        sha1 = hashlib.sha1()
-        sha224 = hashlib.sha224()
-        sha256 = hashlib.sha256()
-        sha384 = hashlib.sha384()
-        sha512 = hashlib.sha512()
+        hashes = self.newHashes()
         f = open(filename, 'rb')
         block = True
         while block:
             block = f.read(4096)
-            md5.update(block)
-            sha1.update(block)
-            sha224.update(block)
-            sha256.update(block)
-            sha384.update(block)
-            sha512.update(block)
-        return [str(md5.hexdigest()),
-                str(sha1.hexdigest()),
-                str(sha224.hexdigest()),
-                str(sha256.hexdigest()),
-                str(sha384.hexdigest()),
-                str(sha512.hexdigest())]
+            self.updateHashes(hashes, block)
+        return [str(h.hexdigest()) for h in hashes]
+
+    def newHashes(self):
+        '''
+        Function to create a set of hash objects (md5, sha1, sha224, 
+        sha256, sha384, sha512) to generate file hashes incrementally, 
+        as in generateHash function.
+
+        @return: a list of hash objects - [md5, sha1, sha224, sha256, 
+        sha384, sha512].
+        '''
+        return [hashlib.md5(), hashlib.sha1(), hashlib.sha224(), 
+                hashlib.sha256(), hashlib.sha384(), hashlib.sha512()]
+
+    def updateHashes(self, hashes, block):
+        '''
+        Function to update a set of hash objects (from newHashes function) 
+        with the next block of data.
+
+        @param hashes: list of hash objects
+        @type hashes: list
+        @param block: data to be hashed
+        @type block: byte
+        '''
+        for h in hashes:
+            h.update(block)
+
+def _transformBlocks(version, hashlength, batch):
+    '''
+    Private function to be used by worker processes of pipelined 
+    encryption (see JigsawFile._encryptPipeline) to transform a batch of 
+    blocks and generate their truncated SHA256 hashes.
+    
+    @param version: Jigsaw version
+    @type version: string
+    @param hashlength: length of truncated hash
+    @type hashlength: integer
+    @param batch: list of (block sequence, reverse flag, swap flag, block)
+    @type batch: list
+    @return: list of (transformed block, truncated hash)
+    '''
+    jsys = JigsawFile()
+    results = []
+    for (count, reverse_flag, swap_flag, block) in batch:
+        if version in ('JigsawFileTWO', 'JigsawFileTHREE'):
+            block = jsys._blockReverse(block, reverse_flag)
+        if version == 'JigsawFileTHREE':
+            block = jsys._blockSwap(block, swap_flag)
+        hash = str(jsys.hash(block).hexdigest()[:hashlength])
+        results.append((block, hash))
+    return results
+
+def _reconstructBlocks(version, hashlength, decryptfilename, batch):
+    '''
+    Private function to be used by worker processes of parallel 
+    decryption (see JigsawFile._decryptParallel) to read a batch of 
+    blocks from Jigsaw files (or pack files), generate their truncated 
+    SHA256 hashes, reverse their transformations, and write them into 
+    the decrypted file at their offsets.
+    
+    @param version: Jigsaw version
+    @type version: string
+    @param hashlength: length of truncated hash
+    @type hashlength: integer
+    @param decryptfilename: name of (preallocated) decrypted file
+    @type decryptfilename: string
+    @param batch: list of (block sequence, path of Jigsaw file, size of 
+    block, reverse flag, swap flag, offset in decrypted file)
+    @type batch: list
+    @return: list of (block sequence, truncated hash, block)
+    '''
+    jsys = JigsawFile()
+    ofile = open(decryptfilename, 'r+b')
+    results = []
+    for (b, filename, blocksize, reverse_flag, swap_flag, offset) in batch:
+        block = jsys._readJigsawFile(filename, blocksize)
+        hash = str(jsys.hash(block).hexdigest()[:hashlength])
+        if version == 'JigsawFileTHREE':
+            block = jsys._blockSwap(block, swap_flag)
+        if version in ('JigsawFileTWO', 'JigsawFileTHREE'):
+            block = jsys._blockReverse(block, reverse_flag)
+        if hasattr(os, 'pwrite'):
+            os.pwrite(ofile.fileno(), block, offset)
+        else:
+            ofile.seek(offset)
+            ofile.write(block)
+        results.append((b, hash, block))
+    jsys._closePackFiles()
+    ofile.close()
+    return results
 
 class JigsawFile(JigsawCore):
     '''
@@ -408,6 +487,11 @@ class JigsawFile(JigsawCore):
         self.decryptfilename = ''
         self.verbose = 1
         self.header = {}
+        self.workers = 0
+        self.queuesize = 8
+        self.packsize = 0
+        self.pack = None
+        self.packs = {}
 
     def setting(self, key, value):
         '''
@@ -430,6 +514,21 @@ class JigsawFile(JigsawCore):
             - verbose: Set the verbosity from 1 (most information) onwards.
             - version: Set the Jigsaw version. Allowable values are 1 
             (version 1).
+            - workers: Set the number of worker processes to transform 
+            and hash blocks during encryption and decryption. Allowable 
+            values are any positive integer, or 0 (default) to encrypt 
+            and decrypt in a single process.
+            - queuesize: Set the maximum number of block batches held 
+            between the stages of pipelined encryption (when workers is 
+            more than 0). Allowable values are any positive integer. 
+            Default = 8.
+            - packsize: Set the maximum size of a pack file (in bytes). 
+            When more than 0, blocks are appended into pack files (file 
+            extension is '.jgp') instead of writing each block into a 
+            Jigsaw file, and the location of each block is kept in the 
+            keyfile as <name of pack file>@<offset>. Allowable values are 
+            any positive integer, or 0 (default) for one Jigsaw file per 
+            block.
         
         @param key: name of option to set.
         @type key: string
@@ -456,10 +555,19 @@ class JigsawFile(JigsawCore):
             self.hashlength = abs(int(value))
         elif key == 'verbose':
             self.verbose = abs(int(value))
+        elif key == 'workers':
+            self.workers = abs(int(value))
+        elif key == 'queuesize':
+            self.queuesize = max(1, abs(int(value)))
+        elif key == 'packsize':
+            self.packsize = abs(int(value))
 
-    def _generateFilename(self):
+    def _generateFilename(self, extension='.jig'):
         '''
         Private method to generate non-duplicating name for sub-files.
+        
+        @param extension: file extension. Default = '.jig' (Jigsaw file)
+        @type extension: string
         '''
         mapping = ['1', '2', '3', '4', '5', '6', '7', '8', '9', 'A',
                    'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K',
@@ -469,7 +577,7 @@ class JigsawFile(JigsawCore):
         while True:
             randomName = [self.rchoice(mapping) 
                           for i in range(self.filename_length)]
-            randomName = ''.join(randomName) + '.jig'
+            randomName = ''.join(randomName) + extension
             if randomName not in self.fileList:
                 self.fileList.append(randomName)
                 return randomName
@@ -578,7 +686,7 @@ class JigsawFile(JigsawCore):
         if self.verbose > 1 and (count % 1000 == 0):
             print('%s blocks processed' % str(count))
         
-    def _writeJigsawFile(self, block):
+    def _writeJigsawFile(self, block, hash=None):
         '''
         Private method to write a block into a Jigsaw file. A 
         truncated SHA1 hash of the block/Jigsaw file will be 
@@ -587,15 +695,86 @@ class JigsawFile(JigsawCore):
 
         @param block: data to be written into a Jigsaw file.
         @type block: byte
+        @param hash: truncated hash of block, if already generated. 
+        Default = None, hash will be generated.
+        @type hash: string
         @return: (hash, relative path of Jigsaw file)
         '''
+        if hash == None:
+            hash = str(self.hash(block).hexdigest()[:self.hashlength])
+        if self.packsize > 0:
+            return (hash, self._writePackFile(block))
         ofileName = self._generateFilename()
         ofile = open(self.outputdir + os.sep + ofileName, 'wb')
-        hash = str(self.hash(block).hexdigest()[:self.hashlength])
         ofile.write(block)
         ofile.close()
         return (hash, ofileName)
 
+    def _writePackFile(self, block):
+        '''
+        Private method to append a block into the current pack file. A 
+        new pack file will be started if the block cannot fit into the 
+        current pack file (within packsize).
+
+        @param block: data to be written into a pack file.
+        @type block: byte
+        @return: location of block as <name of pack file>@<offset>
+        '''
+        if self.pack != None and \
+            self.pack[2] > 0 and self.pack[2] + len(block) > self.packsize:
+            self._closePackFile()
+        if self.pack == None:
+            pfileName = self._generateFilename('.jgp')
+            pfile = open(self.outputdir + os.sep + pfileName, 'wb')
+            self.pack = [pfile, pfileName, 0]
+        (pfile, pfileName, offset) = self.pack
+        pfile.write(block)
+        self.pack[2] = offset + len(block)
+        return '@'.join([pfileName, str(offset)])
+
+    def _closePackFile(self):
+        '''
+        Private method to close the current pack file, if any.
+        '''
+        if self.pack != None:
+            self.pack[0].close()
+            self.pack = None
+
+    def _readJigsawFile(self, filename, blocksize):
+        '''
+        Private method to read a block from a Jigsaw file, or from a pack 
+        file if the file name is in the format of <name of pack file>@
+        <offset>. Pack files are kept open and read by offset (using 
+        os.pread where available) until _closePackFiles method.
+
+        @param filename: path of Jigsaw file or block location in pack 
+        file.
+        @type filename: string
+        @param blocksize: size of block (in bytes)
+        @type blocksize: integer
+        @return: block
+        '''
+        (directory, name) = os.path.split(filename)
+        if '@' not in name:
+            return open(filename, 'rb').read()
+        (name, offset) = name.rsplit('@', 1)
+        pfileName = os.path.join(directory, name)
+        if pfileName not in self.packs:
+            self.packs[pfileName] = open(pfileName, 'rb')
+        pfile = self.packs[pfileName]
+        if hasattr(os, 'pread'):
+            return os.pread(pfile.fileno(), int(blocksize), int(offset))
+        pfile.seek(int(offset))
+        return pfile.read(int(blocksize))
+
+    def _closePackFiles(self):
+        '''
+        Private method to close all pack files opened for decryption.
+        '''
+        for pfile in self.packs.values():
+            pfile.close()
+        self.packs = {}
+
     def _encrypt1(self, filename):
         '''
         Private method to run the operations for Jigsaw version 1 
@@ -1016,12 +1195,6 @@ class JigsawFile(JigsawCore):
                                   self.outputdir, ofileName, hash])
                 self.decryptkey.write(data + '\n')
                 self._encryptVerbosity(count, data)
-                (hash, ofileName) = self._writeJigsawFile(block)
-                data = '>>'.join(['AA', str(count), swap_flag, 
-                                  reverse_flag, str(len(block)), 
-                                  self.outputdir, ofileName, hash])
-                self.decryptkey.write(data + '\n')
-                self._encryptVerbosity(count, data)
                 count = count + 1
         if self.slicer == 'uneven':
             print('Processing using uneven slicer')
@@ -1038,14 +1211,125 @@ class JigsawFile(JigsawCore):
                                   self.outputdir, ofileName, hash])
                 self.decryptkey.write(data + '\n')
                 self._encryptVerbosity(count, data)
-                (hash, ofileName) = self._writeJigsawFile(block)
-                data = '>>'.join(['AA', str(count), swap_flag, 
-                                  reverse_flag, str(len(block)), 
-                                  self.outputdir, ofileName, hash])
-                self.decryptkey.write(data + '\n')
-                self._encryptVerbosity(count, data)
                 count = count + 1
 
+    def _keyRecord(self, count, reverse_flag, swap_flag, length, 
+                   ofileName, hash):
+        '''
+        Private method to generate the encryption coding of a block in 
+        the format of the Jigsaw version (please see _encrypt1, _encrypt2 
+        and _encrypt3 methods).
+        
+        @return: encryption coding
+        '''
+        if self.version == 'JigsawFileONE':
+            flags = []
+        elif self.version == 'JigsawFileTWO':
+            flags = [reverse_flag]
+        else:
+            flags = [swap_flag, reverse_flag]
+        return '>>'.join(['AA', str(count)] + flags + 
+                         [str(length), self.outputdir, ofileName, hash])
+
+    def _pipelineWriter(self, blocks, status):
+        '''
+        Private method for the writer stage of pipelined encryption (see 
+        _encryptPipeline method), to write transformed blocks into Jigsaw 
+        files and their encryption coding into keyfile, in block order.
+        
+        @param blocks: queue of (batch of (block sequence, reverse flag, 
+        swap flag, block), result of worker process); ended by None.
+        @type blocks: queue.Queue
+        @param status: list to hold any exception in writer stage
+        @type status: list
+        '''
+        while True:
+            item = blocks.get()
+            if item == None: break
+            if len(status) > 0: continue
+            (batch, result) = item
+            try:
+                results = result.get()
+                for i in range(len(batch)):
+                    (count, reverse_flag, swap_flag) = batch[i][:3]
+                    (block, hash) = results[i]
+                    (hash, ofileName) = self._writeJigsawFile(block, hash)
+                    data = self._keyRecord(count, reverse_flag, swap_flag, 
+                                           len(block), ofileName, hash)
+                    self.decryptkey.write(data + '\n')
+                    self._encryptVerbosity(count, data)
+            except Exception as e:
+                status.append(e)
+
+    def _encryptPipeline(self, filename):
+        '''
+        Private method to run the operations for Jigsaw encryption (all 
+        versions) as a pipeline of 3 stages - (1) a reader stage slicing 
+        the file into blocks and choosing the reverse and swap flags, 
+        (2) a pool of worker processes to transform and hash blocks, and 
+        (3) a writer stage (thread) to write Jigsaw files and keyfile in 
+        block order. Blocks are sent to worker processes in batches of 
+        about 1 MB, and each stage holds not more than queuesize batches.
+        
+        The encryption coding is the same as _encrypt1, _encrypt2 and 
+        _encrypt3 methods for Jigsaw version 1, 2 and 3 respectively.
+        
+        @param filename: name (absolute path or relative path) of file to 
+        be encrypted.
+        @type filename: string
+        '''
+        import multiprocessing
+        from collections import deque
+        if self.version == 'JigsawFileTWO' and self.block_size < 4096:
+            self.block_size = 4096
+        if self.version == 'JigsawFileTHREE' and self.block_size < 16384:
+            self.block_size = 16384
+        if self.slicer == 'even':
+            print('Processing using even slicer')
+            slicer = self.evenSlicer(self.filename, self.block_size)
+        else:
+            print('Processing using uneven slicer')
+            slicer = self.unevenSlicer(self.filename, self.block_size, 
+                                       self.block_size*2)
+        print('Processing using %s worker processes' % str(self.workers))
+        pool = multiprocessing.Pool(self.workers)
+        blocks = queue.Queue(self.queuesize)
+        status = []
+        writer = threading.Thread(target=self._pipelineWriter, 
+                                  args=(blocks, status))
+        writer.start()
+        batchsize = max(1, int(1048576 / self.block_size))
+        pending = deque()
+        batch = []
+        count = 0
+        try:
+            for block in slicer:
+                if len(status) > 0: break
+                reverse_flag = self.rchoice(self.reverseOptions)
+                swap_flag = 'S' + self.rchoice(self.swapSize)
+                batch.append((count, reverse_flag, swap_flag, block))
+                count = count + 1
+                if len(batch) < batchsize: continue
+                result = pool.apply_async(_transformBlocks, 
+                    (self.version, self.hashlength, batch))
+                pending.append((batch, result))
+                batch = []
+                if len(pending) >= self.queuesize:
+                    blocks.put(pending.popleft())
+            if len(batch) > 0 and len(status) == 0:
+                result = pool.apply_async(_transformBlocks, 
+                    (self.version, self.hashlength, batch))
+                pending.append((batch, result))
+            while len(pending) > 0:
+                blocks.put(pending.popleft())
+        finally:
+            blocks.put(None)
+            writer.join()
+            pool.close()
+            pool.join()
+        if len(status) > 0:
+            raise status[0]
+
     def encrypt(self, filename, outputdir=''):
         '''
         Function to run encryption.
@@ -1077,6 +1361,7 @@ class JigsawFile(JigsawCore):
         self._addHeader('inputdir', self.inputdir)
         self._addHeader('infile', filename)
         self._addHeader('hashlength', str(self.hashlength))
+        self._addHeader('packsize', str(self.packsize))
         self._addHeader('md5', self.checksums[0])
         self._addHeader('sha1', self.checksums[1])
         self._addHeader('sha224', self.checksums[2])
@@ -1084,12 +1369,15 @@ class JigsawFile(JigsawCore):
         self._addHeader('sha384', self.checksums[4])
         self._addHeader('sha512', self.checksums[5])
         keyFileName = self._writeKeyHeader()
-        if self.version == 'JigsawFileONE': 
+        if self.workers > 0:
+            self._encryptPipeline(self.filename)
+        elif self.version == 'JigsawFileONE': 
             self._encrypt1(self.filename)
-        if self.version == 'JigsawFileTWO': 
+        elif self.version == 'JigsawFileTWO': 
             self._encrypt2(self.filename)
-        if self.version == 'JigsawFileTHREE': 
+        elif self.version == 'JigsawFileTHREE': 
             self._encrypt3(self.filename)
+        self._closePackFile()
         self.decryptkey.close()
         print('')
         return keyFileName
@@ -1268,7 +1556,7 @@ class JigsawFile(JigsawCore):
             filename = self.keycode[b][2]
             filename = os.sep.join([self.inputdir, filename])
             blocksize = self.keycode[b][0]
-            block = open(filename, 'rb').read()
+            block = self._readJigsawFile(filename, blocksize)
             hash = str(self.hash(block).hexdigest()[:self.hashlength])
             ofile.write(block)
             data = '>>'.join([str(b), filename, 
@@ -1296,7 +1584,7 @@ class JigsawFile(JigsawCore):
             filename = self.keycode[b][3]
             filename = os.sep.join([self.inputdir, filename])
             blocksize = self.keycode[b][1]
-            block = open(filename, 'rb').read()
+            block = self._readJigsawFile(filename, blocksize)
             hash = str(self.hash(block).hexdigest()[:self.hashlength])
             block = self._blockReverse(block, self.keycode[b][0])
             ofile.write(block)
@@ -1325,7 +1613,7 @@ class JigsawFile(JigsawCore):
             filename = self.keycode[b][4]
             filename = os.sep.join([self.inputdir, filename])
             blocksize = self.keycode[b][2]
-            block = open(filename, 'rb').read()
+            block = self._readJigsawFile(filename, blocksize)
             hash = str(self.hash(block).hexdigest()[:self.hashlength])
             block = self._blockSwap(block, self.keycode[b][0])
             block = self._blockReverse(block, self.keycode[b][1])
@@ -1340,12 +1628,93 @@ class JigsawFile(JigsawCore):
         self._decryptSummary(len(block_sequence), expected, actual)
         ofile.close()
 
-    def _compareHash(self):
+    def _decryptParallel(self):
+        '''
+        Private method to run the operations for Jigsaw decryption (all 
+        versions) using a pool of worker processes. The decrypted file is 
+        preallocated, and each worker process reconstructs batches of 
+        blocks and writes them at their offsets in the decrypted file 
+        (which are known from the sizes of blocks in the keyfile). File 
+        hashes of the decrypted file are generated as blocks are 
+        returned in block order; hence, the decrypted file is not read 
+        again by _compareHash method. Not more than queuesize batches 
+        are held at any time.
+        '''
+        import multiprocessing
+        from collections import deque
+        print('Decrypting file using %s worker processes ......' % 
+              str(self.workers))
+        version = self.keyhead['version']
+        self.keycode = self.keycode['AA']
+        block_sequence = sorted(self.keycode.keys())
+        # position of (size of block, name of Jigsaw file) in keycode
+        position = {'JigsawFileONE': 0, 
+                    'JigsawFileTWO': 1, 
+                    'JigsawFileTHREE': 2}[version]
+        tasks = []
+        offset = 0
+        for b in block_sequence:
+            code = self.keycode[b]
+            filename = os.sep.join([self.inputdir, code[position+2]])
+            blocksize = int(code[position])
+            if version == 'JigsawFileTWO': 
+                flags = (code[0], None)
+            elif version == 'JigsawFileTHREE': 
+                flags = (code[1], code[0])
+            else:
+                flags = (None, None)
+            tasks.append((b, filename, blocksize) + flags + (offset,))
+            offset = offset + blocksize
+        ofile = open(self.decryptfilename, 'wb')
+        ofile.truncate(offset)
+        ofile.close()
+        batchsize = max(1, int(1048576 / max(1, int(offset / 
+                                                    max(1, len(tasks))))))
+        pool = multiprocessing.Pool(self.workers)
+        pending = deque()
+        hashes = self.newHashes()
+        actual = 0
+        expected = 0
+        start = 0
+        while start < len(tasks) or len(pending) > 0:
+            while start < len(tasks) and len(pending) < self.queuesize:
+                batch = tasks[start:start+batchsize]
+                pending.append(pool.apply_async(_reconstructBlocks, 
+                    (version, self.hashlength, self.decryptfilename, 
+                     batch)))
+                start = start + batchsize
+            for (b, hash, block) in pending.popleft().get():
+                self.updateHashes(hashes, block)
+                code = self.keycode[b]
+                filename = os.sep.join([self.inputdir, code[position+2]])
+                data = '>>'.join([str(b)] + code[:position] + 
+                                 [filename, code[position], str(len(block)),
+                                  code[position+3], hash])
+                expected = expected + int(code[position])
+                actual = actual + len(block)
+                self._decryptVerbosity(b, data)
+        pool.close()
+        pool.join()
+        if actual != expected:
+            # Blocks of unexpected sizes are not at their offsets
+            ofile = open(self.decryptfilename, 'r+b')
+            ofile.truncate(actual)
+            ofile.close()
+        self._decryptSummary(len(block_sequence), expected, actual)
+        self.checksums = [str(h.hexdigest()) for h in hashes]
+
+    def _compareHash(self, checksums=None):
         '''
         Private method to print out a series of file hashes from the 
         expected decrypted file and the actual decrypted file.
+
+        @param checksums: file hashes of the decrypted file, if already 
+        generated. Default = None, decrypted file will be hashed.
+        @type checksums: list
         '''
-        self.checksums = self.generateHash(self.decryptfilename)
+        if checksums == None:
+            checksums = self.generateHash(self.decryptfilename)
+        self.checksums = checksums
         print('File Hashs (Decrypted File vs Original Unencrypted File)')
         self.decryptkey.write('File Hashs (Decrypted File vs Original Unencrypted File) \n')
         print('md5: %s' % self.checksums[0])
@@ -1401,11 +1770,17 @@ class JigsawFile(JigsawCore):
         print('... Uncrypted file name (output): %s' % 
             self.decryptfilename)
         self.decryptkey = open(self.decryptfilename + '.jkd', 'w')
+        if self.workers > 0:
+            self._decryptParallel()
+            self._compareHash(self.checksums)
+            self.decryptkey.close()
+            return
         if self.keyhead['version'] == 'JigsawFileONE': 
             self._decrypt1()
         if self.keyhead['version'] == 'JigsawFileTWO': 
             self._decrypt2()
         if self.keyhead['version'] == 'JigsawFileTHREE': 
             self._decrypt3()
+        self._closePackFiles()
         self._compareHash()
         self.decryptkey.close()
@@ -5,7 +5,9 @@ Copyright (c) Maurice H.T. Ling <mauriceling@acm.org>
 
 Date created: 4th January 2015
 '''
+import math
 import random
+import struct
 
 import constants
 
@@ -115,6 +117,9 @@ class lindenmayer(object):
         '''
         self.command_length = command_length
         self.rules = []
+        self.plan = None
+        self.axiom = None
+        self.lazy = None
     
     def add_rules(self, rules):
         '''
@@ -156,8 +161,94 @@ class lindenmayer(object):
                 # [predicate, function, priority, 'function']
                 self.rules.append([x[0], x[1], int(x[2]), x[3], None])
         self.priority_levels = [x[2] for x in self.rules][-1]
-         
-    def _apply_priority_rules(self, priority, data_string):
+        self.plan = None
+
+    def _priority_rules(self, priority):
+        '''
+        Private method - to index production rules of a particular priority 
+        by their domain (predicate), keeping the order of rules of the 
+        same domain.
+        
+        @param priority: order of priority
+        @type priority: integer
+        @return: dictionary of {<domain>: <list of rules>}
+        '''
+        index = {}
+        for rule in self.rules:
+            if rule[2] == int(priority):
+                if rule[0] not in index: index[rule[0]] = []
+                index[rule[0]].append(rule)
+        return index
+
+    def _translation_table(self, index):
+        '''
+        Private method - to convert indexed production rules into a 
+        translation table of {<symbol>: <replacement>} if all the rules 
+        are deterministic single-symbol replacement rules. 
+        
+        @param index: dictionary of {<domain>: <list of rules>} from 
+        _priority_rules method
+        @type index: dictionary
+        @return: translation table, or None if the rules cannot be 
+        expressed as a translation table
+        '''
+        if self.command_length != 1: return None
+        table = {}
+        for cmd in index:
+            rule = index[cmd][0]
+            if rule[3] != 'replacement': return None
+            if rule[1] == None: table[cmd] = ''
+            else: table[cmd] = rule[1]
+        return table
+
+    def _compile_rules(self):
+        '''
+        Private method - to compile production rules into a plan of 
+        rewriting passes, one pass for each priority level. Consecutive 
+        priority levels of deterministic single-symbol replacement rules 
+        are merged into a single translation table; hence, rewritten in 
+        a single pass.
+        
+        @return: list of ('translate', <translation table>) or ('rules', 
+        <dictionary of {<domain>: <list of rules>}>)
+        '''
+        plan = []
+        for priority in list(range(1, self.priority_levels+1)):
+            index = self._priority_rules(priority)
+            table = self._translation_table(index)
+            if table == None:
+                plan.append(('rules', index))
+            elif len(plan) > 0 and plan[-1][0] == 'translate':
+                previous = plan[-1][1]
+                merged = dict([(cmd, self._translate(previous[cmd], table))
+                               for cmd in previous])
+                for cmd in table:
+                    if cmd not in merged: merged[cmd] = table[cmd]
+                plan[-1] = ('translate', merged)
+            else:
+                plan.append(('translate', table))
+        return plan
+
+    def _translate(self, data_string, table):
+        '''
+        Private method - to rewrite a data or symbol string using a 
+        translation table of deterministic single-symbol replacement 
+        rules.
+        
+        @param data_string: data or symbol string to be processed
+        @type data_string: string
+        @param table: translation table of {<symbol>: <replacement>}
+        @type table: dictionary
+        @return: rewritten data_string
+        '''
+        try:
+            return data_string.translate(dict([(ord(cmd), table[cmd]) 
+                                               for cmd in table]))
+        except TypeError:
+            # Python 2 byte strings do not take a dictionary
+            return ''.join([table.get(cmd, cmd) for cmd in data_string])
+
+    def _apply_priority_rules(self, priority, data_string, index=None):
         '''
         Private method - to be used by apply_rules method to apply production 
         rules of a particular priority.
@@ -166,46 +257,205 @@ class lindenmayer(object):
         @type priority: integer
         @param data_string: data or symbol string to be processed
         @type data_string: string
+        @param index: production rules of the priority, indexed by domain 
+        (from _priority_rules method). Default = None, production rules 
+        will be indexed from priority
+        @type index: dictionary
         @return: rewritten data_string
         '''
-        rules = [x for x in self.rules if x[2] == int(priority)]
-        ndata = ''
-        pointer = 0
-        while pointer < len(data_string):
-            cmd = data_string[pointer:pointer+self.command_length]
-            for rule in rules:
-                if cmd == rule[0] and rule[3] == 'replacement':
+        if index == None: index = self._priority_rules(priority)
+        ndata = []
+        length = self.command_length
+        for pointer in range(0, len(data_string), length):
+            cmd = data_string[pointer:pointer+length]
+            for rule in index.get(cmd, []):
+                if rule[3] == 'replacement':
                     cmd = rule[1]
                     break
-                if cmd == rule[0] and rule[3] == 'probability' \
-                and random.random() < x[4]:
+                if rule[3] == 'probability' and random.random() < rule[4]:
                     cmd = rule[1]
                     break
-                if cmd == rule[0] and rule[3] == 'function':
+                if rule[3] == 'function':
                     cmd = rule[1](data_string, pointer)
                     break
             if cmd == None: cmd = ''
-            ndata = ndata + cmd
-            pointer = pointer + self.command_length
-        return ndata
+            ndata.append(cmd)
+        return ''.join(ndata)
             
     def _apply_rules(self, data_string):
         '''
         Private method - to apply all production rules on axiom string (in 
         the first generation) or data/symbol string (in the subsequent 
         generations).
-        This method is implemented as a generator.
         
         @param data_string: data or symbol string to be processed
         @type data_string: string
         @return: rewritten data_string
         '''
-        for priority in list(range(1, self.priority_levels+1)):
-            data_string = self._apply_priority_rules(priority, 
-                                                     data_string)
+        if self.plan == None: self.plan = self._compile_rules()
+        for (mode, rules) in self.plan:
+            if mode == 'translate':
+                data_string = self._translate(data_string, rules)
+            else:
+                data_string = self._apply_priority_rules(None, data_string, 
+                                                         rules)
         return data_string
 
-    def generate(self, axiom, iterations):
+    def apply_rules(self, data_string):
+        '''
+        Method to apply all production rules on a data or symbol string 
+        for one generation.
+        
+        @param data_string: data or symbol string to be processed
+        @type data_string: string
+        @return: rewritten data_string
+        '''
+        return self._apply_rules(data_string)
+
+    def _split(self, data_string):
+        '''
+        Private method - to split a data or symbol string into a list of 
+        instructions or commands of command_length.
+        
+        @param data_string: data or symbol string to be processed
+        @type data_string: string
+        @return: list of instructions or commands
+        '''
+        length = self.command_length
+        if len(data_string) % length != 0:
+            raise ValueError('Length of data string, %s, is not a multiple \
+of command length, %s' % (data_string, str(length)))
+        return [data_string[pointer:pointer+length]
+                for pointer in range(0, len(data_string), length)]
+
+    def _stream_passes(self):
+        '''
+        Private method - to prepare production rules for depth-first 
+        expansion as a list of rewriting passes, one pass for each priority 
+        level. Each pass is a dictionary of {<instruction>: <list of 
+        (<rule type>, <list of instructions>, <probability>)>}.
+        
+        @return: list of rewriting passes
+        '''
+        passes = []
+        for priority in list(range(1, self.priority_levels+1)):
+            index = self._priority_rules(priority)
+            rewrite = {}
+            for cmd in index:
+                rewrite[cmd] = []
+                for rule in index[cmd]:
+                    if rule[3] == 'function':
+                        raise ValueError('Function rule, %s, requires the \
+entire data string and cannot be expanded depth-first' % str(rule))
+                    if rule[1] == None: symbols = []
+                    else: symbols = self._split(rule[1])
+                    rewrite[cmd].append((rule[3], symbols, rule[4]))
+            passes.append(rewrite)
+        return passes
+
+    def _rewrite_symbol(self, rewrite, cmd):
+        '''
+        Private method - to rewrite an instruction or command by a 
+        rewriting pass from _stream_passes method.
+        
+        @return: list of instructions or commands
+        '''
+        for (rtype, symbols, probability) in rewrite.get(cmd, []):
+            if rtype == 'replacement':
+                return symbols
+            if rtype == 'probability' and random.random() < probability:
+                return symbols
+        return [cmd]
+
+    def _expansion(self, levels, cmd, level, cache, cache_length):
+        '''
+        Private method - to fully expand an instruction or command from a 
+        level of deterministic rewriting passes, if the expansion is not 
+        longer than cache_length. Expansions are memoized in cache.
+        
+        @return: expanded string or None if the expansion is too long
+        '''
+        key = (cmd, level)
+        if key not in cache:
+            if level == len(levels):
+                cache[key] = cmd
+            else:
+                expansion = []
+                total = 0
+                for child in self._rewrite_symbol(levels[level], cmd):
+                    child = self._expansion(levels, child, level + 1, 
+                                            cache, cache_length)
+                    if child == None: break
+                    total = total + len(child)
+                    if total > cache_length: break
+                    expansion.append(child)
+                else:
+                    cache[key] = ''.join(expansion)
+                if key not in cache:
+                    cache[key] = None
+        return cache[key]
+
+    def stream(self, axiom, iterations, cache_length=4096):
+        '''
+        Method to apply all production rules on an initial axiom string 
+        over a number of iterations, as a generator which yields the 
+        instructions or commands of the final iteration in order without 
+        creating the data or symbol string of any iteration. 
+        
+        This is done by depth-first expansion of each instruction or 
+        command through the rewriting passes of all iterations, one 
+        rewriting pass for each priority level. Hence, memory usage 
+        depends on the number of iterations rather than the length of 
+        the final data or symbol string. Expansions of instructions or 
+        commands which are not longer than cache_length are cached when 
+        all the remaining rewriting passes are deterministic 
+        (replacement rules).
+        
+        Only replacement and probability rules can be expanded in this 
+        manner, as function rules require the entire data or symbol 
+        string. Probability rules are decided for each instruction or 
+        command as it is expanded; hence, the random numbers are drawn 
+        in a different order from generate method.
+        
+        >>> for cmd in l.stream('F', 15): print(cmd)
+        
+        @param axiom: data or symbol string to be processed
+        @type axiom: string
+        @param iterations: number of repetitions / iterations
+        @type iterations: integer
+        @param cache_length: maximum length of each cached expansion. 
+        Default = 4096. Set to 0 to disable caching
+        @type cache_length: integer
+        @return: generator of instructions or commands
+        '''
+        levels = self._stream_passes() * int(iterations)
+        deterministic = len(levels)
+        while deterministic > 0:
+            rewrite = levels[deterministic-1]
+            if [1 for cmd in rewrite if rewrite[cmd][0][0] != 'replacement']:
+                break
+            deterministic = deterministic - 1
+        cache = {}
+        stack = [(iter(self._split(axiom)), 0)]
+        while len(stack) > 0:
+            (symbols, level) = stack[-1]
+            cmd = next(symbols, None)
+            if cmd == None:
+                stack.pop()
+            elif level == len(levels):
+                yield cmd
+            else:
+                expansion = None
+                if cache_length > 0 and level >= deterministic:
+                    expansion = self._expansion(levels, cmd, level, 
+                                                cache, cache_length)
+                if expansion != None:
+                    for cmd in self._split(expansion): yield cmd
+                else:
+                    symbols = self._rewrite_symbol(levels[level], cmd)
+                    stack.append((iter(symbols), level + 1))
+
+    def generate(self, axiom, iterations, lazy=False):
         '''
         Method to apply all production rules on an initial axiom string 
         over a number of iterations.
@@ -214,8 +464,18 @@ class lindenmayer(object):
         @type axiom: string
         @param iterations: number of repetitions / iterations
         @type iterations: integer
-        @return: rewritten axiom
+        @param lazy: flag to expand the axiom depth-first (see stream 
+        method) instead of rewriting the entire data or symbol string 
+        in each iteration. Default = False
+        @type lazy: boolean
+        @return: rewritten axiom, or generator of instructions or 
+        commands of rewritten axiom if lazy is True
         '''
+        if lazy:
+            self.axiom = None
+            self.lazy = (axiom, int(iterations))
+            return self.stream(axiom, iterations)
+        self.lazy = None
         self.axiom = axiom
         iterations = int(iterations)
         count = 1
@@ -226,6 +486,14 @@ class lindenmayer(object):
             count = count + 1                   
         return self.axiom
 
+    def _filter_stream(self, data_string, mapping):
+        '''
+        Private method - to consume streamed instructions or commands one 
+        at a time, skipping those which are not in mapping.
+        '''
+        for cmd in data_string:
+            if cmd in mapping: yield cmd
+
     def turtle_generate(self, scriptfile=None, imagefile=None, 
                         start=(0, 0), mapping={}, data_string=None):
         '''
@@ -305,10 +573,13 @@ class lindenmayer(object):
         @param mapping: map to convert the symbol string into Turtle 
         commands. Please see explanation above.
         @type mapping: dictionary
-        @param data_string: data or symbol string to be processed. Default = 
-        None, internally stored axiom string (by lindenmayer.generate() 
-        method) will be used instead.
-        @type data_string: string
+        @param data_string: data or symbol string, or iterator of 
+        instructions or commands (such as from lindenmayer.stream() 
+        method), to be processed. Default = None, internally stored axiom 
+        string (by lindenmayer.generate() method) will be used instead; 
+        or expanded depth-first again if lindenmayer.generate() method 
+        is lazy.
+        @type data_string: string or iterator
         @return: Python script file of Turtle commands
         '''
         if len(mapping) == 0:
@@ -326,7 +597,9 @@ class lindenmayer(object):
                        'H': 'home',
                        '[': 'push',
                        ']': 'pop'}
-        if data_string == None:
+        if data_string == None and self.lazy != None:
+            data_string = self.stream(self.lazy[0], self.lazy[1])
+        elif data_string == None:
             data_string = self.axiom
         stack = []
         if 'random_angle' not in mapping: 
@@ -339,14 +612,20 @@ class lindenmayer(object):
             mapping['set_colour'] = 'black'
         if 'background_colour' not in mapping: 
             mapping['background_colour'] = 'ivory'
-        data_string = [cmd for cmd in data_string if cmd in mapping]
+        if hasattr(data_string, '__len__'):
+            data_string = [cmd for cmd in data_string if cmd in mapping]
+        else:
+            data_string = self._filter_stream(data_string, mapping)
         if scriptfile != None:
             f = open(scriptfile, 'w')
             f.write("''' \n")
             f.write('Turtle Graphics Generation from Lindenmayer System \n')
             f.write('in COPADS (http://github.com/copads/copads) \n\n')
-            f.write('Code length = %s \n' % str(len(data_string)))
-            f.write('Code string = %s \n' % ''.join(data_string))
+            if isinstance(data_string, list):
+                f.write('Code length = %s \n' % str(len(data_string)))
+                f.write('Code string = %s \n' % ''.join(data_string))
+            else:
+                f.write('Code string = streamed \n')
             f.write('Code mapping = %s \n' % (mapping))
             f.write("''' \n\n")
             f.write('import turtle \n\n')
@@ -444,3 +723,284 @@ class lindenmayer(object):
             f.write('t.hideturtle() \n')
             f.write('turtle.done() \n')
             f.close()
+
+    def _turtle_mapping(self, mapping):
+        '''
+        Private method - to complete a mapping dictionary for Turtle 
+        commands (please see turtle_generate method) with the default 
+        settings.
+        
+        @param mapping: map to convert the symbol string into Turtle 
+        commands
+        @type mapping: dictionary
+        @return: completed mapping dictionary
+        '''
+        if len(mapping) == 0:
+            mapping = {'set_angle': 90,
+                       'set_distance': 1,
+                       'F': 'forward',
+                       'B': 'backward',
+                       'R': 'right',
+                       'L': 'left',
+                       'H': 'home',
+                       '[': 'push',
+                       ']': 'pop'}
+        mapping = dict(mapping)
+        if 'random_angle' not in mapping: 
+            mapping['random_angle'] = 0
+        if 'random_distance' not in mapping: 
+            mapping['random_distance'] = 0
+        if 'set_heading' not in mapping: 
+            mapping['set_heading'] = 0
+        if 'set_colour' not in mapping: 
+            mapping['set_colour'] = 'black'
+        if 'background_colour' not in mapping: 
+            mapping['background_colour'] = 'ivory'
+        return mapping
+
+    def _turtle_path(self, data_string, mapping, start):
+        '''
+        Private method - to interpret the data or symbol string as Turtle 
+        commands into path geometry without Turtle graphics. This method 
+        is implemented as a generator of drawing operations:
+            - ('M', x, y) to move to (x, y) without drawing
+            - ('L', x, y) to draw a line to (x, y)
+            - ('C', colour) to change the pen colour
+        
+        Consecutive moves in the same direction are coalesced into one 
+        line. Coordinates are in Turtle coordinates (y-axis pointing 
+        upwards).
+        
+        @param data_string: data or symbol string, or iterator of 
+        instructions or commands
+        @param mapping: completed map to convert the symbol string into 
+        Turtle commands
+        @type mapping: dictionary
+        @param start: starting or home coordinate
+        @type start: tuple
+        '''
+        (x, y) = (float(start[0]), float(start[1]))
+        heading = float(mapping['set_heading'])
+        pen = True
+        stack = []
+        direction = None
+        yield ('C', mapping['set_colour'])
+        yield ('M', x, y)
+        for cmd in data_string:
+            if cmd not in mapping: continue
+            command = mapping[cmd]
+            if command in ('forward', 'backward'):
+                distance = mapping['set_distance'] + \
+                           random.random()*mapping['random_distance']
+                if command == 'backward':
+                    move = (heading + 180.0) % 360.0
+                else:
+                    move = heading % 360.0
+                x = x + distance * math.cos(math.radians(move))
+                y = y + distance * math.sin(math.radians(move))
+                if not pen:
+                    continue
+                if direction != None and abs(direction - move) > 1e-9:
+                    yield ('L', previous[0], previous[1])
+                direction = move
+                previous = (x, y)
+                continue
+            if direction != None and \
+                command not in ('push', 'right', 'left'):
+                # Commands other than turns and push end the current line
+                yield ('L', previous[0], previous[1])
+                direction = None
+            if command == 'right':
+                heading = heading - mapping['set_angle'] - \
+                          random.random()*mapping['random_angle']
+            elif command == 'left':
+                heading = heading + mapping['set_angle'] + \
+                          random.random()*mapping['random_angle']
+            elif command == 'push':
+                stack.append((x, y, heading))
+            elif command == 'pop':
+                try:
+                    (x, y, heading) = stack.pop()
+                    pen = True
+                    yield ('M', x, y)
+                except IndexError: pass
+            elif command == 'home':
+                (x, y) = (float(start[0]), float(start[1]))
+                pen = True
+                yield ('M', x, y)
+            elif command == 'penup':
+                pen = False
+            elif command == 'pendown':
+                if not pen: yield ('M', x, y)
+                pen = True
+            elif command in constants.TKColours:
+                yield ('C', command)
+                yield ('M', x, y)
+        if direction != None:
+            yield ('L', previous[0], previous[1])
+
+    def svg_generate(self, imagefile, start=(0, 0), mapping={}, 
+                     data_string=None, precision=3, format='svg', 
+                     margin=10):
+        '''
+        Method to render the data or symbol string directly into vector 
+        graphics, without Turtle graphics or TK; hence, no display is 
+        needed. The data or symbol string is interpreted as Turtle 
+        commands in the same way as turtle_generate method (please see 
+        turtle_generate method for the mapping dictionary), with 'U' 
+        and 'D' as pen up and pen down, and written out in a single pass. 
+        Consecutive moves in the same direction are coalesced into one 
+        line.
+        
+        Two output formats are available:
+            - 'svg': SVG image with one path element for each pen 
+            colour. The view box is written when the entire data or 
+            symbol string is processed.
+            - 'binary': binary file of drawing operations, starting 
+            with a header of 'CPLS' and the number of operations (struct 
+            format of '=4si'), followed by each operation (struct format 
+            of '=cdd') of 'M' (move to x, y), 'L' (line to x, y) or 'C' 
+            (change pen colour to TKColours[x] in constants module). 
+            Coordinates are Turtle coordinates (y-axis pointing upwards).
+        
+        >>> l.generate('F', 15, lazy=True)
+        >>> l.svg_generate('fractal.svg', mapping=mapping)
+        
+        @param imagefile: file name to write out the image
+        @type imagefile: string
+        @param start: starting or home coordinate. Default = (0, 0)
+        @type start: tuple
+        @param mapping: map to convert the symbol string into Turtle 
+        commands. Please see turtle_generate method.
+        @type mapping: dictionary
+        @param data_string: data or symbol string, or iterator of 
+        instructions or commands (such as from lindenmayer.stream() 
+        method), to be processed. Default = None, internally stored axiom 
+        string (by lindenmayer.generate() method) will be used instead; 
+        or expanded depth-first again if lindenmayer.generate() method 
+        is lazy.
+        @type data_string: string or iterator
+        @param precision: number of decimal places of SVG coordinates. 
+        Default = 3
+        @type precision: integer
+        @param format: output format, 'svg' or 'binary'. Default = 'svg'
+        @type format: string
+        @param margin: margin around the drawing in SVG image. Default = 10
+        @type margin: float
+        @return: number of drawing operations written
+        '''
+        mapping = self._turtle_mapping(mapping)
+        if data_string == None and self.lazy != None:
+            data_string = self.stream(self.lazy[0], self.lazy[1])
+        elif data_string == None:
+            data_string = self.axiom
+        operations = self._turtle_path(data_string, mapping, start)
+        if format == 'binary':
+            return self._write_binary_path(imagefile, operations)
+        elif format == 'svg':
+            return self._write_svg_path(imagefile, operations, mapping, 
+                                        precision, margin)
+        raise ValueError('Unknown output format, %s. Output format can \
+only be svg or binary' % str(format))
+
+    def _write_binary_path(self, imagefile, operations):
+        '''
+        Private method - to write drawing operations from _turtle_path 
+        method into a binary file. Please see svg_generate method for 
+        the file format.
+        '''
+        f = open(imagefile, 'wb')
+        f.write(struct.pack('=4si', b'CPLS', 0))
+        count = 0
+        buffer = []
+        for operation in operations:
+            if operation[0] == 'C':
+                colour = constants.TKColours.index(operation[1])
+                buffer.append(struct.pack('=cdd', b'C', colour, 0.0))
+            else:
+                buffer.append(struct.pack('=cdd', operation[0].encode(), 
+                                          operation[1], operation[2]))
+            count = count + 1
+            if len(buffer) == 4096:
+                f.write(b''.join(buffer))
+                buffer = []
+        f.write(b''.join(buffer))
+        f.seek(0)
+        f.write(struct.pack('=4si', b'CPLS', count))
+        f.close()
+        return count
+
+    def _write_svg_path(self, imagefile, operations, mapping, precision, 
+                        margin):
+        '''
+        Private method - to write drawing operations from _turtle_path 
+        method into a SVG image. As the extent of the drawing is only 
+        known at the end, space is reserved for the view box, which is 
+        written in after all the drawing operations. The view box is 
+        written with 2 decimal places; or, if that does not fit into the 
+        reserved space, with the shortest representation of each float 
+        (which always fits).
+        '''
+        viewbox = 'width="%s" height="%s" viewBox="%s %s %s %s"'
+        # Longest representation of a float, 24 characters
+        reserve = len(viewbox % (('-2.2250738585072014e-308',) * 6)) + 1
+        f = open(imagefile, 'w')
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        f.write('<svg xmlns="http://www.w3.org/2000/svg" version="1.1" ')
+        position = f.tell()
+        f.write(' ' * reserve)
+        f.write('style="background-color:%s">\n' % 
+                mapping['background_colour'])
+        point = ' %.' + str(int(precision)) + 'f %.' + \
+                str(int(precision)) + 'f'
+        (xmin, xmax, ymin, ymax) = (None, None, None, None)
+        count = 0
+        buffer = []
+        opened = False
+        for operation in operations:
+            count = count + 1
+            if operation[0] == 'C':
+                if opened: buffer.append('"/>\n')
+                buffer.append('<path fill="none" stroke="%s" \
+stroke-linecap="round" stroke-linejoin="round" d="' % operation[1])
+                opened = True
+                moved = None
+                continue
+            (x, y) = (operation[1], 0.0 - operation[2])
+            if operation[0] == 'M':
+                # Only the last of consecutive moves is needed
+                moved = (x, y)
+                continue
+            if moved != None:
+                buffer.append('M' + point % moved)
+                if xmin == None: 
+                    (xmin, xmax, ymin, ymax) = (moved[0], moved[0], 
+                                                moved[1], moved[1])
+                xmin = min(xmin, moved[0])
+                xmax = max(xmax, moved[0])
+                ymin = min(ymin, moved[1])
+                ymax = max(ymax, moved[1])
+                moved = None
+            buffer.append('L' + point % (x, y))
+            xmin = min(xmin, x)
+            xmax = max(xmax, x)
+            ymin = min(ymin, y)
+            ymax = max(ymax, y)
+            if len(buffer) > 4096:
+                f.write(''.join(buffer))
+                buffer = []
+        if opened: buffer.append('"/>\n')
+        buffer.append('</svg>\n')
+        f.write(''.join(buffer))
+        if xmin == None: (xmin, xmax, ymin, ymax) = (0, 0, 0, 0)
+        width = xmax - xmin + 2 * margin
+        height = ymax - ymin + 2 * margin
+        values = [float(v) for v in (width, height, xmin - margin, 
+                                     ymin - margin, width, height)]
+        text = viewbox % tuple(['%.2f' % v for v in values])
+        if len(text) >= reserve:
+            text = viewbox % tuple([repr(v) for v in values])
+        f.seek(position)
+        f.write(text)
+        f.close()
+        return count
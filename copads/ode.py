@@ -5,7 +5,12 @@ Copyright (c) Maurice H.T. Ling <mauriceling@acm.org>
 
 Date created: 20th December 2014
 '''
+from __future__ import absolute_import
+
+import math
 import re
+import struct
+from array import array
 
 def boundary_checker(y, boundary, type):
     '''
@@ -69,8 +74,10 @@ def Euler(funcs, x0, y0, step, xmax, nonODEfunc=None,
     value - for example, {'1': [0.0, 1.0]} will set variable y[0] to 2.0 if 
     the original y[0] value is negative.
     
-    @param funcs: system of differential equations
-    @type funcs: list
+    @param funcs: system of differential equations, either as a list of 
+    functions (one per ODE) or a single function returning the list of 
+    derivatives, such as a L{CompiledODE} object (see L{RK_solver})
+    @type funcs: list or function
     @param x0: initial value of x-axis, which is usually starting time
     @type x0: float
     @param y0: initial values for variables
@@ -94,6 +101,12 @@ def Euler(funcs, x0, y0, step, xmax, nonODEfunc=None,
     integration. Default = 1e100.
     @type zerodivision: float
     '''
+    if callable(funcs):
+        for x in RK_solver(funcs, x0, y0, step, xmax, 'Euler',
+                           nonODEfunc, lower_bound, upper_bound,
+                           overflow, zerodivision):
+            yield x
+        return
     yield [x0] + y0
     def solver(funcs, x0, y0, step):
         n = len(funcs)
@@ -149,8 +162,10 @@ def Heun(funcs, x0, y0, step, xmax, nonODEfunc=None,
     value - for example, {'1': [0.0, 1.0]} will set variable y[0] to 2.0 if 
     the original y[0] value is negative.
     
-    @param funcs: system of differential equations
-    @type funcs: list
+    @param funcs: system of differential equations, either as a list of 
+    functions (one per ODE) or a single function returning the list of 
+    derivatives, such as a L{CompiledODE} object (see L{RK_solver})
+    @type funcs: list or function
     @param x0: initial value of x-axis, which is usually starting time
     @type x0: float
     @param y0: initial values for variables
@@ -174,6 +189,12 @@ def Heun(funcs, x0, y0, step, xmax, nonODEfunc=None,
     integration. Default = 1e100.
     @type zerodivision: float
     '''
+    if callable(funcs):
+        for x in RK_solver(funcs, x0, y0, step, xmax, 'Heun',
+                           nonODEfunc, lower_bound, upper_bound,
+                           overflow, zerodivision):
+            yield x
+        return
     yield [x0] + y0
     def solver(funcs, x0, y0, step):
         n = len(funcs)
@@ -240,8 +261,10 @@ def RK3(funcs, x0, y0, step, xmax, nonODEfunc=None,
     value - for example, {'1': [0.0, 1.0]} will set variable y[0] to 2.0 if 
     the original y[0] value is negative.
     
-    @param funcs: system of differential equations
-    @type funcs: list
+    @param funcs: system of differential equations, either as a list of 
+    functions (one per ODE) or a single function returning the list of 
+    derivatives, such as a L{CompiledODE} object (see L{RK_solver})
+    @type funcs: list or function
     @param x0: initial value of x-axis, which is usually starting time
     @type x0: float
     @param y0: initial values for variables
@@ -265,6 +288,12 @@ def RK3(funcs, x0, y0, step, xmax, nonODEfunc=None,
     integration. Default = 1e100.
     @type zerodivision: float
     '''
+    if callable(funcs):
+        for x in RK_solver(funcs, x0, y0, step, xmax, 'RK3',
+                           nonODEfunc, lower_bound, upper_bound,
+                           overflow, zerodivision):
+            yield x
+        return
     yield [x0] + y0
     def solver(funcs, x0, y0, step):
         n = len(funcs)
@@ -341,8 +370,10 @@ def RK4(funcs, x0, y0, step, xmax, nonODEfunc=None,
     value - for example, {'1': [0.0, 1.0]} will set variable y[0] to 2.0 if 
     the original y[0] value is negative.
     
-    @param funcs: system of differential equations
-    @type funcs: list
+    @param funcs: system of differential equations, either as a list of 
+    functions (one per ODE) or a single function returning the list of 
+    derivatives, such as a L{CompiledODE} object (see L{RK_solver})
+    @type funcs: list or function
     @param x0: initial value of x-axis, which is usually starting time
     @type x0: float
     @param y0: initial values for variables
@@ -366,6 +397,12 @@ def RK4(funcs, x0, y0, step, xmax, nonODEfunc=None,
     integration. Default = 1e100.
     @type zerodivision: float
     '''
+    if callable(funcs):
+        for x in RK_solver(funcs, x0, y0, step, xmax, 'RK4',
+                           nonODEfunc, lower_bound, upper_bound,
+                           overflow, zerodivision):
+            yield x
+        return
     yield [x0] + y0
     def solver(funcs, x0, y0, step):
         n = len(funcs)
@@ -449,8 +486,10 @@ def RK38(funcs, x0, y0, step, xmax, nonODEfunc=None,
     value - for example, {'1': [0.0, 1.0]} will set variable y[0] to 2.0 if 
     the original y[0] value is negative.
     
-    @param funcs: system of differential equations
-    @type funcs: list
+    @param funcs: system of differential equations, either as a list of 
+    functions (one per ODE) or a single function returning the list of 
+    derivatives, such as a L{CompiledODE} object (see L{RK_solver})
+    @type funcs: list or function
     @param x0: initial value of x-axis, which is usually starting time
     @type x0: float
     @param y0: initial values for variables
@@ -474,6 +513,12 @@ def RK38(funcs, x0, y0, step, xmax, nonODEfunc=None,
     integration. Default = 1e100.
     @type zerodivision: float
     '''
+    if callable(funcs):
+        for x in RK_solver(funcs, x0, y0, step, xmax, 'RK38',
+                           nonODEfunc, lower_bound, upper_bound,
+                           overflow, zerodivision):
+            yield x
+        return
     yield [x0] + y0
     def solver(funcs, x0, y0, step):
         n = len(funcs)
@@ -557,8 +602,10 @@ def CK4(funcs, x0, y0, step, xmax, nonODEfunc=None,
     value - for example, {'1': [0.0, 1.0]} will set variable y[0] to 2.0 if 
     the original y[0] value is negative.
     
-    @param funcs: system of differential equations
-    @type funcs: list
+    @param funcs: system of differential equations, either as a list of 
+    functions (one per ODE) or a single function returning the list of 
+    derivatives, such as a L{CompiledODE} object (see L{RK_solver})
+    @type funcs: list or function
     @param x0: initial value of x-axis, which is usually starting time
     @type x0: float
     @param y0: initial values for variables
@@ -582,6 +629,12 @@ def CK4(funcs, x0, y0, step, xmax, nonODEfunc=None,
     integration. Default = 1e100.
     @type zerodivision: float
     '''
+    if callable(funcs):
+        for x in RK_solver(funcs, x0, y0, step, xmax, 'CK4',
+                           nonODEfunc, lower_bound, upper_bound,
+                           overflow, zerodivision):
+            yield x
+        return
     yield [x0] + y0
     def solver(funcs, x0, y0, step):
         n = len(funcs)
@@ -685,8 +738,10 @@ def CK5(funcs, x0, y0, step, xmax, nonODEfunc=None,
     value - for example, {'1': [0.0, 1.0]} will set variable y[0] to 2.0 if 
     the original y[0] value is negative.
     
-    @param funcs: system of differential equations
-    @type funcs: list
+    @param funcs: system of differential equations, either as a list of 
+    functions (one per ODE) or a single function returning the list of 
+    derivatives, such as a L{CompiledODE} object (see L{RK_solver})
+    @type funcs: list or function
     @param x0: initial value of x-axis, which is usually starting time
     @type x0: float
     @param y0: initial values for variables
@@ -710,6 +765,12 @@ def CK5(funcs, x0, y0, step, xmax, nonODEfunc=None,
     integration. Default = 1e100.
     @type zerodivision: float
     '''
+    if callable(funcs):
+        for x in RK_solver(funcs, x0, y0, step, xmax, 'CK5',
+                           nonODEfunc, lower_bound, upper_bound,
+                           overflow, zerodivision):
+            yield x
+        return
     yield [x0] + y0
     def solver(funcs, x0, y0, step):
         n = len(funcs)
@@ -812,8 +873,10 @@ def RKF4(funcs, x0, y0, step, xmax, nonODEfunc=None,
     value - for example, {'1': [0.0, 1.0]} will set variable y[0] to 2.0 if 
     the original y[0] value is negative.
     
-    @param funcs: system of differential equations
-    @type funcs: list
+    @param funcs: system of differential equations, either as a list of 
+    functions (one per ODE) or a single function returning the list of 
+    derivatives, such as a L{CompiledODE} object (see L{RK_solver})
+    @type funcs: list or function
     @param x0: initial value of x-axis, which is usually starting time
     @type x0: float
     @param y0: initial values for variables
@@ -837,6 +900,12 @@ def RKF4(funcs, x0, y0, step, xmax, nonODEfunc=None,
     integration. Default = 1e100.
     @type zerodivision: float
     '''
+    if callable(funcs):
+        for x in RK_solver(funcs, x0, y0, step, xmax, 'RKF4',
+                           nonODEfunc, lower_bound, upper_bound,
+                           overflow, zerodivision):
+            yield x
+        return
     yield [x0] + y0
     def solver(funcs, x0, y0, step):
         n = len(funcs)
@@ -940,8 +1009,10 @@ def RKF5(funcs, x0, y0, step, xmax, nonODEfunc=None,
     value - for example, {'1': [0.0, 1.0]} will set variable y[0] to 2.0 if 
     the original y[0] value is negative.
     
-    @param funcs: system of differential equations
-    @type funcs: list
+    @param funcs: system of differential equations, either as a list of 
+    functions (one per ODE) or a single function returning the list of 
+    derivatives, such as a L{CompiledODE} object (see L{RK_solver})
+    @type funcs: list or function
     @param x0: initial value of x-axis, which is usually starting time
     @type x0: float
     @param y0: initial values for variables
@@ -965,6 +1036,12 @@ def RKF5(funcs, x0, y0, step, xmax, nonODEfunc=None,
     integration. Default = 1e100.
     @type zerodivision: float
     '''
+    if callable(funcs):
+        for x in RK_solver(funcs, x0, y0, step, xmax, 'RKF5',
+                           nonODEfunc, lower_bound, upper_bound,
+                           overflow, zerodivision):
+            yield x
+        return
     yield [x0] + y0
     def solver(funcs, x0, y0, step):
         n = len(funcs)
@@ -1070,8 +1147,10 @@ def DP4(funcs, x0, y0, step, xmax, nonODEfunc=None,
     value - for example, {'1': [0.0, 1.0]} will set variable y[0] to 2.0 if 
     the original y[0] value is negative.
     
-    @param funcs: system of differential equations
-    @type funcs: list
+    @param funcs: system of differential equations, either as a list of 
+    functions (one per ODE) or a single function returning the list of 
+    derivatives, such as a L{CompiledODE} object (see L{RK_solver})
+    @type funcs: list or function
     @param x0: initial value of x-axis, which is usually starting time
     @type x0: float
     @param y0: initial values for variables
@@ -1095,6 +1174,12 @@ def DP4(funcs, x0, y0, step, xmax, nonODEfunc=None,
     integration. Default = 1e100.
     @type zerodivision: float
     '''
+    if callable(funcs):
+        for x in RK_solver(funcs, x0, y0, step, xmax, 'DP4',
+                           nonODEfunc, lower_bound, upper_bound,
+                           overflow, zerodivision):
+            yield x
+        return
     yield [x0] + y0
     def solver(funcs, x0, y0, step):
         n = len(funcs)
@@ -1210,8 +1295,10 @@ def DP5(funcs, x0, y0, step, xmax, nonODEfunc=None,
     value - for example, {'1': [0.0, 1.0]} will set variable y[0] to 2.0 if 
     the original y[0] value is negative.
     
-    @param funcs: system of differential equations
-    @type funcs: list
+    @param funcs: system of differential equations, either as a list of 
+    functions (one per ODE) or a single function returning the list of 
+    derivatives, such as a L{CompiledODE} object (see L{RK_solver})
+    @type funcs: list or function
     @param x0: initial value of x-axis, which is usually starting time
     @type x0: float
     @param y0: initial values for variables
@@ -1235,6 +1322,12 @@ def DP5(funcs, x0, y0, step, xmax, nonODEfunc=None,
     integration. Default = 1e100.
     @type zerodivision: float
     '''
+    if callable(funcs):
+        for x in RK_solver(funcs, x0, y0, step, xmax, 'DP5',
+                           nonODEfunc, lower_bound, upper_bound,
+                           overflow, zerodivision):
+            yield x
+        return
     yield [x0] + y0
     def solver(funcs, x0, y0, step):
         n = len(funcs)
@@ -1317,6 +1410,865 @@ def DP5(funcs, x0, y0, step, xmax, nonODEfunc=None,
         x0 = x0 + step
         yield [x0] + y0
 
+RK_tableaus = {
+    'Euler': {'c': [0.0], 'a': [], 'b': [1.0]},
+    'Heun': {'c': [0.0, 1.0], 'a': [[1.0]], 'b': [0.5, 0.5]},
+    'RK3': {'c': [0.0, 0.5, 1.0],
+            'a': [[0.5], [-1.0, 2.0]],
+            'b': [1/6.0, 4/6.0, 1/6.0]},
+    'RK4': {'c': [0.0, 0.5, 0.5, 1.0],
+            'a': [[0.5], [0.0, 0.5], [0.0, 0.0, 1.0]],
+            'b': [1/6.0, 2/6.0, 2/6.0, 1/6.0]},
+    'RK38': {'c': [0.0, 1/3.0, 2/3.0, 1.0],
+             'a': [[1/3.0], [-1/3.0, 1.0], [1.0, -1.0, 1.0]],
+             'b': [1/8.0, 3/8.0, 3/8.0, 1/8.0]}}
+# Cash-Karp, Runge-Kutta-Fehlberg and Dormand-Prince are embedded pairs - 
+# both orders share the same stages and differ only in their weights
+_CK = {'c': [0.0, 0.2, 0.3, 0.6, 1.0, 0.875],
+       'a': [[0.2], [0.075, 0.225], [0.3, -0.9, 1.2],
+             [-11/54.0, 2.5, -70/27.0, 35/27.0],
+             [1631/55296.0, 175/512.0, 575/13824.0, 44275/110592.0,
+              253/4096.0]]}
+_RKF = {'c': [0.0, 0.25, 3/8.0, 12/13.0, 1.0, 0.5],
+        'a': [[0.25], [3/32.0, 9/32.0],
+              [1932/2197.0, -7200/2197.0, 7296/2197.0],
+              [439/216.0, -8.0, 3680/513.0, -845/4104.0],
+              [-8/27.0, 2.0, -3544/2565.0, 1859/4104.0, -11/40.0]]}
+_DP = {'c': [0.0, 0.2, 0.3, 0.8, 8/9.0, 1.0, 1.0],
+       'a': [[0.2], [3/40.0, 9/40.0], [44/45.0, -56/15.0, 32/9.0],
+             [19372/6561.0, -25360/2187.0, 64448/6561.0, -212/729.0],
+             [9017/3168.0, -355/33.0, 46732/5247.0, 49/176.0,
+              -5103/18656.0],
+             [35/384.0, 0.0, 500/1113.0, 125/192.0, -2187/6784.0,
+              11/84.0]]}
+RK_tableaus['CK4'] = dict(_CK, b=[2825/27648.0, 0.0, 18575/48384.0,
+                                  13525/55296.0, 277/14336.0, 0.25])
+RK_tableaus['CK5'] = dict(_CK, b=[37/378.0, 0.0, 250/621.0, 125/594.0,
+                                  0.0, 512/1771.0])
+RK_tableaus['RKF4'] = dict(_RKF, b=[25/216.0, 0.0, 1408/2565.0,
+                                    2197/4104.0, -0.2, 0.0])
+RK_tableaus['RKF5'] = dict(_RKF, b=[16/135.0, 0.0, 6656/12825.0,
+                                    28561/56430.0, -9/50.0, 2/55.0])
+RK_tableaus['DP4'] = dict(_DP, b=[5179/57600.0, 0.0, 7571/16695.0,
+                                  393/640.0, -92097/339200.0, 187/2100.0,
+                                  1/40.0])
+RK_tableaus['DP5'] = dict(_DP, b=[35/384.0, 0.0, 500/1113.0, 125/192.0,
+                                  -2187/6784.0, 11/84.0, 0.0])
+_RK_steppers = {}
+
+def _RK_combination(weights, base=True):
+    '''
+    Private function to support _RK_stepper to generate the list 
+    comprehension for y + h * (sum of weighted stage derivatives), leaving 
+    out stages with zero weights.
+    
+    @param weights: weights of the stage derivatives (k0, k1, ...)
+    @type weights: list
+    @param base: flag to add y; otherwise, only h * (sum of weighted 
+    stage derivatives) will be generated. Default = True
+    @type base: boolean
+    @return: generated expression code
+    '''
+    stages = [j for j in range(len(weights)) if weights[j]]
+    if not stages:
+        if base: return 'list(y)'
+        else: return '[0.0] * len(y)'
+    terms = ' + '.join(['%r*k%d_' % (weights[j], j) for j in stages])
+    names = ', '.join(['k%d_' % j for j in stages])
+    series = ', '.join(['k%d' % j for j in stages])
+    if base:
+        return '[y_ + h*(%s) for (y_, %s) in zip(y, %s)]' % \
+            (terms, names, series)
+    return '[h*(%s) for (%s,) in zip(%s)]' % (terms, names, series)
+
+def _RK_stepper(method):
+    '''
+    Private function - generates (and caches) a function to take a single 
+    step of an explicit Runge-Kutta method in RK_tableaus. All stages are 
+    unrolled into the generated function, which takes the form of 
+    stepper(rhs, x, y, h) where rhs(x, y) returns the list of derivatives 
+    for all variables. Trailing stages that do not contribute to the 
+    result (such as the seventh stage of DP5) are left out.
+    
+    @param method: name of Runge-Kutta method; one of the keys in 
+    RK_tableaus
+    @type method: string
+    @return: single step function
+    '''
+    if method in _RK_steppers:
+        return _RK_steppers[method]
+    if method not in RK_tableaus:
+        raise ValueError('Unknown Runge-Kutta method: ' + str(method))
+    tableau = RK_tableaus[method]
+    weights = tableau['b']
+    stages = max([j for j in range(len(weights)) if weights[j]]) + 1
+    code = ['def stepper(rhs, x, y, h):',
+            '    k0 = rhs(x, y)']
+    for s in range(1, stages):
+        code.append('    k%d = rhs(x + %r*h, %s)' % \
+                    (s, tableau['c'][s], _RK_combination(tableau['a'][s-1])))
+    code.append('    return ' + _RK_combination(weights))
+    namespace = {}
+    exec(compile('\n'.join(code), '<RK %s>' % method, 'exec'), namespace)
+    _RK_steppers[method] = namespace['stepper']
+    return namespace['stepper']
+
+_RK_inplace_steppers = {}
+
+def _RK_inplace_combination(weights, target):
+    '''
+    Private function to support _RK_inplace_stepper to generate the loop 
+    writing y + h * (sum of weighted stage derivatives) into a buffer, 
+    leaving out stages with zero weights. The expression for each variable 
+    is the same as in _RK_combination; hence, the results are the same.
+    
+    @param weights: weights of the stage derivatives (k0, k1, ...)
+    @type weights: list
+    @param target: name of the buffer to write into
+    @type target: string
+    @return: generated code lines
+    '''
+    stages = [j for j in range(len(weights)) if weights[j]]
+    if not stages:
+        return ['    %s[:] = y' % target]
+    terms = ' + '.join(['%r*k%d[i]' % (weights[j], j) for j in stages])
+    return ['    for i in n:',
+            '        %s[i] = y[i] + h*(%s)' % (target, terms)]
+
+def _RK_inplace_stepper(method):
+    '''
+    Private function - generates (and caches) a function to take a single 
+    step of an explicit Runge-Kutta method in RK_tableaus, as _RK_stepper, 
+    but without allocating lists for the arguments of stages and for the 
+    result. The generated function takes the form of stepper(rhs, x, y, 
+    h, buffers, n) where y is updated in place, buffers is a list of 
+    preallocated lists (one per stage after the first stage, as generated 
+    by _RK_buffers) for the arguments of stages, and n is range(len(y)). 
+    The stage derivatives are still the lists returned by rhs.
+    
+    @param method: name of Runge-Kutta method; one of the keys in 
+    RK_tableaus
+    @type method: string
+    @return: single step function
+    '''
+    if method in _RK_inplace_steppers:
+        return _RK_inplace_steppers[method]
+    if method not in RK_tableaus:
+        raise ValueError('Unknown Runge-Kutta method: ' + str(method))
+    tableau = RK_tableaus[method]
+    weights = tableau['b']
+    stages = max([j for j in range(len(weights)) if weights[j]]) + 1
+    code = ['def stepper(rhs, x, y, h, buffers, n):',
+            '    k0 = rhs(x, y)']
+    for s in range(1, stages):
+        code = code + ['    t%d = buffers[%d]' % (s, s - 1)] + \
+            _RK_inplace_combination(tableau['a'][s-1], 't%d' % s) + \
+            ['    k%d = rhs(x + %r*h, t%d)' % (s, tableau['c'][s], s)]
+    code = code + _RK_inplace_combination(weights, 'y')
+    namespace = {}
+    exec(compile('\n'.join(code), '<RK %s in place>' % method, 'exec'), 
+         namespace)
+    _RK_inplace_steppers[method] = namespace['stepper']
+    return namespace['stepper']
+
+def _RK_buffers(method, size):
+    '''
+    Private function - preallocates the buffers for the arguments of 
+    stages of _RK_inplace_stepper.
+    
+    @param method: name of Runge-Kutta method
+    @param size: number of variables
+    @return: list of buffers
+    '''
+    weights = RK_tableaus[method]['b']
+    stages = max([j for j in range(len(weights)) if weights[j]]) + 1
+    return [[0.0] * size for s in range(1, stages)]
+
+def _RK_function(rhs, overflow, zerodivision):
+    '''
+    Private function - prepares the system of ODEs for the vectorized 
+    solvers as a single function taking (x, y) and returning the list of 
+    derivatives. A CompiledODE object is used as it is; a list of ODE 
+    functions (one per ODE) is evaluated one function at a time; any other 
+    function is wrapped so that zero division and overflow errors are 
+    replaced by the given values for all variables, instead of stopping 
+    the integration.
+    
+    @param rhs: system of differential equations
+    @param overflow: value to assign in event of over flow error
+    @param zerodivision: value to assign in event of zero division error
+    @return: function taking (x, y) and returning the list of derivatives
+    '''
+    if isinstance(rhs, CompiledODE):
+        return rhs.function
+    if not callable(rhs):
+        funcs = list(rhs)
+        def vectorized(x, y):
+            d = [0.0] * len(funcs)
+            for i in range(len(funcs)):
+                try: d[i] = funcs[i](x, y)
+                except TypeError: pass
+                except ZeroDivisionError: d[i] = zerodivision
+                except OverflowError: d[i] = overflow
+            return d
+        return vectorized
+    def guarded(x, y):
+        try: return rhs(x, y)
+        except ZeroDivisionError: return [zerodivision] * len(y)
+        except OverflowError: return [overflow] * len(y)
+    return guarded
+
+def RK_solver(rhs, x0, y0, step, xmax, method='RK4', nonODEfunc=None,
+              lower_bound=None, upper_bound=None,
+              overflow=1e100, zerodivision=1e100):
+    '''
+    Generator to integrate a system of ODEs, y' = rhs(x, y), using any of 
+    the explicit Runge-Kutta methods in RK_tableaus (Euler, Heun, RK3, RK4, 
+    RK38, CK4, CK5, RKF4, RKF5, DP4 or DP5).
+    
+    Unlike the individual solvers, which call one function per ODE, rhs is 
+    a single function taking (x, y) and returning the list of derivatives 
+    of all variables - such as a L{CompiledODE} object. Hence, each stage 
+    takes one function call regardless of the number of ODEs. Zero 
+    division and overflow errors raised by rhs replace the derivatives of 
+    all variables with zerodivision and overflow values respectively; 
+    CompiledODE handles these errors per variable by itself. A list of ODE 
+    functions, as used by the individual solvers, is also accepted.
+    
+    nonODEfunc, lower_bound and upper_bound work as in the individual 
+    solvers, such as L{RK4}.
+    
+    @param rhs: system of differential equations as a single function 
+    returning the list of derivatives
+    @type rhs: function or list
+    @param x0: initial value of x-axis, which is usually starting time
+    @type x0: float
+    @param y0: initial values for variables
+    @type y0: list
+    @param step: step size on the x-axis (also known as step in calculus)
+    @type step: float
+    @param xmax: maximum value of x-axis, which is usually ending time
+    @type xmax: float
+    @param method: name of Runge-Kutta method. Default = RK4
+    @type method: string
+    @param nonODEfunc: a function to modify the variable list (y0)
+    @type nonODEfunc: function
+    @param lower_bound: set of values for lower boundary of variables
+    @type lower_bound: dictionary
+    @param upper_bound: set of values for upper boundary of variables
+    @type upper_bound: dictionary
+    @param overflow: value (usually a large value) to assign in event of 
+    over flow error (usually caused by a large number) during integration. 
+    Default = 1e100.
+    @type overflow: float
+    @param zerodivision: value (usually a large value) to assign in event 
+    of zero division error, which results in positive infinity, during 
+    integration. Default = 1e100.
+    @type zerodivision: float
+    '''
+    rhs = _RK_function(rhs, overflow, zerodivision)
+    stepper = _RK_stepper(method)
+    y0 = list(y0)
+    yield [x0] + y0
+    while x0 < xmax:
+        y1 = stepper(rhs, x0, y0, step)
+        if nonODEfunc:
+            y1 = nonODEfunc(y1, step)
+        if lower_bound: 
+            y1 = boundary_checker(y1, lower_bound, 'lower')
+        if upper_bound: 
+            y1 = boundary_checker(y1, upper_bound, 'upper')
+        y0 = y1
+        x0 = x0 + step
+        yield [x0] + y0
+
+RK_pairs = {'CK45': ('CK4', 'CK5'),
+            'RKF45': ('RKF4', 'RKF5'),
+            'DP45': ('DP4', 'DP5')}
+_RK_embedded_steppers = {}
+
+def _RK_embedded_stepper(method):
+    '''
+    Private function - generates (and caches) a function to take a single 
+    step of an embedded Runge-Kutta pair in RK_pairs, which takes the form 
+    of stepper(rhs, x, y, h, k0) where k0 is rhs(x, y). The generated 
+    function returns a tuple of (<values of the higher order method>, 
+    <local error estimates>, <rhs at the end of step>); the last element 
+    is only available (otherwise, None) when the last stage of the pair is 
+    evaluated at the end of step (first same as last), as in Dormand-Prince.
+    
+    @param method: name of Runge-Kutta pair; one of the keys in RK_pairs
+    @type method: string
+    @return: single step function
+    '''
+    if method not in RK_pairs:
+        raise ValueError('Unknown embedded Runge-Kutta pair: ' + \
+                         str(method))
+    if method in _RK_embedded_steppers:
+        return _RK_embedded_steppers[method]
+    tableau = RK_tableaus[RK_pairs[method][1]]
+    weights = tableau['b']
+    errors = [weights[j] - RK_tableaus[RK_pairs[method][0]]['b'][j]
+              for j in range(len(weights))]
+    stages = len(tableau['c'])
+    fsal = tableau['c'][-1] == 1.0 and weights[-1] == 0.0 and \
+        tableau['a'][-1] == weights[:-1]
+    code = ['def stepper(rhs, x, y, h, k0):']
+    for s in range(1, stages - int(fsal)):
+        code.append('    k%d = rhs(x + %r*h, %s)' % \
+                    (s, tableau['c'][s], _RK_combination(tableau['a'][s-1])))
+    code.append('    y1 = ' + _RK_combination(weights))
+    if fsal:
+        code.append('    k%d = rhs(x + h, y1)' % (stages - 1))
+    code.append('    error = ' + _RK_combination(errors, False))
+    if fsal:
+        code.append('    return (y1, error, k%d)' % (stages - 1))
+    else:
+        code.append('    return (y1, error, None)')
+    namespace = {}
+    exec(compile('\n'.join(code), '<RK %s>' % method, 'exec'), namespace)
+    _RK_embedded_steppers[method] = namespace['stepper']
+    return namespace['stepper']
+
+def _RK_error_norm(error, y0, y1, rtol, atol):
+    '''
+    Private function to support RK_adaptive to calculate the root mean 
+    square of local error estimates, scaled by atol + rtol * |y|. The step 
+    is accepted if the result is not more than 1.
+    
+    @param error: local error estimates
+    @param y0: values for variables at the start of step
+    @param y1: values for variables at the end of step
+    @param rtol: relative tolerance
+    @param atol: absolute tolerance
+    @return: scaled error
+    '''
+    total = 0.0
+    for (e, a, b) in zip(error, y0, y1):
+        total = total + (e / (atol + rtol * max(abs(a), abs(b)))) ** 2
+    return (total / max(len(error), 1)) ** 0.5
+
+def _hermite(x0, y0, f0, x1, y1, f1, x):
+    '''
+    Private function - cubic Hermite interpolation of variables at x, 
+    between x0 and x1, from the values (y0, y1) and derivatives (f0, f1) 
+    of variables at both ends. This provides dense output for RK_adaptive.
+    
+    @return: interpolated values for variables
+    '''
+    h = x1 - x0
+    t = (x - x0) / h
+    h00 = (1 + 2*t) * (1 - t) * (1 - t)
+    h10 = t * (1 - t) * (1 - t) * h
+    h01 = t * t * (3 - 2*t)
+    h11 = t * t * (t - 1) * h
+    return [h00*a + h10*b + h01*c + h11*d
+            for (a, b, c, d) in zip(y0, f0, y1, f1)]
+
+def RK_adaptive(rhs, x0, y0, xmax, method='DP45', rtol=1e-6, atol=1e-9,
+                step=None, max_step=None, times=None, nonODEfunc=None,
+                lower_bound=None, upper_bound=None,
+                overflow=1e100, zerodivision=1e100):
+    '''
+    Generator to integrate a system of ODEs, y' = rhs(x, y), with adaptive 
+    step size using an embedded Runge-Kutta pair - Cash-Karp (CK45), 
+    Runge-Kutta-Fehlberg (RKF45) or Dormand-Prince (DP45).
+    
+    At each step, the difference between the fourth and fifth order 
+    results is taken as the local error estimate. The step is accepted if 
+    the root mean square of errors, scaled by atol + rtol * |y| for each 
+    variable, is not more than 1; and the next step size is scaled by 
+    0.9 * error^(-1/5), limited to between 0.2 and 5 times of the current 
+    step size. Integration continues with the fifth order result (local 
+    extrapolation). The last step is shortened to end exactly at xmax.
+    
+    If times is not given, [x] + y is yielded at every accepted step, 
+    where x is no longer evenly spaced. If times is given, [x] + y is 
+    only yielded at each time in times (dense output), which is 
+    interpolated from the accepted steps using cubic Hermite 
+    interpolation. This allows the step size to be decided by accuracy 
+    instead of by the time points required.
+    
+    rhs can be a list of ODE functions as used by the individual solvers, 
+    a single function returning the list of derivatives, or a 
+    L{CompiledODE} object (see L{RK_solver}). nonODEfunc, lower_bound and 
+    upper_bound work as in the individual solvers, such as L{RK4}, and 
+    are applied after every accepted step.
+    
+    @param rhs: system of differential equations
+    @type rhs: list or function
+    @param x0: initial value of x-axis, which is usually starting time
+    @type x0: float
+    @param y0: initial values for variables
+    @type y0: list
+    @param xmax: maximum value of x-axis, which is usually ending time
+    @type xmax: float
+    @param method: name of embedded Runge-Kutta pair. Default = DP45
+    @type method: string
+    @param rtol: relative tolerance. Default = 1e-6
+    @type rtol: float
+    @param atol: absolute tolerance. Default = 1e-9
+    @type atol: float
+    @param step: initial step size. Default = None, which will be 
+    estimated from the initial values and derivatives of variables
+    @type step: float
+    @param max_step: maximum step size. Default = None (no limit)
+    @type max_step: float
+    @param times: values of x-axis to yield results at. Default = None 
+    (yield results at every accepted step)
+    @type times: list
+    @param nonODEfunc: a function to modify the variable list (y0)
+    @type nonODEfunc: function
+    @param lower_bound: set of values for lower boundary of variables
+    @type lower_bound: dictionary
+    @param upper_bound: set of values for upper boundary of variables
+    @type upper_bound: dictionary
+    @param overflow: value (usually a large value) to assign in event of 
+    over flow error (usually caused by a large number) during integration. 
+    Default = 1e100.
+    @type overflow: float
+    @param zerodivision: value (usually a large value) to assign in event 
+    of zero division error, which results in positive infinity, during 
+    integration. Default = 1e100.
+    @type zerodivision: float
+    '''
+    rhs = _RK_function(rhs, overflow, zerodivision)
+    stepper = _RK_embedded_stepper(method)
+    y0 = list(y0)
+    f0 = rhs(x0, y0)
+    if max_step is None:
+        max_step = xmax - x0
+    if step is None:
+        # Initial step size such that the first step changes each 
+        # variable by about 1% of its scaled value
+        d0 = _RK_error_norm(y0, y0, y0, rtol, atol)
+        d1 = _RK_error_norm(f0, y0, y0, rtol, atol)
+        if d0 < 1e-5 or d1 < 1e-5: step = 1e-6
+        else: step = 0.01 * d0 / d1
+    step = min(step, max_step)
+    if times is None:
+        yield [x0] + y0
+    else:
+        times = sorted(times)
+        pending = 0
+        while pending < len(times) and times[pending] <= x0:
+            if times[pending] == x0:
+                yield [x0] + y0
+            pending = pending + 1
+    while x0 < xmax:
+        if times is not None and pending == len(times):
+            break
+        step = min(step, xmax - x0)
+        if x0 + step == x0:
+            raise ValueError('Step size underflow at x = %s' % str(x0))
+        (y1, error, f1) = stepper(rhs, x0, y0, step, f0)
+        norm = _RK_error_norm(error, y0, y1, rtol, atol)
+        if norm > 1.0:
+            step = step * max(0.2, 0.9 * norm ** -0.2)
+            continue
+        x1 = x0 + step
+        if x1 > xmax or xmax - x1 < 1e-12 * max(abs(xmax), 1.0):
+            x1 = xmax
+        if nonODEfunc or lower_bound or upper_bound:
+            if nonODEfunc:
+                y1 = nonODEfunc(y1, step)
+            if lower_bound: 
+                y1 = boundary_checker(y1, lower_bound, 'lower')
+            if upper_bound: 
+                y1 = boundary_checker(y1, upper_bound, 'upper')
+            f1 = None
+        if f1 is None:
+            f1 = rhs(x1, y1)
+        if times is None:
+            yield [x1] + y1
+        else:
+            while pending < len(times) and times[pending] <= x1:
+                if times[pending] == x1:
+                    yield [x1] + y1
+                else:
+                    yield [times[pending]] + \
+                        _hermite(x0, y0, f0, x1, y1, f1, times[pending])
+                pending = pending + 1
+        if norm == 0.0:
+            step = min(step * 5.0, max_step)
+        else:
+            step = min(step * min(5.0, 0.9 * norm ** -0.2), max_step)
+        (x0, y0, f0) = (x1, y1, f1)
+
+def _LU_decompose(A):
+    '''
+    Private function - LU decomposition (Doolittle) of a square matrix with 
+    partial pivoting, to solve the linear equations in Newton iterations 
+    of the implicit solvers.
+    
+    @param A: square matrix as a list of rows
+    @return: tuple of (<combined L and U matrix>, <row permutation>)
+    '''
+    n = len(A)
+    LU = [list(row) for row in A]
+    pivots = list(range(n))
+    for k in range(n):
+        p = k
+        for i in range(k + 1, n):
+            if abs(LU[i][k]) > abs(LU[p][k]): p = i
+        if LU[p][k] == 0.0:
+            raise ValueError('Iteration matrix is singular')
+        if p != k:
+            (LU[k], LU[p]) = (LU[p], LU[k])
+            (pivots[k], pivots[p]) = (pivots[p], pivots[k])
+        pivot_row = LU[k]
+        for i in range(k + 1, n):
+            row = LU[i]
+            factor = row[k] / pivot_row[k]
+            row[k] = factor
+            if factor:
+                for j in range(k + 1, n):
+                    row[j] = row[j] - factor * pivot_row[j]
+    return (LU, pivots)
+
+def _LU_solve(LU, pivots, b):
+    '''
+    Private function - solves A x = b from the LU decomposition of A by 
+    forward and backward substitution.
+    
+    @param LU: combined L and U matrix from _LU_decompose
+    @param pivots: row permutation from _LU_decompose
+    @param b: right-hand side vector
+    @return: solution vector, x
+    '''
+    n = len(LU)
+    x = [b[p] for p in pivots]
+    for i in range(1, n):
+        row = LU[i]
+        x[i] = x[i] - sum([row[j] * x[j] for j in range(i)])
+    for i in range(n - 1, -1, -1):
+        row = LU[i]
+        x[i] = (x[i] - sum([row[j] * x[j] for j in range(i + 1, n)])) / \
+            row[i]
+    return x
+
+def _jacobian(rhs, x, y, f0=None):
+    '''
+    Private function - estimates the Jacobian matrix of a system of ODEs, 
+    J[i][j] = d(rhs[i])/d(y[j]), by forward differences.
+    
+    @param rhs: function taking (x, y) and returning the list of 
+    derivatives
+    @param x: value of x-axis
+    @param y: values for variables
+    @param f0: rhs(x, y), if already evaluated
+    @return: Jacobian matrix as a list of rows
+    '''
+    if f0 is None: f0 = rhs(x, y)
+    n = len(y)
+    J = [[0.0] * n for i in range(n)]
+    for j in range(n):
+        delta = 1.5e-8 * max(abs(y[j]), 1.0)
+        yj = list(y)
+        yj[j] = y[j] + delta
+        fj = rhs(x, yj)
+        for i in range(n):
+            J[i][j] = (fj[i] - f0[i]) / delta
+    return J
+
+def _iteration_matrix(rhs, jacobian, x, y, c):
+    '''
+    Private function - LU decomposition of the iteration matrix, I - c*J, 
+    for the implicit solvers, where J is the Jacobian matrix at (x, y).
+    
+    @param rhs: function taking (x, y) and returning the list of 
+    derivatives
+    @param jacobian: function taking (x, y) and returning the Jacobian 
+    matrix, or None to estimate the Jacobian matrix by forward differences
+    @param x: value of x-axis
+    @param y: values for variables
+    @param c: multiplier of Jacobian matrix
+    @return: tuple of (<combined L and U matrix>, <row permutation>)
+    '''
+    if jacobian is None: J = _jacobian(rhs, x, y)
+    else: J = jacobian(x, y)
+    n = len(y)
+    M = [[-c * J[i][j] for j in range(n)] for i in range(n)]
+    for i in range(n):
+        M[i][i] = M[i][i] + 1.0
+    return _LU_decompose(M)
+
+def _newton(rhs, jacobian, x, guess, constant, c, factors, tolerance, 
+            iterations):
+    '''
+    Private function - solves y = constant + c * rhs(x, y) for y by 
+    simplified Newton iterations, using the given LU decomposition of the 
+    iteration matrix, I - c*J, which may be from earlier steps, for as 
+    long as the iterations converge fast enough (each change is less than 
+    half of the previous change, and the changes are expected to be within 
+    tolerance before running out of iterations); otherwise, the iteration 
+    matrix is evaluated again at the current values. Iteration stops when 
+    the largest change in variables, relative to 1 + |y|, is not more than 
+    tolerance. ValueError is raised if this is not reached within the 
+    given number of iterations.
+    
+    @param factors: LU decomposition of the iteration matrix, or None to 
+    evaluate the iteration matrix at guess
+    @return: tuple of (<values for variables>, <LU decomposition of the 
+    last iteration matrix>)
+    '''
+    y = list(guess)
+    if factors is None:
+        factors = _iteration_matrix(rhs, jacobian, x, y, c)
+    (LU, pivots) = factors
+    previous = None
+    for iteration in range(iterations):
+        f = rhs(x, y)
+        residual = [k + c*d - v for (k, d, v) in zip(constant, f, y)]
+        delta = _LU_solve(LU, pivots, residual)
+        y = [v + d for (v, d) in zip(y, delta)]
+        change = max([abs(d) / (1.0 + abs(v)) 
+                      for (d, v) in zip(delta, y)] + [0.0])
+        if change <= tolerance:
+            return (y, factors)
+        if previous is not None:
+            rate = change / previous
+            if rate > 0.5 or \
+                change * rate ** (iterations - iteration - 1) > tolerance:
+                factors = _iteration_matrix(rhs, jacobian, x, y, c)
+                (LU, pivots) = factors
+        previous = change
+    raise ValueError('Newton iterations did not converge at x = %s' % \
+                     str(x))
+
+def _SDIRK_step(rhs, jacobian, x0, y0, step, tolerance, iterations,
+                factors=None):
+    '''
+    Private function to support BDF to take a single step of the 
+    A-stable, fourth order, 3-stage singly diagonally implicit Runge-Kutta 
+    (SDIRK) method of Crouzeix, which provides the starting values for BDF 
+    of higher orders without reducing its order of accuracy. All stages 
+    share the same iteration matrix, I - gamma * step * J, which is reused 
+    from the previous step if given.
+    
+    @param factors: LU decomposition of the iteration matrix from the 
+    previous step, or None to evaluate the iteration matrix at (x0, y0)
+    @return: tuple of (<values for variables at the end of step>, <LU 
+    decomposition of the last iteration matrix>)
+    '''
+    gamma = (1 / 3.0 ** 0.5) * math.cos(math.pi / 18) + 0.5
+    delta = 1 / (6 * (2*gamma - 1) ** 2)
+    c = [gamma, 0.5, 1 - gamma]
+    a = [[], [0.5 - gamma], [2*gamma, 1 - 4*gamma]]
+    b = [delta, 1 - 2*delta, delta]
+    if factors is None:
+        factors = _iteration_matrix(rhs, jacobian, x0, y0, gamma * step)
+    K = []
+    for i in range(3):
+        constant = list(y0)
+        for j in range(i):
+            constant = [v + step*a[i][j]*k 
+                        for (v, k) in zip(constant, K[j])]
+        (Y, factors) = _newton(rhs, jacobian, x0 + c[i]*step, constant,
+                               constant, gamma * step, factors, 
+                               tolerance, iterations)
+        K.append([(v - k) / (gamma * step) for (v, k) in zip(Y, constant)])
+    y1 = [v + step*(b[0]*k0 + b[1]*k1 + b[2]*k2) 
+          for (v, k0, k1, k2) in zip(y0, K[0], K[1], K[2])]
+    return (y1, factors)
+
+# BDF coefficients - y[n+1] = sum(alpha[j] * y[n-j]) + beta * h * f(y[n+1])
+BDF_coefficients = {1: ([1.0], 1.0),
+                    2: ([4/3.0, -1/3.0], 2/3.0),
+                    3: ([18/11.0, -9/11.0, 2/11.0], 6/11.0),
+                    4: ([48/25.0, -36/25.0, 16/25.0, -3/25.0], 12/25.0),
+                    5: ([300/137.0, -300/137.0, 200/137.0, -75/137.0,
+                         12/137.0], 60/137.0)}
+
+def _BDF_step(rhs, jacobian, x0, history, step, order, tolerance, 
+              iterations, factors=None):
+    '''
+    Private function to support BDF to take a single step of BDF, where 
+    history is the list of previous values for variables, latest first. 
+    The iteration matrix, I - beta * step * J, is reused from the previous 
+    step if given.
+    
+    @param factors: LU decomposition of the iteration matrix from the 
+    previous step, or None to evaluate the iteration matrix at the 
+    predicted values
+    @return: tuple of (<values for variables at the end of step>, <LU 
+    decomposition of the last iteration matrix>)
+    '''
+    (alpha, beta) = BDF_coefficients[order]
+    constant = [0.0] * len(history[0])
+    for j in range(len(alpha)):
+        constant = [k + alpha[j]*v for (k, v) in zip(constant, history[j])]
+    if order > 1:
+        guess = [2*a - b for (a, b) in zip(history[0], history[1])]
+    else:
+        guess = history[0]
+    return _newton(rhs, jacobian, x0 + step, guess, constant,
+                   beta * step, factors, tolerance, iterations)
+
+def BDF(funcs, x0, y0, step, xmax, nonODEfunc=None,
+        lower_bound=None, upper_bound=None,
+        overflow=1e100, zerodivision=1e100,
+        order=2, jacobian=None, tolerance=1e-10, iterations=10):
+    '''
+    Generator to integrate a system of ODEs, y' = f(x, y), using implicit 
+    backward differentiation formula (BDF) of order 1 to 5, for stiff 
+    systems where explicit solvers require very small step sizes. BDF of 
+    order 1 is backward Euler method (see L{BackwardEuler}).
+    
+    At each step, y[n+1] = sum(alpha[j] * y[n-j]) + beta * step * f(x[n+1], 
+    y[n+1]) is solved by simplified Newton iterations where the Jacobian 
+    matrix is evaluated (or estimated by forward differences) and LU 
+    decomposed at the predicted values of the first step, and kept for 
+    the following steps until the iterations converge slowly. As BDF of 
+    order k requires k previous values, the first k - 1 steps are taken by 
+    a fourth order singly diagonally implicit Runge-Kutta method, which is 
+    also A-stable. ValueError is raised if Newton iterations do not 
+    converge within the given number of iterations, even with an updated 
+    Jacobian matrix; a smaller step size is then needed.
+    
+    nonODEfunc, lower_bound and upper_bound work as in the explicit 
+    solvers, such as L{RK4}. funcs can be a list of ODE functions, a 
+    single function returning the list of derivatives, or a 
+    L{CompiledODE} object.
+    
+    @param funcs: system of differential equations
+    @type funcs: list or function
+    @param x0: initial value of x-axis, which is usually starting time
+    @type x0: float
+    @param y0: initial values for variables
+    @type y0: list
+    @param step: step size on the x-axis (also known as step in calculus)
+    @type step: float
+    @param xmax: maximum value of x-axis, which is usually ending time
+    @type xmax: float
+    @param nonODEfunc: a function to modify the variable list (y0)
+    @type nonODEfunc: function
+    @param lower_bound: set of values for lower boundary of variables
+    @type lower_bound: dictionary
+    @param upper_bound: set of values for upper boundary of variables
+    @type upper_bound: dictionary
+    @param overflow: value (usually a large value) to assign in event of 
+    over flow error (usually caused by a large number) during integration. 
+    Default = 1e100.
+    @type overflow: float
+    @param zerodivision: value (usually a large value) to assign in event 
+    of zero division error, which results in positive infinity, during 
+    integration. Default = 1e100.
+    @type zerodivision: float
+    @param order: order of BDF, from 1 to 5. Default = 2
+    @type order: integer
+    @param jacobian: function taking (x, y) and returning the Jacobian 
+    matrix (list of rows, where J[i][j] = d(f[i])/d(y[j])). Default = 
+    None (Jacobian matrix is estimated by forward differences)
+    @type jacobian: function
+    @param tolerance: tolerance of Newton iterations, as the largest change 
+    in variables relative to 1 + |y|. Default = 1e-10
+    @type tolerance: float
+    @param iterations: maximum number of Newton iterations per step. 
+    Default = 10
+    @type iterations: integer
+    '''
+    if order not in BDF_coefficients:
+        raise ValueError('Order of BDF must be from 1 to 5, not ' + \
+                         str(order))
+    rhs = _RK_function(funcs, overflow, zerodivision)
+    y0 = list(y0)
+    history = [y0]
+    factors = None
+    yield [x0] + y0
+    while x0 < xmax:
+        if len(history) < order:
+            (y1, factors) = _SDIRK_step(rhs, jacobian, x0, y0, step, 
+                                        tolerance, iterations, factors)
+            if len(history) == order - 1:
+                # Iteration matrix of BDF has a different multiplier
+                factors = None
+        else:
+            (y1, factors) = _BDF_step(rhs, jacobian, x0, history, step, 
+                                      order, tolerance, iterations, 
+                                      factors)
+        if nonODEfunc:
+            y1 = nonODEfunc(y1, step)
+        if lower_bound: 
+            y1 = boundary_checker(y1, lower_bound, 'lower')
+        if upper_bound: 
+            y1 = boundary_checker(y1, upper_bound, 'upper')
+        history = [y1] + history[:order - 1]
+        y0 = y1
+        x0 = x0 + step
+        yield [x0] + y0
+
+def BackwardEuler(funcs, x0, y0, step, xmax, nonODEfunc=None,
+                  lower_bound=None, upper_bound=None,
+                  overflow=1e100, zerodivision=1e100,
+                  jacobian=None, tolerance=1e-10, iterations=10):
+    '''
+    Generator to integrate a system of ODEs, y' = f(x, y), using implicit 
+    backward Euler method, y[n+1] = y[n] + step * f(x[n+1], y[n+1]), which 
+    is BDF of order 1. Please see L{BDF} for details of parameters.
+    '''
+    return BDF(funcs, x0, y0, step, xmax, nonODEfunc, 
+               lower_bound, upper_bound, overflow, zerodivision,
+               1, jacobian, tolerance, iterations)
+
+def Rosenbrock(funcs, x0, y0, step, xmax, nonODEfunc=None,
+               lower_bound=None, upper_bound=None,
+               overflow=1e100, zerodivision=1e100, jacobian=None,
+               dfdx=None):
+    '''
+    Generator to integrate a system of ODEs, y' = f(x, y), using the 
+    second order, L-stable, Rosenbrock method ROS2 (Verwer et al., 1999), 
+    for stiff systems. Unlike BDF, there are no Newton iterations - each 
+    step solves two linear systems with the same LU decomposition of 
+    I - gamma * step * J, where gamma = 1 + 1/sqrt(2), J is the Jacobian 
+    matrix and f_x = df/dx at the start of step:
+    
+    M{
+    (I - gamma * step * J) k1 = f(x, y) + gamma * step * f_x
+    (I - gamma * step * J) k2 = f(x + step, y + step * k1) - 2 * k1 
+                                - gamma * step * f_x
+    y[n+1] = y[n] + 1.5 * step * k1 + 0.5 * step * k2
+    }
+    
+    The f_x terms are needed for second order accuracy when f depends on 
+    x explicitly (non-autonomous systems). Please see L{BDF} for details 
+    of other parameters.
+    
+    @param dfdx: function taking (x, y) and returning the list of partial 
+    derivatives of f with respect to x. Default = None (estimated by 
+    forward differences in x)
+    @type dfdx: function
+    '''
+    rhs = _RK_function(funcs, overflow, zerodivision)
+    gamma = 1.0 + 0.5 ** 0.5
+    y0 = list(y0)
+    yield [x0] + y0
+    while x0 < xmax:
+        f0 = rhs(x0, y0)
+        if dfdx is None:
+            delta = 1.5e-8 * max(abs(x0), 1.0)
+            fx = [(a - b) / delta 
+                  for (a, b) in zip(rhs(x0 + delta, y0), f0)]
+        else:
+            fx = dfdx(x0, y0)
+        (LU, pivots) = _iteration_matrix(rhs, jacobian, x0, y0,
+                                         gamma * step)
+        k1 = _LU_solve(LU, pivots, [f + gamma*step*d 
+                                    for (f, d) in zip(f0, fx)])
+        f1 = rhs(x0 + step, [v + step*k for (v, k) in zip(y0, k1)])
+        k2 = _LU_solve(LU, pivots, [f - 2*k - gamma*step*d 
+                                    for (f, k, d) in zip(f1, k1, fx)])
+        y1 = [v + step*(1.5*a + 0.5*b) for (v, a, b) in zip(y0, k1, k2)]
+        if nonODEfunc:
+            y1 = nonODEfunc(y1, step)
+        if lower_bound: 
+            y1 = boundary_checker(y1, lower_bound, 'lower')
+        if upper_bound: 
+            y1 = boundary_checker(y1, upper_bound, 'upper')
+        y0 = y1
+        x0 = x0 + step
+        yield [x0] + y0
+
 def _equation_constructor(expressions={},
                           parameters={},
                           variables=[]):
@@ -1571,4 +2523,887 @@ def ODE_constructor(scriptfile,
     sfile.writelines(statements)
     sfile.close()
     return statements
-    
\ No newline at end of file
+    
+
+def _term_split(term):
+    '''
+    Private function to support CompiledODE to split an expression term 
+    into its sign and its body, so that '(a * b)' and '- (a * b)' can share 
+    the same computation. The sign is only split off when the rest of the 
+    term is a single operand (a name, a number or a fully parenthesized 
+    expression); otherwise, the whole term is taken as the body.
+    
+    @param term: expression term
+    @type term: string
+    @return: tuple of (<sign: '+' or '-'>, <body>)
+    '''
+    term = ' '.join(term.split())
+    if term[:1] not in ('+', '-'):
+        return ('+', term)
+    body = term[1:].strip()
+    if re.match(r'^[\w.]+$', body):
+        return (term[0], body)
+    if body[:1] == '(':
+        depth = 0
+        for i in range(len(body)):
+            if body[i] == '(': depth = depth + 1
+            elif body[i] == ')': depth = depth - 1
+            if depth == 0:
+                if i == len(body) - 1:
+                    return (term[0], body)
+                break
+    return ('+', term)
+
+def _unpack_statement(names, sequence):
+    '''
+    Private function to support CompiledODE to generate a statement 
+    unpacking a sequence into local names.
+    
+    @param names: list of local names
+    @param sequence: name of the sequence to unpack
+    @return: generated statement code
+    '''
+    return '(%s,) = %s' % (', '.join(names), sequence)
+
+class CompiledODE(object):
+    '''
+    System of ODEs, specified in the same way as L{ODE_constructor}, 
+    compiled in-process into a single vectorized right-hand side function, 
+    rhs(t, y), which returns the list of derivatives of all variables. 
+    
+    Compared to a script generated by ODE_constructor, there is no script 
+    file to write and import, and each evaluation of the system takes one 
+    function call instead of one function call per ODE. Parameters and 
+    variables are bound to local names instead of being substituted as 
+    strings, and expression terms which appear more than once (for 
+    example, '(transmission_rate * human * zombie)' in both 
+    d(human)/dt and d(zombie)/dt, where the sign is split from the term) 
+    are computed once per evaluation and shared. In the event of zero 
+    division or overflow error, the derivatives are re-evaluated one 
+    variable at a time, and only the failing variable takes the 
+    zerodivision or overflow value.
+    
+    A CompiledODE object can be given directly to any of the explicit 
+    solvers (Euler to DP5) or to L{RK_solver} in place of the list of ODE 
+    functions. For example,
+    
+    C{
+    system = CompiledODE(expressions, parameters, initial_conditions, 
+                         modifying_expressions)
+    for x in system.integrate((0.0, 0.1, 100.0), 'RK4', 
+                              lower_bound, upper_bound):
+        print(x)
+    }
+    
+    where expressions, parameters, initial_conditions, 
+    modifying_expressions, lower_bound and upper_bound are as in the 
+    example of ODE_constructor.
+    '''
+    def __init__(self, expressions={}, parameters={},
+                 initial_conditions={}, modifying_expressions=[],
+                 overflow=1e100, zerodivision=1e100):
+        '''
+        Constructor method.
+        
+        @param expressions: dictionary of expressions for ODE(s). Please 
+        see documentation of ODE_constructor. 
+        @param parameters: dictionary of parameter values
+        @param initial_conditions: dictionary of initial conditions for 
+        each ODE. Variables with expressions but without initial 
+        conditions will start at 0.0.
+        @param modifying_expressions: list of expressions to modify the 
+        variables, which will be compiled into nonODEfunc
+        @param overflow: value (usually a large value) to assign in event 
+        of over flow error. Default = 1e100.
+        @type overflow: float
+        @param zerodivision: value (usually a large value) to assign in 
+        event of zero division error. Default = 1e100.
+        @type zerodivision: float
+        '''
+        self.variables = [str(k) for k in initial_conditions.keys()]
+        self.variables = self.variables + \
+            sorted([str(k) for k in expressions.keys()
+                    if str(k) not in self.variables])
+        self.y0 = [initial_conditions.get(k, 0.0) for k in self.variables]
+        self.parameters = [str(k) for k in parameters.keys()]
+        self.values = tuple([parameters[k] for k in parameters.keys()])
+        self.overflow = overflow
+        self.zerodivision = zerodivision
+        self.expressions = expressions
+        self.modifying_expressions = modifying_expressions
+        self._compile()
+
+    def _compile(self):
+        '''
+        Private method - generates and compiles the codes for the system 
+        of ODEs.
+        '''
+        self.source = self._generate(self.expressions,
+                                     self.modifying_expressions)
+        namespace = {'__builtins__': __builtins__,
+                     '_parameters': self.values,
+                     '_overflow': self.overflow,
+                     '_zerodivision': self.zerodivision}
+        exec('from math import *', namespace)
+        exec(compile(self.source, '<CompiledODE>', 'exec'), namespace)
+        self.function = namespace['rhs']
+        self.ensemble = namespace['ensemble']
+        if self.modifying_expressions:
+            self.nonODEfunc = namespace['modifier']
+        else:
+            self.nonODEfunc = None
+
+    def _generate(self, expressions, modifying_expressions):
+        '''
+        Private method - generates the codes for rhs(t, y, p), its per 
+        variable fall-back function for zero division and overflow 
+        errors, and modifier(y, step, p) for modifying expressions.
+        
+        @param expressions: dictionary of expressions for ODE(s)
+        @param modifying_expressions: list of expressions to modify the 
+        variables
+        @return: generated codes
+        '''
+        header = []
+        if self.parameters:
+            header.append('    ' + \
+                _unpack_statement(self.parameters, 'p'))
+        header.append('    ' + _unpack_statement(self.variables, 'y'))
+        # Split expressions into signed terms and count the usage of 
+        # each term across all ODEs
+        equations = []
+        counts = {}
+        for v in self.variables:
+            expression = expressions.get(v, [])
+            if type(expression) == type(''): expression = [expression]
+            terms = [_term_split(exp) for exp in expression
+                     if exp.strip()]
+            for (sign, body) in terms:
+                key = re.sub(r'\s+', '', body)
+                counts[key] = counts.get(key, 0) + 1
+            equations.append(terms)
+        # Generate shared terms and derivative list
+        shared = {}
+        statements = []
+        derivatives = []
+        for terms in equations:
+            code = ''
+            for (sign, body) in terms:
+                key = re.sub(r'\s+', '', body)
+                if counts[key] > 1:
+                    if key not in shared:
+                        shared[key] = '_s%s' % str(len(shared))
+                        statements.append('        %s = %s' % \
+                                          (shared[key], body))
+                    operand = shared[key]
+                else:
+                    operand = '(%s)' % body
+                code = code + ' %s %s' % (sign, operand)
+            if code.startswith(' + '): code = code[3:]
+            derivatives.append(code.strip() or '0.0')
+        rhs = ['def rhs(t, y, p=_parameters):'] + header + \
+            ['    try:'] + statements + \
+            ['        return [%s]' % ', '.join(derivatives),
+             '    except (TypeError, ZeroDivisionError, OverflowError):',
+             '        return _guarded(t, y, p)']
+        # Generate per variable fall-back, without shared terms
+        guarded = ['def _guarded(t, y, p=_parameters):'] + header + \
+            ['    d = [0.0] * %s' % str(len(self.variables))]
+        for i in range(len(equations)):
+            code = ' '.join(['%s (%s)' % (sign, body)
+                             for (sign, body) in equations[i]])
+            if not code: continue
+            guarded = guarded + \
+                ['    try: d[%s] = 0.0 %s' % (str(i), code),
+                 '    except TypeError: pass',
+                 '    except ZeroDivisionError: d[%s] = _zerodivision' % \
+                     str(i),
+                 '    except OverflowError: d[%s] = _overflow' % str(i)]
+        guarded.append('    return d')
+        # Generate ensemble function, rhs of all members in a flat list
+        ensemble = ['def ensemble(t, Y, P):',
+                    '    D = []',
+                    '    j = 0',
+                    '    for p in P:'] + \
+            ['    ' + stmt for stmt in header[:-1]] + \
+            ['        y = Y[j:j + %s]' % str(len(self.variables)),
+             '        ' + header[-1].strip(),
+             '        try:'] + \
+            ['    ' + stmt for stmt in statements] + \
+            ['            D.extend([%s])' % ', '.join(derivatives),
+             '        except (TypeError, ZeroDivisionError, OverflowError):',
+             '            D.extend(_guarded(t, y, p))',
+             '        j = j + %s' % str(len(self.variables)),
+             '    return D']
+        code = '\n'.join(rhs) + '\n\n' + '\n'.join(guarded) + \
+            '\n\n' + '\n'.join(ensemble) + '\n'
+        # Generate modifying function
+        if modifying_expressions:
+            modifier = ['def modifier(y, step, p=_parameters):'] + \
+                header + ['    %s' % str(exp)
+                          for exp in modifying_expressions] + \
+                ['    y[%s] = %s' % (str(i), self.variables[i])
+                 for i in range(len(self.variables))] + \
+                ['    return y']
+            code = code + '\n' + '\n'.join(modifier) + '\n'
+        return code
+
+    def __getstate__(self):
+        '''
+        Pickles a CompiledODE object without its generated functions, 
+        which cannot be pickled. The order of variables and parameters is 
+        kept, so that values from the original object can be used.
+        '''
+        state = dict(self.__dict__)
+        for name in ('function', 'ensemble', 'nonODEfunc'):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        '''
+        Unpickles a CompiledODE object and compiles the system of ODEs 
+        again, such as in another process.
+        '''
+        self.__dict__.update(state)
+        self._compile()
+
+    def parameterize(self, values=None):
+        '''
+        Generates the tuple of parameter values, in the order of 
+        parameters, for ensemble members or for calling function directly.
+        
+        @param values: dictionary of parameter values to replace the 
+        values given at construction. Default = None (no replacement)
+        @type values: dictionary
+        @return: tuple of parameter values
+        '''
+        if not values: return self.values
+        return tuple([values.get(self.parameters[i], self.values[i])
+                      for i in range(len(self.parameters))])
+
+    def __call__(self, t, y):
+        '''
+        Evaluates the system of ODEs.
+        
+        @param t: value of x-axis, which is usually time
+        @param y: values for variables
+        @type y: list
+        @return: list of derivatives of all variables
+        '''
+        return self.function(t, y)
+
+    def boundary(self, bound):
+        '''
+        Converts a set of boundary values keyed by variable names (as in 
+        ODE_constructor) into boundary values keyed by variable number, as 
+        required by the solvers.
+        
+        @param bound: set of boundary values keyed by variable names
+        @type bound: dictionary
+        @return: set of boundary values keyed by variable number
+        '''
+        if bound is None: return None
+        return dict([(str(self.variables.index(str(k))), bound[k])
+                     for k in bound.keys()])
+
+    def integrate(self, time=(0.0, 0.1, 100.0), ODE_solver='RK4',
+                  lower_bound=None, upper_bound=None,
+                  rtol=1e-6, atol=1e-9, times=None):
+        '''
+        Generator to integrate the system of ODEs from the initial 
+        conditions, yielding [<time>] + <values for variables> at each 
+        time step.
+        
+        If ODE_solver is an embedded Runge-Kutta pair (CK45, RKF45 or 
+        DP45), the system is integrated with adaptive step size (see 
+        L{RK_adaptive}), where the time step in time parameters is taken 
+        as the initial step size.
+        
+        @param time: tuple of time parameters for simulation in the format 
+        of (<start time>, <time step>, <end time>). Default = (0.0, 0.1, 
+        100.0)
+        @param ODE_solver: name of explicit Runge-Kutta method or embedded 
+        Runge-Kutta pair to use. Default = RK4
+        @param lower_bound: set of values for lower boundary of variables, 
+        keyed by variable names
+        @type lower_bound: dictionary
+        @param upper_bound: set of values for upper boundary of variables, 
+        keyed by variable names
+        @type upper_bound: dictionary
+        @param rtol: relative tolerance for adaptive step size. Default = 
+        1e-6
+        @type rtol: float
+        @param atol: absolute tolerance for adaptive step size. Default = 
+        1e-9
+        @type atol: float
+        @param times: values of time to yield results at, for adaptive 
+        step size. Default = None (yield results at every accepted step)
+        @type times: list
+        '''
+        if ODE_solver in RK_pairs:
+            return RK_adaptive(self, time[0], self.y0, time[2],
+                               ODE_solver, rtol, atol, time[1], None,
+                               times, self.nonODEfunc,
+                               self.boundary(lower_bound),
+                               self.boundary(upper_bound),
+                               self.overflow, self.zerodivision)
+        return RK_solver(self, time[0], self.y0, time[1], time[2],
+                         ODE_solver, self.nonODEfunc,
+                         self.boundary(lower_bound),
+                         self.boundary(upper_bound),
+                         self.overflow, self.zerodivision)
+
+
+def _ensemble_integrate(system, states, parameters, time, method,
+                        lower_bound, upper_bound):
+    '''
+    Private function - generator to integrate ensemble members together, 
+    yielding (<time>, <flat list of variables of all members>) at each time 
+    step. All members are kept in a single flat list, member after member, 
+    so that each Runge-Kutta stage is one evaluation of 
+    CompiledODE.ensemble and one list comprehension over all members.
+    
+    @param system: system of ODEs
+    @type system: CompiledODE
+    @param states: initial values for variables of each member
+    @param parameters: tuple of parameter values of each member
+    @param time: tuple of (<start time>, <time step>, <end time>)
+    @param method: name of explicit Runge-Kutta method
+    @param lower_bound: set of values for lower boundary of variables, 
+    keyed by variable number
+    @param upper_bound: set of values for upper boundary of variables, 
+    keyed by variable number
+    '''
+    function = system.ensemble
+    modifier = system.nonODEfunc
+    def rhs(x, Y):
+        return function(x, Y, parameters)
+    stepper = _RK_stepper(method)
+    m = len(system.variables)
+    (x0, step, xmax) = time
+    Y0 = []
+    for state in states:
+        Y0.extend([float(v) for v in state])
+    yield (x0, Y0)
+    while x0 < xmax:
+        Y1 = stepper(rhs, x0, Y0, step)
+        if modifier or lower_bound or upper_bound:
+            for i in range(len(parameters)):
+                y = Y1[i*m:(i+1)*m]
+                if modifier:
+                    y = modifier(y, step, parameters[i])
+                if lower_bound: 
+                    y = boundary_checker(y, lower_bound, 'lower')
+                if upper_bound: 
+                    y = boundary_checker(y, upper_bound, 'upper')
+                Y1[i*m:(i+1)*m] = y
+        Y0 = Y1
+        x0 = x0 + step
+        yield (x0, Y0)
+
+def _ensemble_shard(arguments):
+    '''
+    Private function to support Ensemble to integrate a shard of ensemble 
+    members in one process.
+    
+    @param arguments: tuple of (<CompiledODE>, <initial values of 
+    members>, <parameter values of members>, <time parameters>, <method>, 
+    <lower boundary>, <upper boundary>)
+    @return: tuple of (<array of time>, <array of variables in time step, 
+    member, variable order>)
+    '''
+    times = array('d')
+    data = array('d')
+    for (x, Y) in _ensemble_integrate(*arguments):
+        times.append(x)
+        data.extend(Y)
+    return (times, data)
+
+class EnsembleTrajectory(object):
+    '''
+    Results of ensemble integration as a compact 3-dimensional array of 
+    (time step, member, variable), stored as a flat array of doubles, and 
+    an array of time.
+    '''
+    def __init__(self, times, data, members, variables):
+        '''
+        Constructor method.
+        
+        @param times: time at each time step
+        @type times: array('d')
+        @param data: values of variables in (time step, member, variable) 
+        order
+        @type data: array('d')
+        @param members: number of members
+        @type members: integer
+        @param variables: names of variables
+        @type variables: list
+        '''
+        self.times = times
+        self.data = data
+        self.variables = variables
+        self.shape = (len(times), members, len(variables))
+
+    def value(self, step, member, variable):
+        '''
+        Gets the value of a variable of a member at a time step.
+        
+        @param step: time step index
+        @param member: member index
+        @param variable: variable index or name
+        @return: value of variable
+        '''
+        if variable in self.variables:
+            variable = self.variables.index(variable)
+        (steps, members, count) = self.shape
+        return self.data[(step * members + member) * count + variable]
+
+    def state(self, step, member):
+        '''
+        Gets the values of all variables of a member at a time step.
+        
+        @param step: time step index
+        @param member: member index
+        @return: list of values of variables
+        '''
+        (steps, members, count) = self.shape
+        start = (step * members + member) * count
+        return self.data[start:start + count].tolist()
+
+    def trajectory(self, member):
+        '''
+        Gets the trajectory of a member, in the same format as the results 
+        of the solvers - [<time>] + <values for variables> at each time 
+        step.
+        
+        @param member: member index
+        @return: list of [<time>] + <values for variables>
+        '''
+        return [[self.times[i]] + self.state(i, member)
+                for i in range(self.shape[0])]
+
+class Ensemble(object):
+    '''
+    Ensemble of members sharing the same system of ODEs (L{CompiledODE}) 
+    but with different initial conditions and/or parameter values, such as 
+    for parameter sweeps. All members are integrated together with the 
+    explicit Runge-Kutta methods (Euler to DP5) at fixed step size, where 
+    each stage evaluates the system of ODEs for all members in one 
+    function call. Large ensembles can be split into shards of members to 
+    be integrated in parallel processes.
+    
+    For example,
+    
+    C{
+    system = CompiledODE(expressions, parameters, initial_conditions)
+    sweep = [{'transmission_rate': 0.001 * i} for i in range(1000)]
+    ensemble = Ensemble(system, parameters=sweep)
+    results = ensemble.integrate((0.0, 0.1, 100.0), 'RK4', processes=4)
+    results.trajectory(10)
+    }
+    '''
+    def __init__(self, system, states=None, parameters=None):
+        '''
+        Constructor method. The number of members is the number of states 
+        or the number of parameter sets, where the other (if not given) is 
+        taken from the system of ODEs.
+        
+        @param system: system of ODEs
+        @type system: CompiledODE
+        @param states: N x M matrix of initial values, where each row is a 
+        member and each column is a variable (in the order of 
+        system.variables). Default = None (initial conditions of system 
+        for all members)
+        @type states: list
+        @param parameters: dictionary of parameter values for each member, 
+        replacing parameter values of the system. Default = None (parameter 
+        values of system for all members)
+        @type parameters: list
+        '''
+        self.system = system
+        if states is None and parameters is None:
+            states = [system.y0]
+        if states is None:
+            states = [system.y0] * len(parameters)
+        if parameters is None:
+            parameters = [None] * len(states)
+        if len(states) != len(parameters):
+            raise ValueError('Number of states (%s) and parameter sets \
+(%s) are not the same' % (str(len(states)), str(len(parameters))))
+        for state in states:
+            if len(state) != len(system.variables):
+                raise ValueError('Number of values in state (%s) is not \
+the number of variables (%s)' % (str(len(state)), 
+                                 str(len(system.variables))))
+        self.states = [list(state) for state in states]
+        self.parameters = [system.parameterize(p) for p in parameters]
+
+    def _shards(self, time, ODE_solver, lower_bound, upper_bound,
+                shard_size):
+        '''
+        Private method - splits the members into shards of arguments for 
+        _ensemble_shard.
+        
+        @return: list of (<index of first member>, <arguments>)
+        '''
+        count = len(self.states)
+        if not shard_size: shard_size = count
+        lower_bound = self.system.boundary(lower_bound)
+        upper_bound = self.system.boundary(upper_bound)
+        return [(i, (self.system, self.states[i:i + shard_size],
+                     self.parameters[i:i + shard_size], time, ODE_solver,
+                     lower_bound, upper_bound))
+                for i in range(0, count, shard_size)]
+
+    def _run(self, shards, processes):
+        '''
+        Private method - integrates shards in turn (if processes is None) 
+        or in parallel processes, as a generator of (<index of first 
+        member>, <number of members>, <results of _ensemble_shard>) in the 
+        order of shards.
+        '''
+        if processes is None or len(shards) < 2:
+            for (start, arguments) in shards:
+                yield (start, len(arguments[1]), _ensemble_shard(arguments))
+        else:
+            import multiprocessing
+            pool = multiprocessing.Pool(processes)
+            results = pool.imap(_ensemble_shard,
+                                [arguments for (start, arguments) in shards])
+            for i in range(len(shards)):
+                yield (shards[i][0], len(shards[i][1][1]), next(results))
+            pool.close()
+            pool.join()
+
+    def integrate(self, time=(0.0, 0.1, 100.0), ODE_solver='RK4',
+                  lower_bound=None, upper_bound=None,
+                  processes=None, shard_size=None):
+        '''
+        Integrates all members from their initial conditions.
+        
+        @param time: tuple of time parameters for simulation in the format 
+        of (<start time>, <time step>, <end time>). Default = (0.0, 0.1, 
+        100.0)
+        @param ODE_solver: name of explicit Runge-Kutta method to use. 
+        Default = RK4
+        @param lower_bound: set of values for lower boundary of variables, 
+        keyed by variable names
+        @type lower_bound: dictionary
+        @param upper_bound: set of values for upper boundary of variables, 
+        keyed by variable names
+        @type upper_bound: dictionary
+        @param processes: number of processes to integrate shards in 
+        parallel. Default = None (integrate shards in turn in the current 
+        process)
+        @type processes: integer
+        @param shard_size: number of members per shard. Default = None 
+        (one shard per process)
+        @type shard_size: integer
+        @return: EnsembleTrajectory object
+        '''
+        if not shard_size and processes:
+            shard_size = -(-len(self.states) // processes)
+        shards = self._shards(time, ODE_solver, lower_bound, upper_bound,
+                              shard_size)
+        members = len(self.states)
+        m = len(self.system.variables)
+        times = None
+        blocks = []
+        for (start, count, (shard_times, data)) in self._run(shards,
+                                                             processes):
+            times = shard_times
+            blocks.append((count * m, data))
+        # Interleave shards into (time step, member, variable) order
+        data = array('d')
+        for step in range(len(times)):
+            for (width, block) in blocks:
+                data.extend(block[step * width:(step + 1) * width])
+        return EnsembleTrajectory(times, data, members,
+                                  list(self.system.variables))
+
+    def stream(self, time=(0.0, 0.1, 100.0), ODE_solver='RK4',
+               lower_bound=None, upper_bound=None,
+               processes=None, shard_size=None):
+        '''
+        Generator to integrate all members from their initial conditions, 
+        yielding (<member index>, <trajectory>) for each member as soon as 
+        its shard is integrated, where trajectory is in the same format as 
+        the results of the solvers - [<time>] + <values for variables> at 
+        each time step. Hence, only one shard of results is kept at a time.
+        
+        @param time: tuple of time parameters for simulation in the format 
+        of (<start time>, <time step>, <end time>). Default = (0.0, 0.1, 
+        100.0)
+        @param ODE_solver: name of explicit Runge-Kutta method to use. 
+        Default = RK4
+        @param lower_bound: set of values for lower boundary of variables, 
+        keyed by variable names
+        @type lower_bound: dictionary
+        @param upper_bound: set of values for upper boundary of variables, 
+        keyed by variable names
+        @type upper_bound: dictionary
+        @param processes: number of processes to integrate shards in 
+        parallel. Default = None (integrate shards in turn in the current 
+        process)
+        @type processes: integer
+        @param shard_size: number of members per shard. Default = None 
+        (100 members per shard)
+        @type shard_size: integer
+        '''
+        if not shard_size: shard_size = 100
+        shards = self._shards(time, ODE_solver, lower_bound, upper_bound,
+                              shard_size)
+        variables = list(self.system.variables)
+        for (start, count, (times, data)) in self._run(shards, processes):
+            results = EnsembleTrajectory(times, data, count, variables)
+            for member in range(count):
+                yield (start + member, results.trajectory(member))
+
+class TrajectoryBuffer(object):
+    '''
+    Preallocated buffer to record the results of ODE solvers as rows of 
+    doubles, [<time>] + <values for variables>, without keeping a list per 
+    time step. Rows can be decimated - only every k-th time step, or only 
+    the time steps at (or just after) requested times, is recorded.
+    
+    Without a file, the buffer is a ring buffer which keeps the latest 
+    rows, up to its capacity. With a file, the buffer is written to the 
+    file (as native doubles, after a header of 'CPOD' and the number of 
+    doubles per row) whenever it is full, so that integrations of any 
+    number of steps can be recorded with constant memory. The file can be 
+    read by L{TrajectoryBuffer.read}.
+    
+    For example, to record every 100th step of 10^8 steps into a file,
+    
+    C{
+    buffer = TrajectoryBuffer(3, capacity=100000, every=100, 
+                              filename='zombie.dat')
+    RK_record(system, 0.0, system.y0, 1e-6, 100.0, buffer, 'RK4')
+    buffer.close()
+    for row in TrajectoryBuffer.read('zombie.dat'):
+        print(row)
+    }
+    '''
+    def __init__(self, variables, capacity=10000, every=1, times=None,
+                 filename=None):
+        '''
+        Constructor method.
+        
+        @param variables: number of variables
+        @type variables: integer
+        @param capacity: number of rows in buffer. Default = 10000
+        @type capacity: integer
+        @param every: record every k-th time step. Default = 1 (record 
+        every time step)
+        @type every: integer
+        @param times: values of x-axis to record rows at, where the first 
+        time step at or after each value is recorded. Default = None 
+        (record every time step, subject to decimation by every)
+        @type times: list
+        @param filename: name of binary file to write rows into. Default = 
+        None (ring buffer)
+        '''
+        self.width = variables + 1
+        self.capacity = capacity
+        self.buffer = array('d', [0.0]) * (capacity * self.width)
+        self.every = every
+        if times is None: self.times = None
+        else: self.times = sorted(times)
+        self.pending = 0
+        self.steps = 0
+        self.position = 0
+        self.count = 0
+        self.total = 0
+        self.sink = None
+        if filename:
+            self.sink = open(filename, 'wb')
+            self.sink.write(struct.pack('=4si', b'CPOD', self.width))
+
+    def _accept(self, x):
+        '''
+        Private method - decides if the current time step is to be 
+        recorded.
+        '''
+        self.steps = self.steps + 1
+        if self.every > 1 and (self.steps - 1) % self.every:
+            return False
+        if self.times is None:
+            return True
+        times = self.times
+        if self.pending == len(times) or \
+            x < times[self.pending] - 1e-9 * max(abs(x), 1.0):
+            return False
+        while self.pending < len(times) and \
+            times[self.pending] - 1e-9 * max(abs(x), 1.0) <= x:
+            self.pending = self.pending + 1
+        return True
+
+    def _write(self, values, x=None):
+        '''
+        Private method - writes a row into the buffer, which is x followed 
+        by values if x is given; otherwise, values is the full row.
+        '''
+        buffer = self.buffer
+        base = self.position * self.width
+        if x is None:
+            for i in range(self.width):
+                buffer[base + i] = values[i]
+        else:
+            buffer[base] = x
+            for i in range(1, self.width):
+                buffer[base + i] = values[i - 1]
+        self.position = self.position + 1
+        self.total = self.total + 1
+        if self.count < self.capacity:
+            self.count = self.count + 1
+        if self.position == self.capacity:
+            if self.sink: self.flush()
+            else: self.position = 0
+
+    def record(self, x, y):
+        '''
+        Records the values for variables at a time step, subject to 
+        decimation.
+        
+        @param x: value of x-axis, which is usually time
+        @param y: values for variables
+        @type y: list
+        @return: True if the time step is recorded
+        '''
+        if not self._accept(x): return False
+        self._write(y, x)
+        return True
+
+    def consume(self, results):
+        '''
+        Records all results from a solver, such as L{RK4} or L{BDF}, subject 
+        to decimation.
+        
+        @param results: generator or list of [<time>] + <values for 
+        variables>
+        @return: this buffer
+        '''
+        for row in results:
+            if self._accept(row[0]):
+                self._write(row)
+        return self
+
+    def flush(self):
+        '''
+        Writes the rows in buffer to file, if any, and empties the buffer.
+        '''
+        if self.sink and self.position:
+            self.buffer[:self.position * self.width].tofile(self.sink)
+            self.sink.flush()
+            self.position = 0
+            self.count = 0
+
+    def close(self):
+        '''
+        Writes the remaining rows in buffer to file, if any, and closes 
+        the file.
+        '''
+        if self.sink:
+            self.flush()
+            self.sink.close()
+            self.sink = None
+
+    def rows(self):
+        '''
+        Gets the rows in buffer, from the earliest to the latest.
+        
+        @return: list of [<time>] + <values for variables>
+        '''
+        width = self.width
+        if self.count < self.capacity or self.sink:
+            order = range(self.count)
+        else:
+            order = [(self.position + i) % self.capacity
+                     for i in range(self.capacity)]
+        return [self.buffer[i * width:(i + 1) * width].tolist()
+                for i in order]
+
+    @staticmethod
+    def read(filename, rows=10000):
+        '''
+        Generator to read the rows from a file written by TrajectoryBuffer, 
+        as [<time>] + <values for variables>.
+        
+        @param filename: name of binary file
+        @param rows: number of rows to read at a time. Default = 10000
+        '''
+        f = open(filename, 'rb')
+        (magic, width) = struct.unpack('=4si', 
+                                       f.read(struct.calcsize('=4si')))
+        if magic != b'CPOD':
+            f.close()
+            raise ValueError('%s is not a trajectory file' % filename)
+        while True:
+            block = array('d')
+            try: block.fromfile(f, rows * width)
+            except EOFError: pass
+            for i in range(len(block) // width):
+                yield block[i * width:(i + 1) * width].tolist()
+            if len(block) < rows * width: break
+        f.close()
+
+def RK_record(rhs, x0, y0, step, xmax, buffer, method='RK4', 
+              nonODEfunc=None, lower_bound=None, upper_bound=None,
+              overflow=1e100, zerodivision=1e100):
+    '''
+    Integrates a system of ODEs as L{RK_solver}, but records the results 
+    into a L{TrajectoryBuffer} instead of yielding a new list at every 
+    time step. The values for variables and the arguments of stages are 
+    kept in lists preallocated at the start, which are updated in place 
+    at every time step (see L{_RK_inplace_stepper}), with the same results 
+    as RK_solver. Only the lists of derivatives returned by rhs are new 
+    at every stage; rhs must not keep the list of values given to it for 
+    use after it returns.
+    
+    @param rhs: system of differential equations
+    @type rhs: function or list
+    @param x0: initial value of x-axis, which is usually starting time
+    @type x0: float
+    @param y0: initial values for variables
+    @type y0: list
+    @param step: step size on the x-axis (also known as step in calculus)
+    @type step: float
+    @param xmax: maximum value of x-axis, which is usually ending time
+    @type xmax: float
+    @param buffer: buffer to record results into
+    @type buffer: TrajectoryBuffer
+    @param method: name of Runge-Kutta method. Default = RK4
+    @type method: string
+    @param nonODEfunc: a function to modify the variable list (y0)
+    @type nonODEfunc: function
+    @param lower_bound: set of values for lower boundary of variables
+    @type lower_bound: dictionary
+    @param upper_bound: set of values for upper boundary of variables
+    @type upper_bound: dictionary
+    @param overflow: value (usually a large value) to assign in event of 
+    over flow error. Default = 1e100.
+    @type overflow: float
+    @param zerodivision: value (usually a large value) to assign in event 
+    of zero division error. Default = 1e100.
+    @type zerodivision: float
+    @return: buffer
+    '''
+    rhs = _RK_function(rhs, overflow, zerodivision)
+    stepper = _RK_inplace_stepper(method)
+    y0 = list(y0)
+    buffers = _RK_buffers(method, len(y0))
+    n = range(len(y0))
+    record = buffer.record
+    record(x0, y0)
+    while x0 < xmax:
+        stepper(rhs, x0, y0, step, buffers, n)
+        if nonODEfunc:
+            y1 = nonODEfunc(y0, step)
+            if y1 is not y0: y0[:] = y1
+        if lower_bound: 
+            boundary_checker(y0, lower_bound, 'lower')
+        if upper_bound: 
+            boundary_checker(y0, upper_bound, 'upper')
+        x0 = x0 + step
+        record(x0, y0)
+    return buffer
@@ -3,8 +3,11 @@ A collection of (pseudo)-random number generators
 Date created: 18th February 2016
 Licence: Python Software Foundation License version 2
 '''
+from __future__ import absolute_import
+
 import sys
 import random
+from array import array
 
 try:
     randgen = random.SystemRandom()
@@ -139,16 +142,237 @@ class MersenneTwister(Randomizer):
         '''
         Private method to generate twist.
         '''
-        for i in range(624):
-            # Get the most significant bit and add it to the less significant
-            # bits of the next number
-            t = self.block[(i+1) % 624] & 0x7fffffff
-            y = self._int32((self.block[i] & 0x80000000) + t)
-            self.block[i] = self.block[(i+397) % 624] ^ (y >> 1)
-            if y % 2 != 0:
-                self.block[i] = self.block[i] ^ 0x9908b0df
+        self.block = self._twist_block(self.block)
+        self.index = 0
+
+    def _twist_block(self, block):
+        '''
+        Private method to generate twist of a block of 624 integers, 
+        without modifying the block. Each new integer, i, depends on 
+        integers i and i+1 of the block, and integer i+397 of the block 
+        (for i < 227) or integer i-227 of the new block (for i >= 227); 
+        except integer 623, which depends on integer 0 of the new block. 
+        Hence, the new block is generated in 4 parts - integers 0 to 226, 
+        227 to 453, 454 to 622, and 623.
+        
+        @param block: block of 624 integers
+        @type block: list
+        @return: twisted block of 624 integers
+        '''
+        # Get the most significant bit and add it to the less significant
+        # bits of the next number
+        y = [(block[i] & 0x80000000) | (block[i+1] & 0x7fffffff)
+             for i in range(623)]
+        magic = (0, 0x9908b0df)
+        new = [block[i+397] ^ (y[i] >> 1) ^ magic[y[i] & 1]
+               for i in range(227)]
+        new.extend([new[i-227] ^ (y[i] >> 1) ^ magic[y[i] & 1]
+                    for i in range(227, 454)])
+        new.extend([new[i-227] ^ (y[i] >> 1) ^ magic[y[i] & 1]
+                    for i in range(454, 623)])
+        y.append((block[623] & 0x80000000) | (new[0] & 0x7fffffff))
+        new.append(new[396] ^ (y[623] >> 1) ^ magic[y[623] & 1])
+        return new
+
+    def _temper(self, block):
+        '''
+        Private method to temper a block of integers into random 
+        integers, as in _random method.
+        
+        @param block: block of integers
+        @type block: list
+        @return: list of random integers
+        '''
+        block = [y ^ (y >> 11) for y in block]
+        block = [y ^ ((y << 7) & 2636928640) for y in block]
+        block = [y ^ ((y << 15) & 4022730752) for y in block]
+        return [y ^ (y >> 18) for y in block]
+
+    def randint_array(self, n):
+        '''
+        Method to generate an array of random integers, which is the same 
+        as calling _random method n times. Random integers are generated 
+        by twisting and tempering entire blocks at a time.
+        
+        @param n: number of random integers to generate
+        @type n: integer
+        @return: array of random integers (typecode 'L')
+        '''
+        n = int(n)
+        result = array('L')
+        while len(result) < n:
+            if self.index >= 624: self._twist()
+            end = min(624, self.index + n - len(result))
+            result.extend(self._temper(self.block[self.index:end]))
+            self.index = end
+        return result
+
+    def random_array(self, n):
+        '''
+        Method to generate an array of random floats between zero (not 
+        inclusive) and one (inclusive), which is the same as calling 
+        random method n times.
+        
+        @param n: number of random floats to generate
+        @type n: integer
+        @return: array of random floats (typecode 'd')
+        '''
+        x = self.randint_array(2 * int(n))
+        return array('d', [abs(float(x[i]) / float(x[i+1])) % 1
+                           for i in range(0, len(x), 2)])
+
+    def _copy(self):
+        '''
+        Private method to make a copy of the generator at the current 
+        state.
+        
+        @return: randomize.MersenneTwister object
+        '''
+        generator = MersenneTwister(self.seed)
+        generator.block = list(self.block)
+        generator.index = self.index
+        return generator
+
+    def jump(self, steps):
+        '''
+        Method to advance the generator by a number of random integers, 
+        which is the same as (but much faster than) calling _random 
+        method for the number of steps and discarding the results.
+        
+        Large jumps (50000 steps or more) use the characteristic 
+        polynomial, P(x), of MT19937 - advancing by J steps is the same 
+        as combining the next 19937 states by the coefficients of x**J 
+        mod P(x). P(x) is found once (by Berlekamp-Massey algorithm) 
+        and jump polynomials are cached; hence, the first large jump 
+        takes a few seconds.
+        
+        @param steps: number of random integers to skip
+        @type steps: integer
+        '''
+        steps = int(steps)
+        if self.index >= 624: self._twist()
+        if steps < 50000:
+            while steps > 0:
+                if self.index >= 624: self._twist()
+                skip = min(624 - self.index, steps)
+                self.index = self.index + skip
+                steps = steps - skip
+            return
+        coefficients = _MT_jump_polynomial(self.index + steps)
+        # Integers of the current and the next 32 blocks
+        words = list(self.block)
+        block = self.block
+        for i in range(32):
+            block = self._twist_block(block)
+            words.extend(block)
+        words.reverse()
+        new = [0] * 624
+        for b in range(32):
+            # Bit k of plane is bit b of integer k
+            plane = int(''.join([str((w >> b) & 1) for w in words]), 2)
+            for m in range(624):
+                if _parity((plane >> m) & coefficients):
+                    new[m] = new[m] | (1 << b)
+        self.block = new
         self.index = 0
 
+    def spawn(self, k, stride=2**64):
+        '''
+        Method to generate independent and reproducible generators (also 
+        known as substreams) for parallel workers. The i-th generator 
+        (starting from 0) generates the random integers of this 
+        generator from the (i*stride)-th random integer onwards; hence, 
+        the generators do not overlap for up to stride random integers 
+        each. This generator is not advanced.
+        
+        @param k: number of generators
+        @type k: integer
+        @param stride: number of random integers between generators. 
+        Default = 2**64
+        @type stride: integer
+        @return: list of randomize.MersenneTwister objects
+        '''
+        generators = []
+        generator = self._copy()
+        for i in range(int(k)):
+            generators.append(generator)
+            generator = generator._copy()
+            generator.jump(stride)
+        return generators
+
+
+def _parity(x):
+    '''
+    Private function to get the parity (number of 1 bits modulo 2) of an 
+    integer.
+    '''
+    return bin(x).count('1') & 1
+
+# Characteristic polynomial of MT19937 and cached jump polynomials
+_MT_polynomial = []
+_MT_jumps = {}
+
+def _MT_characteristic():
+    '''
+    Private function to find the characteristic polynomial of MT19937, 
+    as the minimal polynomial (by Berlekamp-Massey algorithm) of the 
+    least significant bits of 2 x 19937 generated integers. As the 
+    characteristic polynomial is irreducible, it is the minimal 
+    polynomial of any generated sequence.
+    
+    @return: characteristic polynomial as integer (bit i is the 
+    coefficient of x**i)
+    '''
+    if len(_MT_polynomial) > 0: return _MT_polynomial[0]
+    generator = MersenneTwister(5489)
+    bits = []
+    while len(bits) < 2 * 19937:
+        generator._twist()
+        bits.extend([y & 1 for y in generator.block])
+    (C, B, L, m, window) = (1, 1, 0, 1, 0)
+    for n in range(2 * 19937):
+        window = (window << 1) | bits[n]
+        if not _parity(C & window):
+            m = m + 1
+        elif 2 * L <= n:
+            (T, C) = (C, C ^ (B << m))
+            (L, B, m) = (n + 1 - L, T, 1)
+        else:
+            C = C ^ (B << m)
+            m = m + 1
+    # Characteristic polynomial is the reverse of connection polynomial
+    polynomial = int(bin(C)[2:].zfill(L + 1)[::-1], 2)
+    _MT_polynomial.append(polynomial)
+    return polynomial
+
+def _MT_jump_polynomial(steps):
+    '''
+    Private function to find x**steps mod P(x) where P(x) is the 
+    characteristic polynomial of MT19937.
+    
+    @param steps: number of steps
+    @type steps: integer
+    @return: jump polynomial as integer (bit i is the coefficient of 
+    x**i)
+    '''
+    if steps in _MT_jumps: return _MT_jumps[steps]
+    P = _MT_characteristic()
+    degree = P.bit_length() - 1
+    # Squaring in GF(2) spreads the bits apart: 0b1011 -> 0b1000101
+    spread = dict([('%x' % d, '%02x' % int('0' + '0'.join(bin(d)[2:]), 2))
+                   for d in range(16)])
+    result = 1
+    for bit in bin(steps)[2:]:
+        result = int(''.join([spread[d] for d in '%x' % result]), 16)
+        if bit == '1':
+            result = result << 1
+        length = result.bit_length()
+        while length > degree:
+            result = result ^ (P << (length - 1 - degree))
+            length = result.bit_length()
+    _MT_jumps[steps] = result
+    return result
+
 
 class LCG(Randomizer):
     '''
@@ -267,6 +491,95 @@ class LCG(Randomizer):
         self.seed = t % self.modulus
         return self.seed
 
+    def _affine_power(self, steps):
+        '''
+        Private method to find the multiplier and increment to advance the 
+        generator by a number of steps, by squaring and multiplying the 
+        LCG equation, such that
+        
+        x(n+steps) = [multiplier * x(n) + increment] % modulus
+        
+        @param steps: number of steps
+        @type steps: integer
+        @return: (multiplier, increment)
+        '''
+        (A, C) = (1, 0)
+        (a, c) = (self.multiplier, self.increment)
+        steps = int(steps)
+        while steps > 0:
+            if steps & 1:
+                (A, C) = ((A * a) % self.modulus, (C * a + c) % self.modulus)
+            (a, c) = ((a * a) % self.modulus, (c * a + c) % self.modulus)
+            steps = steps >> 1
+        return (A, C)
+
+    def jump(self, steps):
+        '''
+        Method to advance the generator by a number of random integers, 
+        which is the same as calling _random method for the number of 
+        steps and discarding the results.
+        
+        @param steps: number of random integers to skip
+        @type steps: integer
+        '''
+        (A, C) = self._affine_power(steps)
+        self.seed = (A * self.seed + C) % self.modulus
+
+    def randint_list(self, n, lanes=1024):
+        '''
+        Method to generate a list of random integers, which is the same as 
+        calling _random method n times. A list is used, instead of an 
+        array as in MersenneTwister.randint_array method, as the modulus 
+        (up to 2**64) may not fit into any array typecode portably. 
+        
+        The random integers are generated in chunks of lanes. The first 
+        chunk is generated one at a time, and each subsequent chunk is 
+        generated from the previous chunk by advancing every lane by the 
+        number of lanes at once (using the multiplier and increment from 
+        _affine_power method).
+        
+        @param n: number of random integers to generate
+        @type n: integer
+        @param lanes: number of random integers in each chunk. 
+        Default = 1024
+        @type lanes: integer
+        @return: list of random integers
+        '''
+        n = int(n)
+        if n <= 0: return []
+        lanes = max(1, min(int(lanes), n))
+        (m, modulus) = (self.multiplier, self.modulus)
+        (c, x) = (self.increment, self.seed)
+        chunk = []
+        for i in range(lanes):
+            x = (m * x + c) % modulus
+            chunk.append(x)
+        (A, C) = self._affine_power(lanes)
+        result = chunk
+        while len(result) < n:
+            chunk = [(A * x + C) % modulus for x in chunk]
+            result.extend(chunk)
+        result = result[:n]
+        self.seed = result[-1]
+        return result
+
+    def random(self, size=None):
+        '''
+        Method to generate a random float between zero (not inclusive)
+        and one (inclusive) (0 < random_float <= 1).
+        
+        @param size: number of random floats to generate. Default = None, 
+        a single random float is generated
+        @type size: integer
+        @return: a random float, or an array of random floats (typecode 
+        'd') which is the same as calling this method size times
+        '''
+        if size == None:
+            return Randomizer.random(self)
+        x = self.randint_list(2 * int(size))
+        return array('d', [abs(float(x[i]) / float(x[i+1])) % 1
+                           for i in range(0, len(x), 2)])
+
 
 class CLCG(Randomizer):
     '''
@@ -312,5 +625,27 @@ class CLCG(Randomizer):
         rB = self.LCG_B.random()
         t = (rA + rB) % self.modulus
         return t * self.modulus
+
+    def random(self, size=None):
+        '''
+        Method to generate a random float between zero (not inclusive)
+        and one (inclusive) (0 < random_float <= 1). Batches of random 
+        floats are generated by combining the batches of both LCGs 
+        (see LCG.random method).
+        
+        @param size: number of random floats to generate. Default = None, 
+        a single random float is generated
+        @type size: integer
+        @return: a random float, or an array of random floats (typecode 
+        'd') which is the same as calling this method size times
+        '''
+        if size == None:
+            return Randomizer.random(self)
+        rA = self.LCG_A.random(2 * int(size))
+        rB = self.LCG_B.random(2 * int(size))
+        modulus = self.modulus
+        t = [((a + b) % modulus) * modulus for (a, b) in zip(rA, rB)]
+        return array('d', [abs(t[i] / t[i+1]) % 1
+                           for i in range(0, len(t), 2)])
         
 
@@ -7,6 +7,7 @@ Date created: 19th March 2008
 """
 
 import string
+from functools import cmp_to_key
 from treenodes import *
 
 class RBTreeIter(object):
@@ -134,6 +135,7 @@ class RBTree(object):
         self.sentinel.left = self.sentinel.right = self.sentinel
         self.sentinel.color = BLACK
         self.sentinel.nonzero = 0
+        self.sentinel.size = 0
         self.root = self.sentinel
         self.elements = 0
         
@@ -203,6 +205,10 @@ class RBTree(object):
         if x != self.sentinel:
             x.parent = y
 
+        # maintain subtree sizes
+        y.size = x.size
+        x.size = x.left.size + x.right.size + 1
+
     def rotateRight(self, x):
 
         #***************************
@@ -232,6 +238,10 @@ class RBTree(object):
         if x != self.sentinel:
             x.parent = y
 
+        # maintain subtree sizes
+        y.size = x.size
+        x.size = x.left.size + x.right.size + 1
+
     def insertFixup(self, x):
         #************************************
         #  maintain Red-Black tree balance  *
@@ -344,6 +354,11 @@ class RBTree(object):
         else:
             self.root = x
 
+        # maintain subtree sizes along the insertion path
+        while parent:
+            parent.size += 1
+            parent = parent.parent
+
         self.insertFixup(x)
         return x
 
@@ -448,6 +463,12 @@ class RBTree(object):
         else:
             self.root = x
 
+        # maintain subtree sizes along the deletion path
+        p = y.parent
+        while p:
+            p.size -= 1
+            p = p.parent
+
         if y != z:
             z.key = y.key
             z.value = y.value
@@ -563,6 +584,134 @@ class RBTree(object):
             if self.__cmp(cur.key, next.key)<0:
                 return cur
 
+    def findNodeByRank(self, index):
+        """returns the node at position index (0-based) in key order,
+        using the subtree sizes to descend in O(log n)"""
+        if (index < 0) or (index >= self.elements):
+            raise IndexError ("index out of range")
+        cur = self.root
+        while cur != self.sentinel:
+            left = cur.left.size
+            if index < left:
+                cur = cur.left
+            elif index == left:
+                return cur
+            else:
+                index = index - left - 1
+                cur = cur.right
+
+    def rankOfNode(self, node):
+        """returns the position (0-based) of node in key order in 
+        O(log n)"""
+        rank = node.left.size
+        while node.parent:
+            if node == node.parent.right:
+                rank = rank + node.parent.left.size + 1
+            node = node.parent
+        return rank
+
+    def lowerBoundNode(self, key):
+        """returns the first node whose key is not less than key, or None
+        if there isn't one"""
+        current = self.root
+        result = None
+        while current != self.sentinel:
+            if self.__cmp(current.key, key) < 0:
+                current = current.right
+            else:
+                result = current
+                current = current.left
+        return result
+
+    def iterNodes(self, lo=None, hi=None):
+        """iterates over the nodes with lo <= key < hi in key order, 
+        without building a list of nodes. lo and/or hi can be None for 
+        an open-ended range."""
+        if self.root == self.sentinel:
+            return
+        if lo is None:
+            cur = self.firstNode()
+        else:
+            cur = self.lowerBoundNode(lo)
+        while cur:
+            if hi is not None and self.__cmp(cur.key, hi) >= 0:
+                return
+            yield cur
+            cur = self.nextNode(cur)
+
+    def _buildFromSorted(self, items, lo, hi, level, redLevel, parent):
+        # builds a balanced subtree from items[lo:hi] and returns its root
+        if lo >= hi:
+            return self.sentinel
+        mid = (lo + hi) // 2
+        (key, value, count) = items[mid]
+        node = RBNode(key, value, BLACK)
+        node.count = count
+        node.size = hi - lo
+        node.parent = parent
+        if level == redLevel:
+            node.color = RED
+        node.left = self._buildFromSorted(items, lo, mid, level + 1, 
+                                          redLevel, node)
+        node.right = self._buildFromSorted(items, mid + 1, hi, level + 1,
+                                           redLevel, node)
+        return node
+
+    def buildFromSorted(self, items):
+        """replaces the contents of the tree by the (key, value) pairs 
+        in items, which must be sorted in key order without duplicated 
+        keys, in O(n). A third element in a pair, if given, is used as 
+        the insertion count of the node."""
+        items = [(x[0], x[1], (len(x) > 2 and x[2]) or 1) for x in items]
+        # nodes on the deepest, incomplete level are coloured red and 
+        # all others black, which satisfies the Red-Black properties
+        redLevel = 0
+        m = len(items) - 1
+        while m >= 0:
+            redLevel = redLevel + 1
+            m = m // 2 - 1
+        root = self._buildFromSorted(items, 0, len(items), 0, 
+                                     redLevel, None)
+        if root != self.sentinel:
+            root.color = BLACK
+        self.root = root
+        self.elements = len(items)
+
+    def bulkInsert(self, items, replace=False):
+        """inserts the (key, value) pairs in items by sorting them, 
+        merging them with the current contents and rebuilding the tree 
+        in O(n + m log m). As in insertNode, the first value of a 
+        repeated key is kept; for unique trees, a warning is printed, 
+        and for non-unique trees, the insertion counts are added up. 
+        If replace is True, the last value of a repeated key is kept 
+        instead (as in assigning the value of a key of RBDict)."""
+        keyfn = cmp_to_key(lambda x, y: self.__cmp(x[0], y[0]))
+        new = sorted([(x[0], x[1], 1) for x in items], key=keyfn)
+        old = [(x.key, x.value, x.count) for x in self.iterNodes()]
+        merged = []
+        i = j = 0
+        while i < len(old) or j < len(new):
+            if j == len(new) or (i < len(old) and \
+                    self.__cmp(old[i][0], new[j][0]) <= 0):
+                item = old[i]
+                i = i + 1
+            else:
+                item = new[j]
+                j = j + 1
+            if merged and self.__cmp(merged[-1][0], item[0]) == 0:
+                (key, value, count) = merged[-1]
+                if replace:
+                    value = item[1]
+                elif self.unique == False:
+                    count = count + item[2]
+                else:
+                    print("Warning: This element is already in the list ... \
+                    ignored!")
+                merged[-1] = (key, value, count)
+            else:
+                merged.append(item)
+        self.buildFromSorted(merged)
+
 
 class RBList(RBTree):
     """ List class uses same object for key and value
@@ -573,8 +722,7 @@ class RBList(RBTree):
         #SF new option: unique trees, see RBTree.__init__() for 
         #SF more information
         RBTree.__init__(self, cmpfn, unique)
-        for item in list:
-            self.insertNode (item, item)
+        self.bulkInsert([(item, item) for item in list])
 
     def __getitem__ (self, index):
         node = self.findNodeByIndex (index)
@@ -594,23 +742,7 @@ class RBList(RBTree):
     def findNodeByIndex (self, index):
         if (index < 0) or (index >= self.elements):
             raise IndexError ("pop index out of range")
-        #
-        if index < self.elements / 2:
-            # simple scan from start of list
-            node = self.firstNode()
-            currIndex = 0
-            while currIndex < index:
-                node = self.nextNode (node)
-                currIndex += 1
-        else:
-            # simple scan from end of list
-            node = self.lastNode()
-            currIndex = self.elements - 1
-            while currIndex > index:
-                node = self.prevNode (node)
-                currIndex -= 1
-        #
-        return node
+        return self.findNodeByRank (index)
 
     def insert (self, item):
         #SF The function inserNode already checks for existing Nodes 
@@ -637,19 +769,18 @@ class RBList(RBTree):
         return node.count
 
     def index (self, item):
-        index = -1
         node = self.findNode (item)
-        while node is not None:
-            node = self.prevNode (node)
-            index += 1
-        #
-        if index < 0:
+        if node is None:
             raise ValueError ("RBList.index: item not in list")
-        return index
+        return self.rankOfNode (node)
 
     def extend (self, otherList):
-        for item in otherList:
-            self.insert (item)
+        self.bulkInsert ([(item, item) for item in otherList])
+
+    def iterValues (self, lo=None, hi=None):
+        """iterates over the items with lo <= item < hi"""
+        for node in self.iterNodes (lo, hi):
+            yield node.value
 
     def pop (self, index=None):
         if index is None:
@@ -680,6 +811,7 @@ class RBList(RBTree):
         self.sentinel.left = self.sentinel.right = self.sentinel
         self.sentinel.color = BLACK
         self.sentinel.nonzero = 0
+        self.sentinel.size = 0
         self.root = self.sentinel
         self.elements = 0
 
@@ -696,8 +828,7 @@ class RBDict(RBTree):
 
     def __init__(self, dict={}, cmpfn=cmp):
         RBTree.__init__(self, cmpfn)
-        for key, value in list(dict.items()):
-            self[key]=value
+        self.bulkInsert(list(dict.items()))
 
     def __str__(self):
         # eval(str(self)) returns a regular dictionary
@@ -732,14 +863,41 @@ class RBDict(RBTree):
             return n.value
         return default
 
-    def keys(self):
-        return map(lambda x: x.key, self.nodes())
+    def keys(self, lo=None, hi=None):
+        return list(self.iterkeys(lo, hi))
+
+    def values(self, lo=None, hi=None):
+        return list(self.itervalues(lo, hi))
+
+    def items(self, lo=None, hi=None):
+        return list(self.iteritems(lo, hi))
 
-    def values(self):
-        return map(lambda x: x.value, self.nodes())
+    def iterkeys(self, lo=None, hi=None):
+        """iterates over the keys with lo <= key < hi"""
+        for node in self.iterNodes(lo, hi):
+            yield node.key
 
-    def items(self):
-        return map(tuple, self.nodes())
+    def itervalues(self, lo=None, hi=None):
+        """iterates over the values of keys with lo <= key < hi"""
+        for node in self.iterNodes(lo, hi):
+            yield node.value
+
+    def iteritems(self, lo=None, hi=None):
+        """iterates over the (key, value) pairs with lo <= key < hi"""
+        for node in self.iterNodes(lo, hi):
+            yield (node.key, node.value)
+
+    def index(self, key):
+        """returns the position (0-based) of key in key order"""
+        n = self.findNode(key)
+        if n is None:
+            raise IndexError ("%s is not in the tree" % str(key))
+        return self.rankOfNode(n)
+
+    def nth(self, index):
+        """returns the (key, value) pair at position index in key order"""
+        n = self.findNodeByRank(index)
+        return (n.key, n.value)
 
     def has_key(self, key):
         return self.findNode(key) <> None
@@ -754,6 +912,7 @@ class RBDict(RBTree):
         self.sentinel.left = self.sentinel.right = self.sentinel
         self.sentinel.color = BLACK
         self.sentinel.nonzero = 0
+        self.sentinel.size = 0
         self.root = self.sentinel
         self.elements = 0
 
@@ -765,11 +924,16 @@ class RBDict(RBTree):
     def update(self, other):
         """Add all items from the supplied mapping to this one.
 
-        Will overwrite old entries with new ones.
+        Will overwrite old entries with new ones. Large updates are 
+        merged in bulk and the tree is rebuilt in linear time.
 
         """
-        for key in list(other.keys()):
-            self[key] = other[key]
+        if len(other) < self.elements // 8:
+            for key in list(other.keys()):
+                self[key] = other[key]
+        else:
+            self.bulkInsert([(key, other[key]) 
+                             for key in list(other.keys())], replace=True)
 
     def setdefault(self, key, value=None):
         if self.has_key(key):
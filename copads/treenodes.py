@@ -11,6 +11,9 @@ BLACK = 0
 RED = 1
 
 class RBNode(object):
+    # no instance dictionary - trees may hold millions of nodes
+    __slots__ = ('left', 'right', 'parent', 'color', 'key', 'value', 
+                 'nonzero', 'count', 'size')
 
     def __init__(self, key = None, value = None, color = RED):
         self.left = self.right = self.parent = None
@@ -19,6 +22,8 @@ class RBNode(object):
         self.value = value
         self.nonzero = 1
         self.count = 1
+        # number of nodes in the subtree rooted at this node
+        self.size = 1
 
     def __str__(self):
         return repr(self.key) + ': ' + repr(self.value)
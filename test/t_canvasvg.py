@@ -0,0 +1,100 @@
+import sys
+import os
+import random
+import unittest
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+sys.path.append(os.path.join(os.path.dirname(os.getcwd()), 'copads'))
+import canvasvg
+
+class FakeCanvas(object):
+    '''
+    Canvas with the methods used by canvasvg, holding random lines, 
+    ovals, rectangles and polygons, so that no display is needed.
+    '''
+    tk = None
+    options = {'state': '', 'tags': '', 'outline': 'red', 'fill': 'blue', 
+               'width': '2.0', 'activewidth': '0', 'disabledwidth': '0', 
+               'capstyle': 'butt', 'joinstyle': 'round', 'smooth': '0', 
+               'arrow': 'none', 'dashoffset': '0'}
+    colours = {'red': (65535, 0, 0), 'blue': (0, 0, 65535)}
+    def __init__(self, n):
+        r = random.Random(1)
+        self.items = {}
+        for i in range(1, n + 1):
+            item_type = r.choice(['line', 'oval', 'rectangle', 'polygon'])
+            if item_type in ('oval', 'rectangle') or r.random() < 0.6:
+                k = 4
+            else:
+                k = 8
+            self.items[i] = (item_type, 
+                             [float(r.randrange(500)) for j in range(k)])
+    def find_all(self):
+        return sorted(self.items.keys())
+    def type(self, item):
+        return self.items[item][0]
+    def coords(self, item):
+        return self.items[item][1]
+    def itemconfigure(self, item):
+        return dict([(k, (k, '', '', '', v)) 
+                     for (k, v) in self.options.items()])
+    def itemcget(self, item, option):
+        return ''
+    def bbox(self, item):
+        if item == canvasvg.ALL:
+            boxes = [self.bbox(i) for i in self.items]
+            return (min([b[0] for b in boxes]), min([b[1] for b in boxes]), 
+                    max([b[2] for b in boxes]), max([b[3] for b in boxes]))
+        coords = self.items[item][1]
+        return (min(coords[0::2]), min(coords[1::2]), 
+                max(coords[0::2]), max(coords[1::2]))
+    def winfo_rgb(self, colour):
+        return self.colours[colour]
+
+def document_svg(canvas, items=None, margin=10):
+    '''
+    SVG document built in memory with convert function.
+    '''
+    doc = canvasvg.SVGdocument()
+    for element in canvasvg.convert(doc, canvas, items):
+        doc.documentElement.appendChild(element)
+    (x1, y1, x2, y2) = canvasvg.bbox(canvas, items)
+    (x1, y1, x2, y2) = (x1 - margin, y1 - margin, x2 + margin, y2 + margin)
+    doc.documentElement.setAttribute('width', "%0.3f" % (x2 - x1))
+    doc.documentElement.setAttribute('height', "%0.3f" % (y2 - y1))
+    doc.documentElement.setAttribute('viewBox', "%0.3f %0.3f %0.3f %0.3f" 
+                                     % (x1, y1, x2 - x1, y2 - y1))
+    return doc.toxml()
+
+class testWriteAll(unittest.TestCase):
+    '''
+    Test that streaming canvas items into SVG (writeall function) gives 
+    the same document as building it in memory.
+    '''
+    def setUp(self):
+        self.canvas = FakeCanvas(500)
+    def testAllItems(self):
+        for buffersize in (1, 1000, 65536):
+            f = StringIO()
+            canvasvg.writeall(f, self.canvas, buffersize=buffersize)
+            self.assertEqual(f.getvalue(), document_svg(self.canvas))
+    def testSomeItems(self):
+        f = StringIO()
+        canvasvg.writeall(f, self.canvas, items=[5, 9, 200], margin=3)
+        self.assertEqual(f.getvalue(), 
+                         document_svg(self.canvas, [5, 9, 200], 3))
+    def testIterConvert(self):
+        doc = canvasvg.SVGdocument()
+        elements = [element.toxml() for element in 
+                    canvasvg.convert(doc, self.canvas)]
+        streamed = [element.toxml() 
+                    for converted in canvasvg.iterconvert(doc, self.canvas)
+                    for element in converted]
+        self.assertEqual(streamed, elements)
+        self.assertTrue(len(elements) >= 500)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1070,6 +1070,237 @@ class testDataframe(unittest.TestCase):
                                     'J':[19, 29, 39, 49]})
         
 
+class testCSV(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.filepath = tempfile.mktemp()
+        f = open(self.filepath, 'w')
+        f.write('label,seriesA,seriesB\n')
+        for i in range(25):
+            f.write('L%i, %i, %s\n' % (i, i, str(i * 0.5)))
+        f.close()
+    def tearDown(self):
+        os.remove(self.filepath)
+    def testAddCSV(self):
+        for df in [d.Dataframe('frame1'), d.ColumnarDataframe('frame1')]:
+            df.addCSV(self.filepath, chunksize=7)
+            self.assertEqual(df.series_names, ['seriesA', 'seriesB'])
+            self.assertEqual(len(df.label), 25)
+            self.assertEqual(df.data['L3'], ['3', '1.5'])
+    def testAddCSVInferType(self):
+        for df in [d.Dataframe('frame1'), d.ColumnarDataframe('frame1')]:
+            df.addData({'seriesC': [1, 2]}, ['L0', 'X'])
+            df.addCSV(self.filepath, chunksize=7, infer_type=True)
+            self.assertEqual(df.series_names, 
+                             ['seriesC', 'seriesA', 'seriesB'])
+            self.assertEqual(df.data['L3'], [None, 3, 1.5])
+            self.assertEqual(df.data['L0'], [1, 0, 0.0])
+            self.assertEqual(df.data['X'], [2, None, None])
+    def testAddCSVInferColumnType(self):
+        f = open(self.filepath, 'w')
+        f.write('label,seriesA,seriesB,seriesC\n')
+        f.write('1,1,1,x\n')
+        f.write('2,2,1.5,"3,5"\n')
+        f.write('3,,2,7\n')
+        f.close()
+        for df in [d.Dataframe('frame1'), d.ColumnarDataframe('frame1')]:
+            df.addCSV(self.filepath, infer_type=True)
+            self.assertEqual(sorted(df.label), ['1', '2', '3'])
+            self.assertEqual(df.data['1'], [1, 1.0, 'x'])
+            self.assertEqual(df.data['2'], [2, 1.5, '3,5'])
+            self.assertEqual(df.data['3'], ['', 2.0, '7'])
+            self.assertEqual(type(df.data['1'][1]), float)
+    def testIterCSV(self):
+        df = d.ColumnarDataframe('frame1')
+        chunks = [chunk for chunk in df.iterCSV(self.filepath, chunksize=10,
+                                                infer_type=True)]
+        self.assertEqual([len(chunk.label) for chunk in chunks], [10, 10, 5])
+        self.assertEqual(chunks[2].data['L24'], [24, 12.0])
+        self.assertEqual(df.data, {})
+        
+
+class testColumnarDataframe(unittest.TestCase):
+    def setUp(self):
+        self.df = d.Dataframe('frame1')
+        dataset = {'seriesA': [10, 11, 12, 13, 14, 15, 16, 17, 18, 19],
+                   'seriesB': [20, 21, 22, 23, 24, 25, 26, 27, 28, 29],
+                   'seriesC': [30, 31, 32, 33, 34, 35, 36, 37, 38, 39],
+                   'seriesD': [40, 41, 42, 43, 44, 45, 46, 47, 48, 49]}
+        self.label = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J']
+        self.df.addData(dataset, self.label)
+        self.cdf = d.ColumnarDataframe('frame1')
+        self.cdf.addData(dataset, self.label)
+    def testAddData(self):
+        self.assertEqual(self.cdf.series_names, self.df.series_names)
+        self.assertEqual(self.cdf.data, self.df.data)
+        self.assertEqual(self.cdf.label, self.label)
+        self.assertEqual(self.cdf.columns[0].typecode, 'l')
+        self.assertEqual(self.df.toColumnar().data, self.df.data)
+        self.assertEqual(self.df.toColumnar().label, self.df.label)
+        self.assertEqual(self.cdf.toDataframe().data, self.df.data)
+    def testAddSeriesFillIn(self):
+        s = d.Series('seriesE')
+        s.addData([50, 51], ['A', 'K'])
+        self.df.addSeries(s, 0)
+        self.cdf.addSeries(s, 0)
+        self.assertEqual(self.cdf.data, self.df.data)
+    def testCast(self):
+        self.df.cast('float', 1e-10, 'seriesB')
+        self.cdf.cast('float', 1e-10, 'seriesB')
+        self.assertEqual(self.cdf.data, self.df.data)
+        self.assertEqual(self.cdf.columns[1].typecode, 'd')
+        self.df.cast('string', 'NA')
+        self.cdf.cast('string', 'NA')
+        self.assertEqual(self.cdf.data, self.df.data)
+    def testExtract(self):
+        for op in ['>', '<', '>=', '<=', '=', '!=', '*']:
+            self.assertEqual(self.cdf.extractValue(op, 33).data, 
+                             self.df.extractValue(op, 33).data)
+        for op in ['>', '<', '>=', '<=', '=', '*']:
+            self.assertEqual(
+                self.cdf.extractSeriesValue('seriesC', op, 33).data,
+                self.df.extractSeriesValue('seriesC', op, 33).data)
+        self.assertEqual(self.cdf.extractLabels(['B', 'D']).data,
+                         self.df.extractLabels(['B', 'D']).data)
+        self.assertEqual(
+            self.cdf.extractSeries(['seriesA', 'seriesD']).data,
+            self.df.extractSeries(['seriesA', 'seriesD']).data)
+    def testChangeAndRemove(self):
+        for df in [self.df, self.cdf]:
+            df.changeDatum('X', 'seriesB', 'C')
+            df.replaceSeries('seriesA', '>', 15, 0)
+            df.replaceLabel('E', '<', 30, 1.5)
+            df.removeLabel('B')
+            df.removeSeries('seriesC')
+            df.changeLabel('Z', 'J')
+        self.assertEqual(self.cdf.data, self.df.data)
+        self.assertEqual(self.cdf.getDatum('seriesB', 'C'), 'X')
+        self.assertEqual(self.cdf.getDatum('seriesD', 'Z'), 49)
+    def testGet(self):
+        self.assertEqual(self.cdf.getLabels(23), ['D'])
+        self.assertEqual(self.cdf.getSeries(23), ['seriesB'])
+        self.assertEqual(self.cdf.getSeriesLabels(23), [('seriesB', 'D')])
+        self.assertEqual(self.cdf.getLabels(99), [None])
+        
+
+class testSeriesIndex(unittest.TestCase):
+    def setUp(self):
+        dataset = {'seriesA': [10, 11, 12, 13, 14, 15, 16, 17, 18, 19],
+                   'seriesB': [20, 21, 22, 23, 24, 25, 26, 17, 28, 29],
+                   'seriesC': ['x', 'y', 'x', 'y', 'x', 'y', 'x', 'y', 
+                               'x', 'y']}
+        label = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J']
+        self.frames = []
+        for df in [d.Dataframe('frame1'), d.ColumnarDataframe('frame1')]:
+            df.addData(dataset, label)
+            self.frames.append(df)
+    def testIndexFind(self):
+        index = self.frames[0].createIndex('seriesA')
+        self.assertEqual(sorted(index.find('>', 16)), ['H', 'I', 'J'])
+        self.assertEqual(sorted(index.find('<=', 11)), ['A', 'B'])
+        self.assertEqual(sorted(index.find('=', 14)), ['E'])
+        self.assertEqual(len(index.find('!=', 14)), 9)
+    def testIndexedExtract(self):
+        for df in self.frames:
+            plain = df.extractSeriesValue('seriesA', '>=', 15).data
+            values = df.extractValue('<', 12).data
+            labels = sorted(df.getLabels(17))
+            for name in df.series_names: df.createIndex(name)
+            self.assertEqual(df.extractSeriesValue('seriesA', '>=', 15).data,
+                             plain)
+            self.assertEqual(df.extractValue('<', 12).data, values)
+            self.assertEqual(sorted(df.getLabels(17)), labels)
+            self.assertEqual(sorted(df.getSeriesLabels(17)), 
+                             [('seriesA', 'H'), ('seriesB', 'H')])
+    def testIndexMaintenance(self):
+        for df in self.frames:
+            df.createIndex('seriesA')
+            df.changeDatum(50, 'seriesA', 'C')
+            df.addData({'seriesD': [1]}, ['K'], 60)
+            df.removeLabel('D')
+            df.changeLabel('Z', 'J')
+            self.assertEqual(
+                sorted(df.extractSeriesValue('seriesA', '>', 18).label),
+                ['C', 'K', 'Z'])
+            self.assertEqual(df.extractSeriesValue('seriesA', '=', 13).label,
+                             [])
+    def testAddSeriesIndex(self):
+        for df in self.frames:
+            df.createIndex('seriesA')
+            df.createIndex('seriesC')
+            s = d.Series('seriesD')
+            s.addData([1, 2, 3], ['A', 'K', 'L'])
+            df.addSeries(s, 0)
+            self.assertEqual(sorted(df.indexes['seriesA'].find('=', 0)), 
+                             ['K', 'L'])
+            self.assertEqual(sorted(df.indexes['seriesC'].find('=', 'x')), 
+                             ['A', 'C', 'E', 'G', 'I'])
+            self.assertEqual(sorted(df.extractWhere([('seriesA', '<', 11), 
+                                                     ('seriesD', '>', 0)], 
+                                                    conjunction='and').label),
+                             ['A', 'K', 'L'])
+    def testExtractWhere(self):
+        for df in self.frames:
+            for indexed in [False, True]:
+                if indexed: df.createIndex('seriesC')
+                ndf = df.extractWhere([('seriesA', '>', 12), 
+                                       ('seriesC', '=', 'x')])
+                self.assertEqual(sorted(ndf.label), ['E', 'G', 'I'])
+                ndf = df.extractWhere([('seriesA', '<', 11), 
+                                       ('seriesB', '=', 17)], 
+                                      conjunction='or')
+                self.assertEqual(sorted(ndf.label), ['A', 'H'])
+        
+
+class testGroupBy(unittest.TestCase):
+    def setUp(self):
+        self.dataset = {'seriesA': [10, 11, 12, 13, 14, 15, 16, 17, 18, 19],
+                        'seriesB': [2.0, 4.0, 4.0, 4.0, 5.0, 5.0, 7.0, 9.0, 
+                                    1.0, None],
+                        'seriesC': ['x', 'x', 'x', 'x', 'x', 'x', 'x', 'x', 
+                                    'y', 'y']}
+        self.label = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J']
+    def testAggregate(self):
+        for df in [d.Dataframe('frame1'), d.ColumnarDataframe('frame1')]:
+            df.addData(self.dataset, self.label)
+            gdf = df.groupBy('seriesC').aggregate(
+                {'seriesA': ['sum', 'min', 'max'], 
+                 'seriesB': ['count', 'mean', 'var']})
+            self.assertEqual(gdf.series_names, 
+                             ['seriesA_sum', 'seriesA_min', 'seriesA_max',
+                              'seriesB_count', 'seriesB_mean', 
+                              'seriesB_var'])
+            self.assertEqual(gdf.data['y'], [37, 18, 19, 1, 1.0, None])
+            self.assertEqual(gdf.data['x'][:4], [108, 10, 17, 8])
+            self.assertAlmostEqual(gdf.data['x'][4], 5.0)
+            self.assertAlmostEqual(gdf.data['x'][5], 32.0 / 7)
+    def testAggregateStrings(self):
+        for df in [d.Dataframe('frame1'), d.ColumnarDataframe('frame1')]:
+            df.addData(self.dataset, self.label)
+            df.addData({'seriesD': ['p', 'q', 'r', 's', 't', 'u', 'v', 'w', 
+                                    'x', None]}, self.label)
+            gdf = df.groupBy('seriesC').aggregate(
+                {'seriesD': ['count', 'min', 'max', 'sum', 'mean']})
+            self.assertEqual(gdf.data['x'], [8, 'p', 'w', 0, None])
+            self.assertEqual(gdf.data['y'], [1, 'x', 'x', 0, None])
+    def testMultiDataframeAggregate(self):
+        mdf = d.MultiDataframe('multiframe1')
+        df1 = d.Dataframe('frame1')
+        df1.addData(self.dataset, self.label)
+        df2 = d.Dataframe('frame2')
+        df2.addData({'seriesA': [1, 2, 3], 'seriesC': ['x', 'y', 'z']}, 
+                    ['K', 'L', 'M'])
+        mdf.addDataframe(df1)
+        mdf.addDataframe(df2)
+        for processes in [None, 2]:
+            gdf = mdf.groupBy('seriesC').aggregate(
+                {'seriesA': ['count', 'sum', 'mean', 'var']}, 
+                processes=processes)
+            self.assertEqual(gdf.data['z'], [1, 3, 3.0, None])
+            self.assertEqual(gdf.data['y'][:3], [3, 39, 13.0])
+            self.assertAlmostEqual(gdf.data['y'][3], 91.0)
+        
+
 class testMultiDataframe(unittest.TestCase):
     def testAddDataFrame1(self):
         df = d.Dataframe('frame1')
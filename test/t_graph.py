@@ -22,6 +22,29 @@ class testGraph(unittest.TestCase):
         g = Graph(graph = G)
         self.assertEquals(g.shortestPath('s', 'v'), ['s', 'x', 'u', 'v'])
         
+    def testAllPairsShortestPath(self):
+        for method in ['FloydWarshall', 'Dijkstra']:
+            g = Graph(graph = G)
+            g.allPairsShortestPath(method)
+            self.assertEquals(g.shortestPath('s', 'v'), ['s', 'x', 'u', 'v'])
+            self.assertEquals(g.paths.getDistance('s', 'v'), 9)
+            self.assertEquals(g.paths.getDistance('y', 'u'), 15)
+        
+    def testShortestPathsPersistence(self):
+        import tempfile
+        g = Graph(graph = G)
+        g.allPairsShortestPath()
+        filename = tempfile.mktemp()
+        g.paths.save(filename)
+        for memmap in [True, False]:
+            h = Graph(graph = G)
+            h.loadShortestPaths(filename, memmap)
+            self.assertEquals(h.shortestPath('y', 'u'), ['y', 's', 'x', 'u'])
+            self.assertEquals(h.paths.getDistance('v', 's'), 11)
+            self.assertTrue(h.paths.isReachable('u', 'y'))
+            h.paths.close()
+        os.remove(filename)
+        
     def testMakeGraphFromVertices(self):
         g = Graph(vertices = ['s', 'u', 'v', 'x', 'y'])
         self.assertEquals(g.graph, {'s':{}, 'u':{}, 'v':{}, 'x':{}, 'y':{}})
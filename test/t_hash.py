@@ -0,0 +1,98 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.getcwd()), 'copads'))
+import hash
+
+def write_file(filename, size, seed):
+    f = open(filename, 'wb')
+    f.write(bytearray([(seed * 31 + i * 7) % 251 for i in range(size)]))
+    f.close()
+
+class testFastCFH(unittest.TestCase):
+    '''
+    Test that fast_cfh function generates the same hash as cfh function.
+    '''
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'data')
+        write_file(self.filename, 50000, 1)
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    def testBlockSize(self):
+        for blocksize in (64, 1000, 1024, 4096, 60000):
+            self.assertEqual(hash.fast_cfh(self.filename, blocksize), 
+                             hash.cfh(self.filename, blocksize))
+    def testStartPoints(self):
+        for startpoints in (1, 3, 10, 49):
+            self.assertEqual(hash.fast_cfh(self.filename, 512, 
+                                           startpoints), 
+                             hash.cfh(self.filename, 512, startpoints))
+    def testAlgorithm(self):
+        for algorithm in ('md5', 'sha1', 'sha256', 'sha384'):
+            self.assertEqual(hash.fast_cfh(self.filename, 
+                                           algorithm=algorithm), 
+                             hash.cfh(self.filename, algorithm=algorithm))
+    def testThreads(self):
+        self.assertEqual(hash.fast_cfh(self.filename, 2048, threads=4), 
+                         hash.cfh(self.filename, 2048))
+
+class testHashTree(unittest.TestCase):
+    '''
+    Test for hash_tree function and its digest cache.
+    '''
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cachefile = os.path.join(self.directory, 'cache.cfh')
+        self.data = os.path.join(self.directory, 'data')
+        os.mkdir(self.data)
+        self.filenames = [os.path.join(self.data, 'file%i' % i) 
+                          for i in range(4)]
+        for i in range(len(self.filenames)):
+            write_file(self.filenames[i], 5000 + 1000 * i, i)
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    def testDigest(self):
+        result = dict([(filename, digest) for (filename, digest, cached) 
+                       in hash.hash_tree([self.data])])
+        self.assertEqual(sorted(result.keys()), self.filenames)
+        for filename in self.filenames:
+            self.assertEqual(result[filename], hash.cfh(filename))
+    def testCache(self):
+        first = list(hash.hash_tree([self.data], cachefile=self.cachefile))
+        self.assertEqual([cached for (f, d, cached) in first], 
+                         [False] * 4)
+        second = list(hash.hash_tree([self.data], 
+                                     cachefile=self.cachefile))
+        self.assertEqual([cached for (f, d, cached) in second], 
+                         [True] * 4)
+        self.assertEqual(sorted(first), 
+                         sorted([(f, d, False) for (f, d, c) in second]))
+    def testPruneDeletedFile(self):
+        list(hash.hash_tree([self.data], cachefile=self.cachefile))
+        os.remove(self.filenames[0])
+        list(hash.hash_tree([self.data], cachefile=self.cachefile))
+        cache = hash.read_hash_cache(self.cachefile)
+        self.assertEqual(sorted(cache.keys()), self.filenames[1:])
+    def testCloseBeforePool(self):
+        list(hash.hash_tree([self.filenames[0]], cachefile=self.cachefile))
+        results = hash.hash_tree([self.data], cachefile=self.cachefile, 
+                                 processes=2)
+        (filename, digest, cached) = next(results)
+        self.assertEqual(cached, True)
+        results.close()
+        cache = hash.read_hash_cache(self.cachefile)
+        self.assertEqual(list(cache.keys()), [self.filenames[0]])
+    def testCloseWithPool(self):
+        results = hash.hash_tree([self.data], cachefile=self.cachefile, 
+                                 processes=2)
+        (filename, digest, cached) = next(results)
+        results.close()
+        cache = hash.read_hash_cache(self.cachefile)
+        self.assertEqual(cache[filename][6], digest)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import sys
+import os
+import shutil
+import hashlib
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.getcwd()), 'copads'))
+import jigsaw
+
+def write_file(filename, size):
+    f = open(filename, 'wb')
+    f.write(bytearray([(i * 7 + (i >> 8) * 13) % 256 for i in range(size)]))
+    f.close()
+
+def file_hash(filename):
+    f = open(filename, 'rb')
+    digest = hashlib.sha256(f.read()).hexdigest()
+    f.close()
+    return digest
+
+def quiet(function, *args):
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        return function(*args)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+def key_records(keyfilename):
+    f = open(keyfilename, 'r')
+    records = [line.strip().split('>>') for line in f 
+               if line.startswith('AA>>')]
+    f.close()
+    return records
+
+class testJigsaw(unittest.TestCase):
+    '''
+    Test for round trip of Jigsaw encryption and decryption.
+    '''
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'data.bin')
+        write_file(self.filename, 16384 * 12)
+        self.answer = file_hash(self.filename)
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    def encrypt(self, name, version, settings):
+        outputdir = os.path.join(self.directory, name)
+        os.mkdir(outputdir)
+        j = jigsaw.JigsawFile()
+        j.setting('version', version)
+        j.setting('verbose', 3)
+        for key in settings:
+            j.setting(key, settings[key])
+        keyfilename = quiet(j.encrypt, self.filename, outputdir)
+        return (outputdir, keyfilename)
+    def decrypt(self, outputdir, keyfilename, settings):
+        decryptfilename = os.path.join(outputdir, 'decrypted.bin')
+        j = jigsaw.JigsawFile()
+        j.setting('verbose', 3)
+        for key in settings:
+            j.setting(key, settings[key])
+        quiet(j.decrypt, keyfilename, decryptfilename, outputdir)
+        return file_hash(decryptfilename)
+    def roundTrip(self, name, version, encrypt_settings={}, 
+                  decrypt_settings={}):
+        (outputdir, keyfilename) = self.encrypt(name, version, 
+                                                encrypt_settings)
+        self.assertEqual(self.decrypt(outputdir, keyfilename, 
+                                      decrypt_settings), 
+                         self.answer)
+        return (outputdir, keyfilename)
+    def testSerial(self):
+        for version in (1, 2, 3):
+            self.roundTrip('serial%i' % version, version)
+    def testPipeline(self):
+        for version in (1, 2, 3):
+            self.roundTrip('pipeline%i' % version, version, 
+                           {'workers': 2, 'queuesize': 2})
+    def testPipelineMatchSerial(self):
+        for version in (1, 2, 3):
+            (sdir, skey) = self.roundTrip('serial%i' % version, version)
+            (pdir, pkey) = self.roundTrip('pipeline%i' % version, version, 
+                                          {'workers': 2})
+            srecords = key_records(skey)
+            precords = key_records(pkey)
+            self.assertEqual([r[:2] + r[-4:-3] for r in srecords], 
+                             [r[:2] + r[-4:-3] for r in precords])
+            for (records, outputdir) in ((srecords, sdir), 
+                                         (precords, pdir)):
+                jigfiles = [x for x in os.listdir(outputdir) 
+                            if x.endswith('.jig')]
+                self.assertEqual(len(jigfiles), len(records))
+                self.assertEqual(sorted(jigfiles), 
+                                 sorted([r[-2] for r in records]))
+    def testPack(self):
+        for version in (1, 2, 3):
+            for workers in (0, 2):
+                (outputdir, keyfilename) = \
+                    self.roundTrip('pack%i%i' % (version, workers), 
+                                   version, {'packsize': 65536, 
+                                             'workers': workers})
+                files = os.listdir(outputdir)
+                self.assertEqual([x for x in files if x.endswith('.jig')], 
+                                 [])
+                packs = [x for x in files if x.endswith('.jgp')]
+                self.assertTrue(len(packs) > 1)
+                for x in packs:
+                    size = os.path.getsize(os.path.join(outputdir, x))
+                    self.assertTrue(size <= 65536)
+                for record in key_records(keyfilename):
+                    (pack, offset) = record[-2].split('@')
+                    self.assertTrue(pack in packs)
+    def testParallelDecrypt(self):
+        for version in (1, 2, 3):
+            for packsize in (0, 65536):
+                self.roundTrip('parallel%i%i' % (version, packsize), 
+                               version, {'packsize': packsize}, 
+                               {'workers': 2})
+
+if __name__ == '__main__':
+    unittest.main()
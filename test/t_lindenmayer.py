@@ -2,6 +2,9 @@ import sys
 import os
 import unittest
 import re
+import struct
+import tempfile
+import xml.dom.minidom
 
 sys.path.append(os.path.join(os.path.dirname(os.getcwd()), 'copads'))
 import lindenmayer as N
@@ -138,6 +141,99 @@ class testFunction(unittest.TestCase):
     def testGeneration(self):
         self.assertEqual(self.result, self.answer)
 
+class testProbability(unittest.TestCase):
+    '''
+    Test for probability rules with certain and impossible activation.
+    Command length = 1
+    '''
+    def setUp(self):
+        s = N.lindenmayer(1)
+        r = [['A', 'BAC', 1, 'probability', 1.0],
+             ['B', 'BC', 1, 'probability', 0.0]]
+        s.add_rules(r)
+        axiom = 'A'
+        self.result = []
+        for i in range(4):
+            axiom = s.apply_rules(axiom)
+            self.result.append(axiom)
+        self.answer = ['BAC',
+                       'BBACC',
+                       'BBBACCC',
+                       'BBBBACCCC']
+    def testGeneration(self):
+        self.assertEqual(self.result, self.answer)
+
+
+class testStream(unittest.TestCase):
+    '''
+    Test for depth-first expansion against rewriting with priority.
+    Command length = 1
+    '''
+    def setUp(self):
+        self.s = N.lindenmayer(1)
+        r = [['A', 'BAC', 1],
+             ['B', 'BC', 2]]
+        self.s.add_rules(r)
+    def testGeneration(self):
+        axiom = 'A'
+        for i in range(6):
+            axiom = self.s.apply_rules(axiom)
+        for cache_length in [0, 5, 4096]:
+            result = ''.join(self.s.stream('A', 6, cache_length))
+            self.assertEqual(result, axiom)
+
+
+class testVectorGraphics(unittest.TestCase):
+    '''
+    Test for rendering of Turtle commands into SVG image and binary 
+    file of drawing operations.
+    '''
+    def setUp(self):
+        self.s = N.lindenmayer(1)
+        (handle, self.filename) = tempfile.mkstemp()
+        os.close(handle)
+    def tearDown(self):
+        os.remove(self.filename)
+    def svgElement(self):
+        document = xml.dom.minidom.parse(self.filename)
+        return document.documentElement
+    def testSVG(self):
+        count = self.s.svg_generate(self.filename, data_string='FLF')
+        self.assertEqual(count, 4)
+        svg = self.svgElement()
+        self.assertEqual(svg.getAttribute('width'), '21.00')
+        self.assertEqual(svg.getAttribute('viewBox'), 
+                         '-10.00 -11.00 21.00 21.00')
+        path = svg.getElementsByTagName('path')[0]
+        self.assertEqual(path.getAttribute('stroke'), 'black')
+        self.assertEqual(path.getAttribute('d'), 
+                         'M 0.000 0.000L 1.000 0.000L 1.000 -1.000')
+    def testSVGLargeCoordinates(self):
+        self.s.svg_generate(self.filename, start=(1e200, -1e200), 
+                            data_string='FLF')
+        svg = self.svgElement()
+        self.assertEqual(svg.getAttribute('style'), 
+                         'background-color:ivory')
+        viewbox = [float(x) for x in svg.getAttribute('viewBox').split()]
+        self.assertEqual(viewbox, [1e200, 1e200, 20.0, 20.0])
+    def testBinary(self):
+        count = self.s.svg_generate(self.filename, data_string='FLF', 
+                                    format='binary')
+        f = open(self.filename, 'rb')
+        data = f.read()
+        f.close()
+        self.assertEqual(struct.unpack('=4si', data[:8]), (b'CPLS', count))
+        size = struct.calcsize('=cdd')
+        self.assertEqual(len(data), 8 + count * size)
+        operations = [struct.unpack('=cdd', data[i:i+size]) 
+                      for i in range(8, len(data), size)]
+        black = float(N.constants.TKColours.index('black'))
+        self.assertEqual(operations, [(b'C', black, 0.0), 
+                                      (b'M', 0.0, 0.0), 
+                                      (b'L', 1.0, 0.0), 
+                                      (b'L', 1.0, 1.0)])
+
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,360 @@
+import sys
+import os
+import math
+import pickle
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.getcwd()), 'copads'))
+import ode
+
+def stiff(x, y):
+    return [-10.0 * (y[0] - math.sin(x)) + math.cos(x)]
+
+def stiff_solution(x):
+    return math.sin(x) + math.exp(-10.0 * x)
+
+def convergence_order(solver, steps=(100, 200), **kwargs):
+    '''
+    Estimates the order of accuracy of a solver from the errors at x = 1
+    with two step sizes.
+    '''
+    errors = []
+    for n in steps:
+        result = list(solver(stiff, 0.0, [1.0], 1.0 / n, 1.0 - 1e-9,
+                             **kwargs))
+        errors.append(abs(result[-1][1] - stiff_solution(1.0)))
+    return math.log(errors[0] / errors[1]) / math.log(float(steps[1]) /
+                                                     steps[0])
+
+expressions = {'human': ['birth_rate',
+                         '- (transmission_rate * human * zombie)',
+                         '- (death_rate * human)'],
+               'zombie': ['(transmission_rate * human * zombie)',
+                          '(resurrection_rate * dead)',
+                          '- (destroy_rate * human * zombie)'],
+               'dead': ['(death_rate * human)',
+                        '(destroy_rate * human * zombie)',
+                        '- (resurrection_rate * dead)']}
+parameters = {'birth_rate': 0.0,
+              'transmission_rate': 0.0095,
+              'death_rate': 0.0001,
+              'resurrection_rate': 0.0002,
+              'destroy_rate': 0.0003}
+initial_conditions = {'human': 500.0, 'zombie': 1.0, 'dead': 0.0}
+
+def zombie_functions(variables):
+    '''
+    Generates the list of ODE functions, one per ODE, for the zombie
+    model with the variables in the given order.
+    '''
+    (h, z, d) = [variables.index(v) for v in ('human', 'zombie', 'dead')]
+    p = parameters
+    functions = {'human': lambda t, y: p['birth_rate'] - \
+                     (p['transmission_rate'] * y[h] * y[z]) - \
+                     (p['death_rate'] * y[h]),
+                 'zombie': lambda t, y: \
+                     (p['transmission_rate'] * y[h] * y[z]) + \
+                     (p['resurrection_rate'] * y[d]) - \
+                     (p['destroy_rate'] * y[h] * y[z]),
+                 'dead': lambda t, y: (p['death_rate'] * y[h]) + \
+                     (p['destroy_rate'] * y[h] * y[z]) - \
+                     (p['resurrection_rate'] * y[d])}
+    return [functions[v] for v in variables]
+
+class testCompiledODE(unittest.TestCase):
+    '''
+    Test that the compiled system of ODEs gives the same results as the
+    ODE functions evaluated one at a time.
+    '''
+    def setUp(self):
+        self.system = ode.CompiledODE(expressions, parameters,
+                                      initial_conditions,
+                                      ['human = human + (5 * step)'])
+        self.functions = zombie_functions(self.system.variables)
+    def testDerivatives(self):
+        y = [300.0, 20.0, 7.0]
+        self.assertEqual(self.system(0.0, y),
+                         [f(0.0, y) for f in self.functions])
+    def testIntegrate(self):
+        human = str(self.system.variables.index('human'))
+        def modifier(y, step):
+            y[int(human)] = y[int(human)] + (5 * step)
+            return y
+        compiled = list(self.system.integrate((0.0, 0.1, 10.0), 'RK4',
+                                              {'human': [0.0, 0.0]}))
+        interpreted = list(ode.RK4(self.functions, 0.0, self.system.y0,
+                                   0.1, 10.0, modifier,
+                                   {human: [0.0, 0.0]}))
+        self.assertEqual(len(compiled), len(interpreted))
+        for (a, b) in zip(compiled, interpreted):
+            for (u, v) in zip(a, b):
+                self.assertAlmostEqual(u, v, 9)
+    def testZeroDivision(self):
+        system = ode.CompiledODE({'a': ['1 / b'], 'b': ['1.0']}, {},
+                                 {'a': 0.0, 'b': 0.0}, zerodivision=1e50)
+        expected = {'a': 1e50, 'b': 1.0}
+        self.assertEqual(system(0.0, [0.0, 0.0]),
+                         [expected[v] for v in system.variables])
+    def testPickle(self):
+        system = pickle.loads(pickle.dumps(self.system))
+        y = [300.0, 20.0, 7.0]
+        self.assertEqual(system(0.0, y), self.system(0.0, y))
+        self.assertEqual(system.nonODEfunc(list(y), 0.1),
+                         self.system.nonODEfunc(list(y), 0.1))
+
+def oscillator(x, y):
+    return [y[1], -y[0]]
+
+class testAdaptive(unittest.TestCase):
+    '''
+    Test adaptive step size integration with embedded Runge-Kutta pairs.
+    '''
+    def testAccuracy(self):
+        for method in ('CK45', 'RKF45', 'DP45'):
+            results = list(ode.RK_adaptive(oscillator, 0.0, [0.0, 1.0],
+                                           10.0, method, 1e-8, 1e-10))
+            self.assertEqual(results[-1][0], 10.0)
+            for (x, y, dy) in results:
+                self.assertAlmostEqual(y, math.sin(x), 6)
+                self.assertAlmostEqual(dy, math.cos(x), 6)
+    def testTolerance(self):
+        loose = list(ode.RK_adaptive(oscillator, 0.0, [0.0, 1.0], 10.0,
+                                     'DP45', 1e-4, 1e-6))
+        tight = list(ode.RK_adaptive(oscillator, 0.0, [0.0, 1.0], 10.0,
+                                     'DP45', 1e-8, 1e-10))
+        self.assertTrue(len(loose) < len(tight))
+        self.assertTrue(abs(loose[-1][1] - math.sin(10.0)) >
+                        abs(tight[-1][1] - math.sin(10.0)))
+    def testDenseOutput(self):
+        times = [0.0, 0.5, 2.25, 7.0, 10.0]
+        for method in ('CK45', 'RKF45', 'DP45'):
+            results = list(ode.RK_adaptive(oscillator, 0.0, [0.0, 1.0],
+                                           10.0, method, 1e-8, 1e-10,
+                                           times=times))
+            self.assertEqual([row[0] for row in results], times)
+            for (x, y, dy) in results:
+                self.assertAlmostEqual(y, math.sin(x), 6)
+    def testCompiledODE(self):
+        system = ode.CompiledODE({'y': ['v'], 'v': ['- y']}, {},
+                                 {'y': 0.0, 'v': 1.0})
+        y = system.variables.index('y') + 1
+        results = list(system.integrate((0.0, 0.1, 5.0), 'DP45',
+                                        rtol=1e-8, atol=1e-10,
+                                        times=[1.0, 5.0]))
+        self.assertEqual([row[0] for row in results], [1.0, 5.0])
+        for row in results:
+            self.assertAlmostEqual(row[y], math.sin(row[0]), 6)
+    def testUnknownMethod(self):
+        self.assertRaises(ValueError, list,
+                          ode.RK_adaptive(oscillator, 0.0, [0.0, 1.0],
+                                          1.0, 'RK4'))
+    def testSameMethodName(self):
+        '''
+        Test that fixed step and adaptive solvers do not share steppers 
+        of the same method name.
+        '''
+        list(ode.RK_solver(oscillator, 0.0, [0.0, 1.0], 0.1, 1.0, 'RK4'))
+        self.assertRaises(ValueError, list,
+                          ode.RK_adaptive(oscillator, 0.0, [0.0, 1.0],
+                                          1.0, 'RK4'))
+        list(ode.RK_adaptive(oscillator, 0.0, [0.0, 1.0], 1.0, 'DP45'))
+        self.assertRaises(ValueError, list,
+                          ode.RK_solver(oscillator, 0.0, [0.0, 1.0],
+                                        0.1, 1.0, 'DP45'))
+        results = list(ode.RK_solver(oscillator, 0.0, [0.0, 1.0], 0.1,
+                                     1.0, 'DP5'))
+        self.assertAlmostEqual(results[-1][1], math.sin(results[-1][0]), 6)
+
+class testEnsemble(unittest.TestCase):
+    '''
+    Test that ensemble members are integrated as the system of ODEs with
+    their own initial conditions and parameter values.
+    '''
+    def setUp(self):
+        self.system = ode.CompiledODE(expressions, parameters,
+                                      initial_conditions,
+                                      ['human = human + (5 * step)'])
+        self.sweep = [{'transmission_rate': 0.001 * (i + 1)}
+                      for i in range(5)]
+        self.time = (0.0, 0.1, 5.0)
+    def reference(self, member):
+        values = dict(parameters)
+        values.update(self.sweep[member])
+        system = ode.CompiledODE(expressions, values, initial_conditions,
+                                 ['human = human + (5 * step)'])
+        return list(system.integrate(self.time, 'RK4',
+                                     {'human': [0.0, 0.0]}))
+    def check(self, trajectory, member):
+        for (a, b) in zip(trajectory, self.reference(member)):
+            for (u, v) in zip(a, b):
+                self.assertAlmostEqual(u, v, 9)
+    def testIntegrate(self):
+        ensemble = ode.Ensemble(self.system, parameters=self.sweep)
+        results = ensemble.integrate(self.time, 'RK4',
+                                     {'human': [0.0, 0.0]}, shard_size=2)
+        self.assertEqual(results.shape, (len(self.reference(0)), 5, 3))
+        for member in range(5):
+            self.check(results.trajectory(member), member)
+        self.assertEqual(results.value(10, 3, 'zombie'),
+                         results.state(10, 3)[
+                             self.system.variables.index('zombie')])
+    def testProcesses(self):
+        ensemble = ode.Ensemble(self.system, parameters=self.sweep)
+        results = ensemble.integrate(self.time, 'RK4',
+                                     {'human': [0.0, 0.0]}, processes=2)
+        for member in range(5):
+            self.check(results.trajectory(member), member)
+    def testStream(self):
+        ensemble = ode.Ensemble(self.system, parameters=self.sweep)
+        members = []
+        for (member, trajectory) in ensemble.stream(self.time, 'RK4',
+                                                    {'human': [0.0, 0.0]},
+                                                    shard_size=2):
+            self.check(trajectory, member)
+            members.append(member)
+        self.assertEqual(members, list(range(5)))
+    def testStates(self):
+        states = [[100.0 * (i + 1), 1.0, 0.0] for i in range(3)]
+        results = ode.Ensemble(self.system, states=states).integrate(
+            self.time, 'RK4')
+        for member in range(3):
+            self.assertEqual(results.state(0, member), states[member])
+            expected = list(ode.RK_solver(self.system, 0.0, states[member],
+                                          0.1, 5.0, 'RK4',
+                                          self.system.nonODEfunc))
+            self.assertEqual(results.trajectory(member), expected)
+    def testMismatch(self):
+        self.assertRaises(ValueError, ode.Ensemble, self.system,
+                          [self.system.y0], self.sweep)
+        self.assertRaises(ValueError, ode.Ensemble, self.system, [[1.0]])
+
+class testTrajectoryBuffer(unittest.TestCase):
+    '''
+    Test recording of the results of solvers into trajectory buffer.
+    '''
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.results = list(ode.RK_solver(oscillator, 0.0, [0.0, 1.0],
+                                          0.01, 5.0))
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    def testRecord(self):
+        buffer = ode.RK_record(oscillator, 0.0, [0.0, 1.0], 0.01, 5.0,
+                               ode.TrajectoryBuffer(2, len(self.results)))
+        self.assertEqual(buffer.rows(), self.results)
+    def testConsume(self):
+        buffer = ode.TrajectoryBuffer(2, len(self.results))
+        buffer.consume(ode.RK_solver(oscillator, 0.0, [0.0, 1.0],
+                                     0.01, 5.0))
+        self.assertEqual(buffer.rows(), self.results)
+    def testInPlace(self):
+        '''
+        Test that stepping in place gives the same results as RK_solver, 
+        with modifying function and boundaries.
+        '''
+        system = ode.CompiledODE(expressions, parameters,
+                                 initial_conditions,
+                                 ['human = human + (5 * step)'])
+        bound = system.boundary({'human': [450.0, 450.0]})
+        for method in ode.RK_tableaus.keys():
+            expected = list(ode.RK_solver(system, 0.0, system.y0, 0.01, 
+                                          2.0, method, system.nonODEfunc,
+                                          bound))
+            buffer = ode.RK_record(system, 0.0, system.y0, 0.01, 2.0,
+                                   ode.TrajectoryBuffer(3, len(expected)),
+                                   method, system.nonODEfunc, bound)
+            self.assertEqual(buffer.rows(), expected)
+        self.assertEqual(system.y0, [initial_conditions[v] 
+                                     for v in system.variables])
+    def testArgumentReturned(self):
+        '''
+        Test stepping in place where rhs returns the list of values given 
+        to it as the derivatives.
+        '''
+        def growth(x, y):
+            return y
+        expected = list(ode.RK_solver(growth, 0.0, [1.0, 2.0], 0.1, 1.0, 
+                                      'DP5'))
+        buffer = ode.RK_record(growth, 0.0, [1.0, 2.0], 0.1, 1.0,
+                               ode.TrajectoryBuffer(2, 20), 'DP5')
+        self.assertEqual(buffer.rows(), expected)
+    def testRingBuffer(self):
+        buffer = ode.TrajectoryBuffer(2, 30)
+        buffer.consume(self.results)
+        self.assertEqual(buffer.rows(), self.results[-30:])
+        self.assertEqual(buffer.total, len(self.results))
+    def testEvery(self):
+        buffer = ode.TrajectoryBuffer(2, len(self.results), every=7)
+        buffer.consume(self.results)
+        self.assertEqual(buffer.rows(), self.results[::7])
+    def testTimes(self):
+        buffer = ode.TrajectoryBuffer(2, 10, times=[0.0, 1.0, 2.5, 4.0])
+        ode.RK_record(oscillator, 0.0, [0.0, 1.0], 0.01, 5.0, buffer)
+        rows = buffer.rows()
+        self.assertEqual(len(rows), 4)
+        for (row, x) in zip(rows, [0.0, 1.0, 2.5, 4.0]):
+            self.assertAlmostEqual(row[0], x, 6)
+    def testFile(self):
+        filename = os.path.join(self.directory, 'oscillator.dat')
+        buffer = ode.TrajectoryBuffer(2, 64, every=3, filename=filename)
+        buffer.consume(self.results)
+        buffer.close()
+        self.assertEqual(list(ode.TrajectoryBuffer.read(filename, 10)),
+                         self.results[::3])
+    def testNotTrajectoryFile(self):
+        filename = os.path.join(self.directory, 'text.dat')
+        f = open(filename, 'wb')
+        f.write(b'not a trajectory file')
+        f.close()
+        self.assertRaises(ValueError, list,
+                          ode.TrajectoryBuffer.read(filename))
+
+class testImplicitSolvers(unittest.TestCase):
+    '''
+    Test the order of accuracy of implicit solvers on a stiff,
+    non-autonomous ODE, and the reuse of iteration matrix.
+    '''
+    def testBackwardEuler(self):
+        order = convergence_order(ode.BackwardEuler)
+        self.assertTrue(abs(order - 1.0) < 0.2)
+    def testBDF(self):
+        for expected in (2, 3):
+            order = convergence_order(ode.BDF, order=expected)
+            self.assertTrue(abs(order - expected) < 0.2)
+    def testRosenbrock(self):
+        order = convergence_order(ode.Rosenbrock, (200, 400))
+        self.assertTrue(abs(order - 2.0) < 0.2)
+    def testRosenbrockTimeDerivative(self):
+        '''
+        Test that the estimated partial derivatives of f with respect to x
+        give the same results as the given partial derivatives.
+        '''
+        def dfdx(x, y):
+            return [10.0 * math.cos(x) - math.sin(x)]
+        estimated = list(ode.Rosenbrock(stiff, 0.0, [1.0], 0.01, 1.0))
+        given = list(ode.Rosenbrock(stiff, 0.0, [1.0], 0.01, 1.0,
+                                    dfdx=dfdx))
+        for (a, b) in zip(estimated, given):
+            self.assertAlmostEqual(a[1], b[1], 6)
+    def testJacobianReuse(self):
+        calls = []
+        def jacobian(x, y):
+            calls.append(x)
+            return [[-150.0 * y[0] ** 2]]
+        def cubic(x, y):
+            return [-50.0 * y[0] ** 3 + math.sin(x)]
+        result = list(ode.BDF(cubic, 0.0, [1.0], 0.01, 1.0, order=2,
+                              jacobian=jacobian))
+        self.assertEqual(len(result), 101)
+        self.assertTrue(len(calls) < 20)
+    def testNewtonFailure(self):
+        def cubic(x, y):
+            return [-50.0 * y[0] ** 3 + math.sin(x)]
+        self.assertRaises(ValueError, list,
+                          ode.BDF(cubic, 0.0, [1.0], 0.1, 1.0,
+                                  iterations=2))
+
+if __name__ == '__main__':
+    unittest.main()
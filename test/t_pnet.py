@@ -0,0 +1,238 @@
+import sys
+import os
+import operator
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.getcwd()), 'copads'))
+import pnet
+
+def cooling(places):
+    return places['oven'].attributes['heat'] * 0.1
+
+def bakery():
+    net = pnet.PNet()
+    net.add_places('flour', {'flour': 1000.0})
+    net.add_places('water', {'water': 300.0})
+    net.add_places('mixer', {'flour': 0.0, 'water': 0.0, 'dough': 0.0})
+    net.add_places('pan', {'dough': 0.0, 'bread': 0.0})
+    net.add_places('oven', {'heat': 0.0})
+    net.add_rules('add_flour', 'step', ['flour.flour -> mixer.flour; 35'])
+    net.add_rules('add_water', 'delay',
+                  ['water.water -> mixer.water; 20; 3'])
+    net.add_rules('blend', 'step',
+                  ['mixer.flour -> mixer.dough; 30',
+                   'mixer.water -> mixer.dough; 10'])
+    net.add_rules('rise', 'incubate',
+                  ['5; mixer.dough -> pan.dough; mixer.flour == 0'])
+    net.add_rules('heat', 'delay', ['ouroboros.U -> oven.heat; 50; 2'])
+    net.add_rules('bake', 'ratio',
+                  ['pan.dough -> pan.bread; 0.3; pan.dough < 1; 0'])
+    net.add_rules('cool', 'function',
+                  ['oven.heat -> ouroboros.U', cooling,
+                   'oven.heat > 100; pan.dough != 0'])
+    return net
+
+def tokens(net):
+    return dict([('.'.join([pName, aName]), value)
+                 for pName in net.places.keys()
+                 for (aName, value) in net.places[pName].attributes.items()
+                 if pName != 'ouroboros'])
+
+class testCompiledRules(unittest.TestCase):
+    '''
+    Test that simulation by compiled rules gives the same token values as
+    simulation by executing all the rules at each time step.
+    '''
+    def setUp(self):
+        self.reference = bakery()
+        self.reports = {}
+        for clock in range(1, 101):
+            self.reference._execute_rules(clock, 1)
+            self.reports[clock] = tokens(self.reference)
+    def testSimulate(self):
+        net = bakery()
+        net.simulate(100, 1, 1)
+        for clock in range(1, 101):
+            report = net.report[str(clock)]
+            for (name, value) in self.reports[clock].items():
+                self.assertAlmostEqual(report[name], value)
+        self.assertAlmostEqual(net.losses['dough'],
+                               self.reference.losses['dough'])
+    def testSimulateYield(self):
+        net = bakery()
+        for (clock, report) in net.simulate_yield(100, 1):
+            for (name, value) in self.reports[clock].items():
+                self.assertAlmostEqual(report[name], value)
+    def testAllRulesUsed(self):
+        '''
+        Test that the rules of the net are exercised by the simulation.
+        '''
+        final = self.reports[100]
+        self.assertAlmostEqual(final['flour.flour'], 0.0)
+        self.assertTrue(final['pan.bread'] > 0)
+        self.assertTrue(self.reference.losses['dough'] > 0)
+        self.assertTrue(final['oven.heat'] < 50 * 50)
+
+class testSimulateYield(unittest.TestCase):
+    '''
+    Test that token values changed between time steps of 
+    PNet.simulate_yield() are used by the following time steps.
+    '''
+    def testChangeBetweenSteps(self):
+        net = pnet.PNet()
+        net.add_places('a', {'x': 0.0})
+        net.add_places('b', {'x': 0.0})
+        net.add_rules('move', 'step', ['a.x -> b.x; 1'])
+        values = {}
+        for (clock, report) in net.simulate_yield(12, 1):
+            values[clock] = (report['a.x'], report['b.x'])
+            if clock == 5:
+                net.places['a'].attributes['x'] = 3.0
+        self.assertEqual(values[5], (0.0, 0.0))
+        self.assertEqual(values[6], (2.0, 1.0))
+        self.assertEqual(values[8], (0.0, 3.0))
+        self.assertEqual(values[11], (0.0, 3.0))
+
+class testRecorder(unittest.TestCase):
+    '''
+    Test that the recorder records the same token values as the report
+    dictionary, in memory and in file.
+    '''
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.net = bakery()
+        self.net.simulate(100, 1, 1)
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    def check(self, clock, names, values):
+        report = self.net.report[str(int(clock))]
+        for (name, value) in zip(names, values):
+            self.assertAlmostEqual(value, report[name])
+    def testMemory(self):
+        recorder = pnet.Recorder()
+        net = bakery()
+        net.simulate(100, 1, 1, recorder)
+        (clock, names, data) = net.report_tokens()
+        self.assertEqual(list(clock), [float(c) for c in range(1, 101)])
+        self.assertEqual(net.report, {})
+        for i in range(len(clock)):
+            self.check(clock[i], names, [column[i] for column in data])
+    def testDecimation(self):
+        recorder = pnet.Recorder(every=7)
+        bakery().simulate(100, 1, 1, recorder)
+        (clock, names, data) = recorder.report()
+        self.assertEqual(list(clock), [float(c) for c in range(1, 101, 7)])
+        for i in range(len(clock)):
+            self.check(clock[i], names, [column[i] for column in data])
+    def testFile(self):
+        for format in ('csv', 'binary'):
+            filename = os.path.join(self.directory, 'bread.' + format)
+            recorder = pnet.Recorder(every=3, filename=filename, 
+                                     format=format, chunksize=4)
+            bakery().simulate(100, 1, 1, recorder)
+            recorder.close()
+            self.assertEqual(len(recorder.clock), 0)
+            rows = list(pnet.Recorder.read(filename, format))
+            self.assertEqual([row[0] for row in rows], 
+                             [float(c) for c in range(1, 101, 3)])
+            for (clock, names, values) in rows:
+                self.check(clock, names, values)
+    def testFormat(self):
+        self.assertRaises(ValueError, pnet.Recorder, 1, None, 'json')
+
+class testFlowEngine(unittest.TestCase):
+    '''
+    Test that flow engine gives the same reports as PNet.simulate().
+    '''
+    def setUp(self):
+        self.reference = bakery()
+        self.reference.simulate(100, 1, 1)
+    def testSequential(self):
+        net = bakery()
+        pnet.FlowEngine(net).simulate(100, 1, 1)
+        self.assertEqual(net.report, self.reference.report)
+        self.assertEqual(net.losses, self.reference.losses)
+    def testRecorder(self):
+        net = bakery()
+        recorder = pnet.Recorder()
+        pnet.FlowEngine(net).simulate(100, 1, 1, recorder)
+        (clock, names, data) = recorder.report()
+        for i in range(len(clock)):
+            report = self.reference.report[str(int(clock[i]))]
+            self.assertEqual([column[i] for column in data], 
+                             [report[name] for name in names])
+    def testFunctionRules(self):
+        '''
+        Test that function rules see the token values changed by the 
+        rules after them in the previous time step, and the rules before 
+        them in the current time step.
+        '''
+        def create():
+            net = pnet.PNet(zerolowerbound=False)
+            net.add_places('a', {'x': 10.0, 'y': 0.0})
+            net.add_places('b', {'x': 0.0, 'y': 0.0})
+            net.add_rules('copy', 'function', 
+                          ['ouroboros.U -> b.y', 
+                           lambda places: places['b'].attributes['x'] - \
+                               places['b'].attributes['y'], 
+                           'a.y >= 0'])
+            net.add_rules('move', 'step', ['a.x -> b.x; 2'])
+            net.add_rules('count', 'function', 
+                          ['ouroboros.U -> a.y', 
+                           lambda places: places['a'].attributes['x'], 
+                           'a.y >= 0'])
+            net.add_rules('drip', 'delay', ['ouroboros.U -> b.x; 0.5; 3'])
+            return net
+        reference = create()
+        reference.simulate(20, 1, 5)
+        net = create()
+        pnet.FlowEngine(net).simulate(20, 1, 5)
+        self.assertEqual(net.report, reference.report)
+        self.assertTrue(net.report['20']['a.x'] < 0)
+    def testSynchronous(self):
+        '''
+        Test that synchronous flow engine gives the same reports as 
+        PNet.simulate() when no token is moved by more than one rule.
+        '''
+        def create():
+            net = pnet.PNet()
+            net.add_places('a', {'x': 100.0, 'y': 0.0})
+            net.add_places('b', {'x': 0.0, 'y': 50.0})
+            net.add_rules('move', 'step', ['a.x -> b.x; 3'])
+            net.add_rules('drip', 'delay', ['ouroboros.U -> a.y; 2; 4'])
+            net.add_rules('decay', 'ratio', ['b.y -> a.y; 0.1; b.y < 5; 0'])
+            return net
+        reference = create()
+        reference.simulate(50, 1, 1)
+        net = create()
+        pnet.FlowEngine(net, synchronous=True).simulate(50, 1, 1)
+        for clock in reference.report.keys():
+            for (name, value) in reference.report[clock].items():
+                self.assertAlmostEqual(net.report[clock][name], value)
+        self.assertAlmostEqual(net.losses['y'], reference.losses['y'])
+
+class testCondition(unittest.TestCase):
+    '''
+    Test parsing of logical conditions.
+    '''
+    def testOperators(self):
+        self.assertEqual(pnet.parse_condition('oven.heat >= 300'),
+                         ('oven', 'heat', operator.ge, 300.0))
+        self.assertEqual(pnet.parse_condition('oven.heat<=30.5'),
+                         ('oven', 'heat', operator.le, 30.5))
+        self.assertEqual(pnet.parse_condition('oven.heat > 300'),
+                         ('oven', 'heat', operator.gt, 300.0))
+        self.assertEqual(pnet.parse_condition('mixer.flour == 0'),
+                         ('mixer', 'flour', operator.eq, 0.0))
+    def testNoOperator(self):
+        self.assertRaises(ValueError, pnet.parse_condition, 'a.b 5')
+    def testCompileNoOperator(self):
+        net = pnet.PNet()
+        net.add_places('a', {'b': 1.0})
+        net.add_rules('move', 'incubate', ['1; a.b -> ouroboros.U; a.b 5'])
+        self.assertRaises(ValueError, net.simulate, 1, 1, 1)
+
+if __name__ == '__main__':
+    unittest.main()
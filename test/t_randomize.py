@@ -0,0 +1,89 @@
+import sys
+import os
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.getcwd()), 'copads'))
+import randomize
+
+generators = ['ansic', 'borlandc', 'cdc', 'java', 'lehmer', 'lehmer2', 
+              'lehmer3', 'mmix', 'newlib', 'nag', 'nr', 'pascal', 'vb6', 
+              'visualc']
+
+class testMersenneTwister(unittest.TestCase):
+    '''
+    Test that batches, jumps and spawned generators of MersenneTwister 
+    give the same random numbers as generating one at a time.
+    '''
+    def testRandintArray(self):
+        a = randomize.MersenneTwister(5489)
+        b = randomize.MersenneTwister(5489)
+        x = [a._random() for i in range(3000)]
+        y = list(b.randint_array(1000)) + list(b.randint_array(1)) + \
+            list(b.randint_array(1999))
+        self.assertEqual(x, y)
+    def testRandomArray(self):
+        a = randomize.MersenneTwister(7)
+        b = randomize.MersenneTwister(7)
+        x = [a.random() for i in range(500)]
+        self.assertEqual(x, list(b.random_array(500)))
+    def testJump(self):
+        a = randomize.MersenneTwister(11)
+        a._random()
+        for steps in (100, 60000, 123457):
+            b = a._copy()
+            b.jump(steps)
+            c = a._copy()
+            c.randint_array(steps)
+            self.assertEqual(list(b.randint_array(2000)), 
+                             list(c.randint_array(2000)))
+    def testSpawn(self):
+        a = randomize.MersenneTwister(11)
+        generators = a.spawn(3, 70001)
+        for i in range(3):
+            b = a._copy()
+            b.randint_array(i * 70001)
+            self.assertEqual(list(generators[i].randint_array(1000)), 
+                             list(b.randint_array(1000)))
+
+class testLCG(unittest.TestCase):
+    '''
+    Test that batches of LCG random numbers are the same as generating 
+    one random number at a time.
+    '''
+    def testRandintList(self):
+        for generator in generators:
+            a = randomize.LCG(12345, generator)
+            b = randomize.LCG(12345, generator)
+            x = [a._random() for i in range(5000)]
+            y = b.randint_list(3) + b.randint_list(2000, lanes=7) + \
+                b.randint_list(2997)
+            self.assertEqual(x, y)
+            self.assertEqual(a.seed, b.seed)
+    def testRandom(self):
+        for generator in generators:
+            a = randomize.LCG(99, generator)
+            b = randomize.LCG(99, generator)
+            x = [a.random() for i in range(1500)]
+            self.assertEqual(x, list(b.random(1500)))
+            self.assertEqual(a.seed, b.seed)
+    def testJump(self):
+        for generator in generators:
+            a = randomize.LCG(12345, generator)
+            b = randomize.LCG(12345, generator)
+            for i in range(1234): a._random()
+            b.jump(1234)
+            self.assertEqual(a.seed, b.seed)
+
+class testCLCG(unittest.TestCase):
+    '''
+    Test that batches of CLCG random numbers are the same as generating 
+    one random number at a time.
+    '''
+    def testRandom(self):
+        a = randomize.CLCG(1, 'mmix', 2, 'lehmer')
+        b = randomize.CLCG(1, 'mmix', 2, 'lehmer')
+        x = [a.random() for i in range(2000)]
+        self.assertEqual(x, list(b.random(2000)))
+
+if __name__ == '__main__':
+    unittest.main()
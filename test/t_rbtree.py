@@ -101,6 +101,41 @@ def testRBlist():
         print("node lists don't match")
     print()
 
+def testRBorderStatistics():
+    import random
+    print("--- Testing order statistics and range queries ---")
+
+    initList = random.sample(range(1000), 200)
+    rbList = RBList (initList)
+    initList.sort()
+    assert rbList.values() == initList
+    for i in range(len(initList)):
+        assert rbList[i] == initList[i]
+        assert rbList.index (initList[i]) == i
+    assert list(rbList.iterValues (100, 500)) == \
+        [x for x in initList if 100 <= x < 500]
+
+    for i in range(50):
+        rbList.pop (random.randrange(len(rbList)))
+        rbList.insert (random.randrange(1000))
+    values = rbList.values()
+    assert [rbList[i] for i in range(len(rbList))] == values
+
+    rbDict = RBDict (dict([(i, i * i) for i in range(100)]))
+    rbDict.update (dict([(i, -i) for i in range(50, 150)]))
+    assert rbDict.keys() == list(range(150))
+    assert rbDict[10] == 100 and rbDict[60] == -60
+    assert rbDict.items (10, 13) == [(10, 100), (11, 121), (12, 144)]
+    assert rbDict.nth (120) == (120, -120)
+    assert rbDict.index (120) == 120
+
+    rbDict = RBDict ()
+    rbDict.bulkInsert ([(1, 'a'), (2, 'b'), (1, 'c')])
+    assert rbDict.items () == [(1, 'a'), (2, 'b')]
+    rbList = RBList ([3, 1, 3], unique=False)
+    assert rbList.findNode (3).count == 2
+    print()
+
 def testRBdict():
     import random
     print("--- Testing RBDict ---")
@@ -133,6 +168,7 @@ def testRBdict():
 if __name__ == "__main__":
     if len(sys.argv) <= 1:
         testRBlist()
+        testRBorderStatistics()
         testRBdict()
     else:
 